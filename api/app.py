@@ -0,0 +1,37 @@
+import os
+from aiohttp import web
+from api import clusters, images, listings, markers
+from utils.metrics import metrics_handler
+
+
+@web.middleware
+async def cors_middleware(request, handler):
+    # index.html alohida statik serverdan ochiladi
+    if request.method == 'OPTIONS':
+        response = web.Response()
+    else:
+        response = await handler(request)
+    response.headers['Access-Control-Allow-Origin'] = os.getenv('API_CORS_ORIGIN', '*')
+    response.headers['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
+    return response
+
+
+def create_app():
+    app = web.Application(middlewares=[cors_middleware])
+    app.router.add_get('/api/listings', listings.list_listings)
+    app.router.add_get('/api/listings/nearby', listings.nearby_listings)
+    app.router.add_get('/api/listings/changes', listings.listing_changes)
+    app.router.add_get(r'/api/listings/{listing_id:\d+}', listings.listing_detail)
+    app.router.add_get('/api/markers', markers.list_markers)
+    app.router.add_get('/api/clusters', clusters.list_clusters)
+    app.router.add_get('/api/images/{digest}/{variant}', images.serve_image)
+    app.router.add_get('/metrics', metrics_handler)
+    return app
+
+
+def main():
+    web.run_app(
+        create_app(),
+        host=os.getenv('API_HOST', '0.0.0.0'),
+        port=int(os.getenv('API_PORT', '8080')),
+    )
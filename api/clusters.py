@@ -0,0 +1,27 @@
+from aiohttp import web
+from config.database import get_async_db
+from api.listings import BadRequest, parse_bbox, _int_param
+from utils import clustering
+
+
+async def query_clusters(zoom, bbox):
+    async with get_async_db(readonly=True) as db:
+        return await db.run_sync(clustering.get_clusters, zoom, bbox)
+
+
+async def list_clusters(request):
+    try:
+        zoom = _int_param(request.query, 'zoom')
+        bbox = parse_bbox(request.query.get('bbox'))
+        if zoom is None or bbox is None:
+            raise BadRequest("'zoom' va 'bbox' majburiy")
+    except BadRequest as e:
+        return web.json_response({'success': False, 'error': str(e)}, status=400)
+
+    data = await query_clusters(zoom, bbox)
+    return web.json_response({
+        'success': True,
+        'data': data,
+        # Bu zoomdan kattasida klient /listings dan to'liq e'lonlarni olishi kerak
+        'max_zoom': clustering.MAX_CLUSTER_ZOOM,
+    })
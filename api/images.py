@@ -0,0 +1,48 @@
+import re
+from aiohttp import web
+from sqlalchemy import select
+from models.image import ListingImage
+from utils.image_cache import image_cache, VARIANTS
+
+DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+# URL mazmundan olingan - o'zgarmaydi
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+
+
+async def cover_hashes(db, listing_ids):
+    """listing_id -> birinchi (ishlangan) rasm hash i"""
+    if not listing_ids:
+        return {}
+    rows = await db.execute(
+        select(ListingImage.listing_id, ListingImage.content_hash).where(
+            ListingImage.listing_id.in_(listing_ids),
+            ListingImage.position == 0,
+            ListingImage.content_hash.isnot(None)
+        )
+    )
+    return dict(rows.all())
+
+
+async def listing_hashes(db, listing_id):
+    """E'lonning ishlangan rasmlari hash lari tartib bo'yicha (modal galereyasi uchun)"""
+    rows = await db.scalars(
+        select(ListingImage.content_hash).where(
+            ListingImage.listing_id == listing_id,
+            ListingImage.content_hash.isnot(None)
+        ).order_by(ListingImage.position)
+    )
+    return rows.all()
+
+
+async def serve_image(request):
+    digest = request.match_info['digest']
+    variant = request.match_info['variant']
+    if not DIGEST_RE.match(digest) or variant not in VARIANTS:
+        raise web.HTTPNotFound()
+    path = image_cache.get(digest, variant)
+    if path is None:
+        raise web.HTTPNotFound()
+    return web.FileResponse(path, headers={
+        'Content-Type': 'image/webp',
+        'Cache-Control': IMMUTABLE_CACHE,
+    })
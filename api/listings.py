@@ -0,0 +1,235 @@
+import math
+from aiohttp import web
+from sqlalchemy import select
+from config.database import get_async_db
+from models.user import Listing
+from utils import changes, currency, nearby
+from api.images import cover_hashes, listing_hashes
+
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 500
+# Ro'yxat/xarita javoblarida tavsif shu uzunlikkacha; to'liq matn - /api/listings/{id}
+DESCRIPTION_PREVIEW = 120
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _int_param(query, name, default=None):
+    value = query.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise BadRequest(f"'{name}' butun son bo'lishi kerak")
+
+
+def parse_bbox(value):
+    """'south,west,north,east' -> tuple yoki None"""
+    if not value:
+        return None
+    try:
+        south, west, north, east = (float(part) for part in value.split(','))
+    except ValueError:
+        raise BadRequest("'bbox' formati: south,west,north,east")
+    if not all(math.isfinite(part) for part in (south, west, north, east)):
+        raise BadRequest("'bbox' chekli sonlardan iborat bo'lishi kerak")
+    if south > north or west > east:
+        raise BadRequest("'bbox' noto'g'ri: south <= north va west <= east bo'lishi kerak")
+    # Dunyodan katta viewport (zoom 0-2) - to'g'ri kenglik/uzunlik oralig'iga qisqartiriladi
+    return max(south, -90.0), max(west, -180.0), min(north, 90.0), min(east, 180.0)
+
+
+def parse_filters(query):
+    filters = {
+        'bbox': parse_bbox(query.get('bbox')),
+        'rooms': _int_param(query, 'rooms'),
+        'min_rooms': _int_param(query, 'min_rooms'),
+        'min_price': _int_param(query, 'min_price'),
+        'max_price': _int_param(query, 'max_price'),
+        'currency': parse_currency_param(query.get('currency')),
+        'cursor': _int_param(query, 'cursor'),
+        'limit': min(max(_int_param(query, 'limit', DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE),
+    }
+    return filters
+
+
+def parse_currency_param(value):
+    """'usd', "so'm", 'UZS' ... -> saqlanadigan qiymat; bo'sh bo'lsa None"""
+    if not value:
+        return None
+    parsed = currency.parse_currency(value)
+    if parsed is None:
+        raise BadRequest(f"'currency' noma'lum: {value}")
+    return parsed.value
+
+
+def _float_param(query, name, low=-math.inf, high=math.inf):
+    try:
+        value = float(query[name])
+    except (KeyError, ValueError):
+        raise BadRequest(f"'{name}' son bo'lishi kerak")
+    # float() 'nan' va 'inf' ni ham qabul qiladi
+    if not math.isfinite(value) or not low <= value <= high:
+        raise BadRequest(f"'{name}' {low}..{high} oralig'ida bo'lishi kerak")
+    return value
+
+
+def preview(text):
+    if text and len(text) > DESCRIPTION_PREVIEW:
+        return text[:DESCRIPTION_PREVIEW].rstrip() + '…'
+    return text
+
+
+def listing_to_dict(listing, thumb=None, full=False):
+    """Xarita uchun ixcham ko'rinish; thumb - /api/images/<thumb>/thumb uchun hash.
+
+    full=False - tavsif qisqartiriladi (ro'yxatlar); full=True - bitta e'lon sahifasi uchun.
+    """
+    return {
+        'id': listing.id,
+        'title': listing.title,
+        'description': listing.description if full else preview(listing.description),
+        'rooms': listing.rooms,
+        'floor': f"{listing.floor}/{listing.total_floors}",
+        'price': listing.price,
+        'currency': listing.currency,
+        'location': [listing.latitude, listing.longitude],
+        'phone': listing.phone,
+        'created_at': listing.created_at.isoformat() if listing.created_at else None,
+        'thumb': thumb,
+    }
+
+
+def apply_filters(query, filters):
+    """bbox, xona va narx filtrlari (is_active siz)"""
+    query = query.where(Listing.latitude.isnot(None))
+    if filters['bbox']:
+        query = query.where(Listing.in_bbox(*filters['bbox']))
+    if filters['rooms'] is not None:
+        query = query.where(Listing.rooms == filters['rooms'])
+    if filters['min_rooms'] is not None:
+        query = query.where(Listing.rooms >= filters['min_rooms'])
+    # Valyuta berilsa - shu valyutadagi narx, aks holda USD ekvivalenti (idx_listing_active_rooms_price_usd)
+    price = Listing.price
+    if filters['currency']:
+        query = query.where(Listing.currency == filters['currency'])
+    else:
+        price = Listing.price_usd
+    if filters['min_price'] is not None:
+        query = query.where(price >= filters['min_price'])
+    if filters['max_price'] is not None:
+        query = query.where(price <= filters['max_price'])
+    return query
+
+
+async def query_listings(filters):
+    """Keyset pagination: id kamayish tartibida, cursor - oldingi sahifaning oxirgi id si.
+
+    Versiya qatorlardan oldin o'qiladi - keyingi /listings/changes hech narsani o'tkazib yubormaydi.
+    """
+    query = apply_filters(select(Listing).where(Listing.is_active == True), filters)
+    if filters['cursor'] is not None:
+        query = query.where(Listing.id < filters['cursor'])
+
+    async with get_async_db(readonly=True) as db:
+        version, _ = await db.run_sync(changes.versions)
+        rows = (await db.scalars(query.order_by(Listing.id.desc()).limit(filters['limit'] + 1))).all()
+        thumbs = await cover_hashes(db, [listing.id for listing in rows[:filters['limit']]])
+    page = [listing_to_dict(listing, thumbs.get(listing.id)) for listing in rows[:filters['limit']]]
+    next_cursor = page[-1]['id'] if len(rows) > filters['limit'] else None
+    return page, next_cursor, version
+
+
+async def list_listings(request):
+    try:
+        filters = parse_filters(request.query)
+    except BadRequest as e:
+        return web.json_response({'success': False, 'error': str(e)}, status=400)
+
+    page, next_cursor, version = await query_listings(filters)
+    return web.json_response({
+        'success': True,
+        'data': page,
+        'next_cursor': str(next_cursor) if next_cursor is not None else None,
+        'version': version,
+    })
+
+
+async def query_changes(filters, since):
+    """since versiyadan keyin qo'shilgan/o'zgargan (data) va nofaol bo'lgan (removed) e'lonlar.
+
+    Token juda eski (arxivlangan e'lonlar) yoki o'zgarishlar ko'p bo'lsa reset=True.
+    """
+    async with get_async_db(readonly=True) as db:
+        version, purged = await db.run_sync(changes.versions)
+        if since < purged or since > version:
+            return {'reset': True, 'version': version, 'data': [], 'removed': []}
+        rows = (await db.scalars(
+            apply_filters(select(Listing).where(Listing.version > since), filters)
+            .order_by(Listing.version, Listing.id).limit(changes.CHANGES_MAX + 1)
+        )).all()
+        if len(rows) > changes.CHANGES_MAX:
+            return {'reset': True, 'version': version, 'data': [], 'removed': []}
+        active = [listing for listing in rows if listing.is_active]
+        thumbs = await cover_hashes(db, [listing.id for listing in active])
+    return {
+        'reset': False,
+        'version': version,
+        'data': [listing_to_dict(listing, thumbs.get(listing.id)) for listing in active],
+        'removed': [listing.id for listing in rows if not listing.is_active],
+    }
+
+
+async def listing_changes(request):
+    """Delta-sync: klient oxirgi javobdagi version ni since sifatida yuboradi"""
+    try:
+        filters = parse_filters(request.query)
+        since = _int_param(request.query, 'since')
+        if since is None:
+            raise BadRequest("'since' majburiy")
+    except BadRequest as e:
+        return web.json_response({'success': False, 'error': str(e)}, status=400)
+
+    return web.json_response(dict(await query_changes(filters, since), success=True))
+
+
+async def listing_detail(request):
+    """Bitta e'lon - xarita popup/modal ochilganda"""
+    listing_id = int(request.match_info['listing_id'])
+    async with get_async_db(readonly=True) as db:
+        listing = await db.get(Listing, listing_id)
+        if listing is None or not listing.is_active:
+            return web.json_response({'success': False, 'error': "E'lon topilmadi"}, status=404)
+        images = await listing_hashes(db, listing_id)
+    # images - /api/images/<hash>/medium uchun hash lar; hali ishlanmagan rasmlar kirmaydi
+    data = dict(listing_to_dict(listing, images[0] if images else None, full=True), images=images)
+    return web.json_response({'success': True, 'data': data})
+
+
+async def nearby_listings(request):
+    """k ta eng yaqin (yoki radius ichidagi) e'lonlar, masofa bilan"""
+    try:
+        lat = _float_param(request.query, 'lat', -90.0, 90.0)
+        lng = _float_param(request.query, 'lng', -180.0, 180.0)
+        k = min(max(_int_param(request.query, 'k', nearby.NEARBY_LIMIT), 1), MAX_PAGE_SIZE)
+        radius = request.query.get('radius')
+        radius = _float_param(request.query, 'radius', 0.0) if radius else None
+    except BadRequest as e:
+        return web.json_response({'success': False, 'error': str(e)}, status=400)
+
+    async with get_async_db(readonly=True) as db:
+        if radius is not None:
+            found = await db.run_sync(nearby.within_radius, lat, lng, min(radius, nearby.NEARBY_MAX_RADIUS_KM), k)
+        else:
+            found = await db.run_sync(nearby.nearest, lat, lng, k)
+        thumbs = await cover_hashes(db, [listing.id for _, listing in found])
+    return web.json_response({
+        'success': True,
+        'data': [
+            dict(listing_to_dict(listing, thumbs.get(listing.id)), distance_km=round(distance, 3))
+            for distance, listing in found
+        ],
+    })
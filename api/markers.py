@@ -0,0 +1,159 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import struct
+import sys
+from array import array
+from datetime import timezone
+from aiohttp import web
+from sqlalchemy import select
+from config.database import get_async_db
+from models.user import Listing
+from utils import changes
+from utils.cache import LRUCache
+from api.listings import BadRequest, apply_filters, parse_filters
+
+# Xarita pinlari uchun ustunli binar format (index.html::decodeMarkers bilan bir xil):
+#   sarlavha '<4sIIII': magic, count, version, flags, valyutalar JSON uzunligi
+#   valyutalar JSON ro'yxati, 8 baytgacha to'ldirilgan
+#   float64 price | uint32 id | int32 lat*1e6 (delta) | int32 lng*1e6 (delta)
+#   uint32 created_at (epoch) | uint8 rooms | uint8 valyuta indeksi
+MAGIC = b'UYM1'
+HEADER = struct.Struct('<4sIIII')
+COORD_SCALE = 1_000_000
+TRUNCATED = 1
+
+MAX_MARKERS = int(os.getenv('MAX_MARKERS', '20000'))
+# bbox shu qadamga kengaytiriladi - yaqin viewportlar bir xil javob (ETag, cache) oladi
+BBOX_SNAP = float(os.getenv('MARKERS_BBOX_SNAP', '0.02'))
+# ETag + encoding -> tayyor (siqilgan) javob
+_payloads = LRUCache(max_size=256, default_ttl=600)
+
+MARKER_COLUMNS = (
+    Listing.id, Listing.latitude, Listing.longitude, Listing.rooms,
+    Listing.price, Listing.currency, Listing.created_at, Listing.grid_cell,
+)
+
+
+def snap_bbox(bbox):
+    south, west, north, east = bbox
+    step = BBOX_SNAP
+    return (
+        round((south // step) * step, 5), round((west // step) * step, 5),
+        round(-((-north) // step) * step, 5), round(-((-east) // step) * step, 5),
+    )
+
+
+def epoch(value):
+    if value is None:
+        return 0
+    # SQLite CURRENT_TIMESTAMP - UTC, tz siz
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return max(int(value.timestamp()), 0)
+
+
+def _deltas(values):
+    previous = 0
+    for value in values:
+        yield value - previous
+        previous = value
+
+
+def encode_markers(rows, version, truncated=False):
+    """(id, lat, lng, rooms, price, currency, created_at, ...) qatorlari -> bytes"""
+    # Yaqin pinlar yonma-yon - koordinata deltalari kichik, gzip yaxshi siqadi
+    rows = sorted(rows, key=lambda row: (row.grid_cell or 0, row.id))
+    currencies = sorted({row.currency or '' for row in rows})
+    codes = {currency: index for index, currency in enumerate(currencies)}
+    table = json.dumps(currencies, ensure_ascii=False).encode()
+    header = HEADER.pack(MAGIC, len(rows), version, TRUNCATED if truncated else 0, len(table)) + table
+    header += b'\0' * (-len(header) % 8)
+
+    columns = [
+        array('d', (float('nan') if row.price is None else row.price for row in rows)),
+        array('I', (row.id for row in rows)),
+        array('i', _deltas(round(row.latitude * COORD_SCALE) for row in rows)),
+        array('i', _deltas(round(row.longitude * COORD_SCALE) for row in rows)),
+        array('I', (epoch(row.created_at) for row in rows)),
+        array('B', (min(max(row.rooms or 0, 0), 255) for row in rows)),
+        array('B', (codes[row.currency or ''] for row in rows)),
+    ]
+    if sys.byteorder == 'big':
+        for column in columns:
+            column.byteswap()
+    return header + b''.join(column.tobytes() for column in columns)
+
+
+def compress(data, coding):
+    if coding == 'br':
+        import brotli  # ixtiyoriy bog'liqlik
+
+        return brotli.compress(data, quality=5)
+    if coding == 'gzip':
+        return gzip.compress(data, compresslevel=6)
+    return data
+
+
+def negotiate(accept_encoding):
+    accept_encoding = accept_encoding.lower()
+    if 'br' in accept_encoding:
+        try:
+            import brotli  # noqa: F401
+            return 'br'
+        except ImportError:
+            pass
+    if 'gzip' in accept_encoding:
+        return 'gzip'
+    return 'identity'
+
+
+def marker_etag(version, filters):
+    """Versiya har bir e'lon o'zgarishida oshadi - ETag qatorlarni o'qimasdan hisoblanadi"""
+    key = [version] + [filters[name] for name in ('bbox', 'rooms', 'min_rooms', 'currency', 'min_price', 'max_price')]
+    return hashlib.blake2b(repr(key).encode(), digest_size=12).hexdigest()
+
+
+async def query_markers(filters):
+    query = apply_filters(select(*MARKER_COLUMNS).where(Listing.is_active == True), filters)
+    async with get_async_db(readonly=True) as db:
+        rows = (await db.execute(query.order_by(Listing.id.desc()).limit(MAX_MARKERS + 1))).all()
+    return rows[:MAX_MARKERS], len(rows) > MAX_MARKERS
+
+
+async def list_markers(request):
+    """Faol e'lonlar pinlari (binar). Batafsil ma'lumot - /api/listings/{id}"""
+    try:
+        filters = parse_filters(request.query)
+    except BadRequest as e:
+        return web.json_response({'success': False, 'error': str(e)}, status=400)
+    if filters['bbox']:
+        filters['bbox'] = snap_bbox(filters['bbox'])
+
+    async with get_async_db(readonly=True) as db:
+        version, _ = await db.run_sync(changes.versions)
+    etag = marker_etag(version, filters)
+    headers = {
+        'ETag': f'W/"{etag}"',
+        'Cache-Control': 'no-cache',
+        'Vary': 'Accept-Encoding',
+    }
+    if any(tag.value == etag for tag in request.if_none_match or ()):
+        return web.Response(status=304, headers=headers)
+
+    coding = negotiate(request.headers.get('Accept-Encoding', ''))
+    found, body = _payloads.get((etag, coding))
+    if not found:
+        found, raw = _payloads.get((etag, 'identity'))
+        if not found:
+            rows, truncated = await query_markers(filters)
+            raw = encode_markers(rows, version, truncated)
+            _payloads.set((etag, 'identity'), raw)
+        body = await asyncio.to_thread(compress, raw, coding) if coding != 'identity' else raw
+        _payloads.set((etag, coding), body)
+
+    if coding != 'identity':
+        headers['Content-Encoding'] = coding
+    return web.Response(body=body, content_type='application/octet-stream', headers=headers)
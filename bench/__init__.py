@@ -0,0 +1 @@
+"""Benchmark va yuklama testlari: python -m bench seed|load|micro"""
@@ -0,0 +1,75 @@
+"""python -m bench seed|load|micro
+
+    python -m bench seed --users 10000 --listings 50000
+    python -m bench load --users 200 --concurrency 50 --latency-ms 20
+    python -m bench load --users 200 --global-rate 100000 --chat-interval 0.001
+    python -m bench micro
+
+DATABASE_URL berilmasa sqlite:///bench.db ishlatiladi (ishchi baza emas).
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m bench')
+    parser.add_argument('--db', default=os.getenv('BENCH_DATABASE_URL', 'sqlite:///bench.db'))
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    seed = commands.add_parser('seed', help="Sintetik foydalanuvchi va e'lonlar")
+    seed.add_argument('--users', type=int, default=10000)
+    seed.add_argument('--listings', type=int, default=50000)
+    seed.add_argument('--seed', type=int, default=0)
+
+    load = commands.add_parser('load', help="Handlerlar orqali update larni o'tkazish")
+    load.add_argument('--users', type=int, default=200, help="Ro'yxatdan o'tadigan yangi foydalanuvchilar")
+    load.add_argument('--concurrency', type=int, default=50)
+    load.add_argument('--latency-ms', type=int, default=0, help="Stub Bot API javob kechikishi")
+    load.add_argument('--rate-limit', action='store_true', help="rate_limit_middleware ni ham yoqish")
+    # Standart - Telegram limitlari (utils.sender); handler throughput ni alohida o'lchash uchun oshiring
+    load.add_argument('--global-rate', help="TELEGRAM_GLOBAL_RATE, xabar/soniya")
+    load.add_argument('--chat-interval', help="TELEGRAM_CHAT_INTERVAL, soniya")
+
+    micro = commands.add_parser('micro', help='Mikrobenchmarklar')
+    micro.add_argument('--number', type=int, default=100000)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv if argv is not None else sys.argv[1:])
+    # config.database import qilinishidan oldin
+    os.environ['DATABASE_URL'] = args.db
+    if args.command == 'load':
+        if args.global_rate:
+            os.environ['TELEGRAM_GLOBAL_RATE'] = args.global_rate
+        if args.chat_interval:
+            os.environ['TELEGRAM_CHAT_INTERVAL'] = args.chat_interval
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.command == 'seed':
+        from bench.seed import seed_database
+
+        if not seed_database(args.users, args.listings, args.seed):
+            print(f"{args.db} allaqachon to'ldirilgan")
+    elif args.command == 'load':
+        from sqlalchemy import func, select
+        from config.database import engine
+        from models.user import User
+        from bench.load import run_load, format_report
+
+        with engine.connect() as conn:
+            # Yangi foydalanuvchilar seed qilinganlar bilan to'qnashmasin
+            first_id = (conn.execute(select(func.max(User.telegram_id))).scalar() or 0) + 1
+        result = asyncio.run(run_load(args.users, args.concurrency, first_id, args.latency_ms, args.rate_limit))
+        print(format_report(result))
+    elif args.command == 'micro':
+        from bench.micro import run_micro, format_report
+
+        print(format_report(run_micro(args.number)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""Sintetik Update larni haqiqiy handlerlar orqali o'tkazadi (lokal Bot API stub ga qarshi)."""
+import asyncio
+import contextvars
+import os
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import event
+from telegram import Update
+from telegram.ext import Application
+
+from bench.stub_api import StubBotAPI, TOKEN
+
+# Hozir ishlayotgan qadam - DB vaqtini shu qadamga yozish uchun
+_step = contextvars.ContextVar('bench_step', default=None)
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Recorder:
+    """Qadam bo'yicha handler va DB vaqtlari"""
+
+    def __init__(self):
+        self.latency = defaultdict(list)
+        self.db_time = defaultdict(float)
+        self.db_queries = defaultdict(int)
+
+    def attach(self, sync_engine, fixed_step=None):
+        @event.listens_for(sync_engine, 'before_cursor_execute')
+        def before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('bench_start', []).append(time.perf_counter())
+
+        @event.listens_for(sync_engine, 'after_cursor_execute')
+        def after(conn, cursor, statement, parameters, context, executemany):
+            step = fixed_step or _step.get() or 'other'
+            self.db_time[step] += time.perf_counter() - conn.info['bench_start'].pop()
+            self.db_queries[step] += 1
+
+
+def user_script(telegram_id):
+    """Bitta foydalanuvchi sessiyasi: ro'yxatdan o'tish, e'lon berish, e'lonlarni ko'rish"""
+    lat, lng = 41.3 + telegram_id % 100 / 1000, 69.25 + telegram_id % 73 / 1000
+    photo = [{'file_id': f"bench-{telegram_id}", 'file_unique_id': f"u{telegram_id}", 'width': 1280, 'height': 960}]
+    return [
+        ('start', {'text': '/start', 'entities': [{'type': 'bot_command', 'offset': 0, 'length': 6}]}),
+        ('language', {'text': 'UZ 🇺🇿'}),
+        ('phone', {'contact': {'phone_number': f"+99890{telegram_id:07d}", 'first_name': 'Bench', 'user_id': telegram_id}}),
+        ('location', {'location': {'latitude': lat, 'longitude': lng}}),
+        ('listing_start', {'text': '🏠 Elon Berish'}),
+        ('title', {'text': 'Chilonzor kvartira sotiladi'}),
+        ('rooms', {'text': '3'}),
+        ('floor', {'text': '2'}),
+        ('total_floors', {'text': '9'}),
+        ('price', {'text': '50000'}),
+        ('currency', {'text': 'USD'}),
+        ('images', {'photo': photo}),
+        ('listing_location', {'location': {'latitude': lat, 'longitude': lng}}),
+        ('confirm', {'text': '✅ Tasdiqlash'}),
+        ('my_listings', {'text': '📋 Mening elonlarim'}),
+    ]
+
+
+def make_update(bot, update_id, telegram_id, message):
+    user = {'id': telegram_id, 'is_bot': False, 'first_name': 'Bench'}
+    data = {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(datetime.now().timestamp()),
+            'chat': {'id': telegram_id, 'type': 'private'},
+            'from': user,
+            **message,
+        },
+    }
+    return Update.de_json(data, bot)
+
+
+def build_application(base_url, persistence_path, rate_limit=False):
+    from bot.app import add_handlers
+    from utils.persistence import SQLitePersistence
+
+    application = (
+        Application.builder()
+        .token(TOKEN)
+        .base_url(base_url)
+        .updater(None)
+        .connection_pool_size(64)
+        .persistence(SQLitePersistence(persistence_path))
+        .build()
+    )
+    if rate_limit:
+        from utils.rate_limiter import install_rate_limit
+        install_rate_limit(application)
+    add_handlers(application)
+    return application
+
+
+async def run_user(application, recorder, telegram_id, update_ids):
+    for step, message in user_script(telegram_id):
+        update = make_update(application.bot, next(update_ids), telegram_id, message)
+        token = _step.set(step)
+        start = time.perf_counter()
+        try:
+            await application.process_update(update)
+        finally:
+            recorder.latency[step].append(time.perf_counter() - start)
+            _step.reset(token)
+
+
+async def run_load(users, concurrency, first_id, latency_ms=0, rate_limit=False):
+    """users ta yangi foydalanuvchi (telegram_id first_id dan) concurrency tadan parallel"""
+    import itertools
+    from config.database import async_engine, async_read_engine
+    from utils.sender import outbox
+    from utils.write_queue import write_queue
+
+    recorder = Recorder()
+    if async_read_engine is not async_engine:
+        recorder.attach(async_read_engine.sync_engine)
+        # Yozuvlar write_queue ning o'z taskida batch bo'lib ketadi
+        recorder.attach(async_engine.sync_engine, fixed_step='write_queue')
+    else:
+        recorder.attach(async_engine.sync_engine)
+
+    stub = StubBotAPI(latency_ms)
+    base_url = await stub.start()
+    state_dir = tempfile.mkdtemp(prefix='bench-state-')
+    application = build_application(base_url, os.path.join(state_dir, 'state.db'), rate_limit)
+    update_ids = itertools.count(1)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def guarded(telegram_id):
+        async with semaphore:
+            await run_user(application, recorder, telegram_id, update_ids)
+
+    await application.initialize()
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(guarded(first_id + i) for i in range(users)))
+        elapsed = time.perf_counter() - started
+        drain_start = time.perf_counter()
+        await write_queue.close()
+        await outbox.close()
+        drain = time.perf_counter() - drain_start
+    finally:
+        await application.shutdown()
+        await stub.stop()
+
+    return {
+        'users': users,
+        'updates': sum(len(v) for v in recorder.latency.values()),
+        'elapsed': elapsed,
+        'drain': drain,
+        'recorder': recorder,
+        'api_calls': dict(stub.calls),
+    }
+
+
+def format_report(result):
+    recorder = result['recorder']
+    lines = [
+        f"{result['users']} foydalanuvchi, {result['updates']} update, {result['elapsed']:.2f}s "
+        f"({result['updates'] / result['elapsed']:.0f} update/s), outbox/write_queue drain {result['drain']:.2f}s",
+        f"{'step':<18}{'n':>6}{'p50 ms':>10}{'p99 ms':>10}{'db ms/upd':>11}{'q/upd':>7}",
+    ]
+    for step, values in recorder.latency.items():
+        n = len(values)
+        lines.append(
+            f"{step:<18}{n:>6}{percentile(values, 0.5) * 1000:>10.2f}{percentile(values, 0.99) * 1000:>10.2f}"
+            f"{recorder.db_time[step] * 1000 / n:>11.2f}{recorder.db_queries[step] / n:>7.1f}"
+        )
+    for step in recorder.db_time.keys() - recorder.latency.keys():
+        lines.append(f"{step:<18}{'':>26}db {recorder.db_time[step] * 1000:.1f} ms jami, {recorder.db_queries[step]} so'rov")
+    lines.append("Bot API: " + ", ".join(f"{method}={count}" for method, count in sorted(result['api_calls'].items())))
+    return "\n".join(lines)
@@ -0,0 +1,93 @@
+"""Mikrobenchmarklar: cache, rate limiter va e'lon serializatsiyasi (ns/op)."""
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+
+
+def timeit(func, number):
+    start = time.perf_counter_ns()
+    for _ in range(number):
+        func()
+    return (time.perf_counter_ns() - start) / number
+
+
+def sample_listing(listing_id):
+    from models.user import Listing
+
+    listing = Listing(
+        id=listing_id, user_id=listing_id % 1000, title="Chilonzor 3 xonali kvartira",
+        description="Ta'mirlangan, metro yaqinida", rooms=3, floor=2, total_floors=9,
+        price=50000, currency='USD', images='["a", "b"]', phone='+998901234567',
+        is_active=True, created_at=datetime(2026, 1, 1), expires_at=datetime(2026, 1, 1) + timedelta(days=30),
+    )
+    listing.set_location("41.311081, 69.240562")
+    return listing
+
+
+def bench_cache(number):
+    from utils.cache import LRUCache, cache
+
+    lru = LRUCache(max_size=10000)
+    for i in range(10000):
+        lru.set(('k', i), i)
+    results = {
+        'LRUCache.get hit': timeit(lambda: lru.get(('k', 5000)), number),
+        'LRUCache.get miss': timeit(lambda: lru.get(('missing', 1)), number),
+        'LRUCache.set': timeit(lambda: lru.set(('k', 1), 1, tags=('user:1',)), number),
+    }
+
+    @cache(ttl=60)
+    async def cached(user_id, page):
+        return user_id, page
+
+    async def run():
+        await cached(1, 0)
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            await cached(1, 0)
+        return (time.perf_counter_ns() - start) / number
+
+    results['@cache async hit'] = asyncio.run(run())
+    return results
+
+
+def bench_rate_limiter(number):
+    from utils.rate_limiter import RateLimiter, MemoryStore
+
+    limiter = RateLimiter(MemoryStore(), limits={'default': (10 ** 9, 60)})
+    ids = iter(range(number * 2))
+    return {
+        'RateLimiter.check (memory, 1 key)': timeit(lambda: limiter.check(1), number),
+        'RateLimiter.check (memory, new keys)': timeit(lambda: limiter.check(next(ids)), number),
+    }
+
+
+def bench_serialisation(number):
+    from api.listings import listing_to_dict
+    from utils.persistence import encode_user_data
+
+    listing = sample_listing(1)
+    page = [sample_listing(i) for i in range(100)]
+    draft = {'title': listing.title, 'rooms': 3, 'floor': 2, 'total_floors': 9, 'price': 50000,
+             'currency': 'USD', 'images': ['AgACAgIAAxkBAAI'] * 3, 'image_uids': ['AQADxx'] * 3}
+    return {
+        'listing_to_dict': timeit(lambda: listing_to_dict(listing, 'ab' * 32), number),
+        'json.dumps 100 listing sahifa': timeit(
+            lambda: json.dumps([listing_to_dict(item) for item in page], ensure_ascii=False), max(number // 100, 1)
+        ),
+        'Listing.snapshot': timeit(listing.snapshot, number),
+        'encode_user_data (draft)': timeit(lambda: encode_user_data(draft), number),
+    }
+
+
+def run_micro(number=100000):
+    results = {}
+    for group in (bench_cache, bench_rate_limiter, bench_serialisation):
+        results.update(group(number))
+    return results
+
+
+def format_report(results):
+    width = max(len(name) for name in results)
+    return "\n".join(f"{name:<{width}}  {ns:>10.0f} ns/op" for name, ns in results.items())
@@ -0,0 +1,72 @@
+"""Sintetik SQLite baza: N foydalanuvchi va M e'lon (Toshkent atrofida)."""
+import json
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, select
+
+# Toshkent bbox
+SOUTH, WEST, NORTH, EAST = 41.20, 69.10, 41.40, 69.40
+WORDS = ['kvartira', 'hovli', 'sotiladi', 'ijara', 'Chilonzor', 'Yunusobod', 'metro', "ta'mirlangan", 'yangi']
+CHUNK = 5000
+
+
+def random_listing(rng, user_id, now):
+    lat = rng.uniform(SOUTH, NORTH)
+    lng = rng.uniform(WEST, EAST)
+    currency = rng.choice(['USD', 'USD', "SO'M"])
+    price = rng.randint(20, 200) * 1000 if currency == 'USD' else rng.randint(200, 2500) * 1_000_000
+    created_at = now - timedelta(days=rng.randint(0, 29))
+    return {
+        'user_id': user_id,
+        'title': ' '.join(rng.sample(WORDS, 3)),
+        'description': ' '.join(rng.sample(WORDS, 5)),
+        'rooms': rng.randint(1, 6),
+        'floor': rng.randint(1, 9),
+        'total_floors': 9,
+        'price': price,
+        'currency': currency,
+        'images': json.dumps([f"seed-{rng.getrandbits(48):x}" for _ in range(rng.randint(0, 3))]),
+        'location': f"{lat:.6f}, {lng:.6f}",
+        'phone': f"+99890{rng.randint(1000000, 9999999)}",
+        'is_active': True,
+        'created_at': created_at,
+        'expires_at': created_at + timedelta(days=30),
+    }
+
+
+def seed_database(users, listings, seed=0):
+    """Bo'sh bazani to'ldiradi va migratsiyalar bilan hosila jadvallarni quradi.
+
+    Baza allaqachon to'ldirilgan bo'lsa hech narsa qilmaydi. Foydalanuvchilarning
+    telegram_id lari 1..users.
+    """
+    import migrations
+    import models.cluster, models.image, models.stats  # noqa: F401 - jadvallar metadata ga
+    from config.database import Base, engine
+    from models.user import User, Listing
+    from utils.geo import parse_location, grid_cell
+
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        if conn.execute(select(func.count()).select_from(User)).scalar():
+            return False
+
+    rng = random.Random(seed)
+    now = datetime.now()
+    with engine.begin() as conn:
+        for start in range(0, users, CHUNK):
+            conn.execute(insert(User), [
+                {'telegram_id': i, 'phone': f"+99891{i:07d}", 'location': None, 'language': 'uz', 'created_at': now}
+                for i in range(start + 1, min(start + CHUNK, users) + 1)
+            ])
+        for start in range(0, listings, CHUNK):
+            rows = []
+            for _ in range(min(CHUNK, listings - start)):
+                row = random_listing(rng, rng.randint(1, max(users, 1)), now)
+                lat, lng = parse_location(row['location'])
+                row.update(latitude=lat, longitude=lng, grid_cell=grid_cell(lat, lng))
+                rows.append(row)
+            conn.execute(insert(Listing), rows)
+
+    migrations.run_all(engine)
+    return True
@@ -0,0 +1,59 @@
+"""Lokal Bot API stub: /bot<token>/<method> ga Telegram javob formatida javob beradi."""
+import asyncio
+import itertools
+import json
+import time
+from aiohttp import web
+
+TOKEN = '123456:BENCHMARK'
+
+
+class StubBotAPI:
+    def __init__(self, latency_ms=0):
+        self.latency = latency_ms / 1000
+        self.calls = {}
+        self._message_ids = itertools.count(1)
+        self._runner = None
+        self.port = None
+
+    def _message(self, chat_id, **extra):
+        return {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': int(chat_id), 'type': 'private'},
+            **extra,
+        }
+
+    async def handle(self, request):
+        method = request.match_info['method']
+        self.calls[method] = self.calls.get(method, 0) + 1
+        params = dict(await request.post()) if request.can_read_body else {}
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method == 'getMe':
+            result = {'id': 1, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+        elif method in ('sendMessage', 'editMessageText', 'sendPhoto'):
+            result = self._message(params.get('chat_id', 0), text=params.get('text', ''))
+        elif method == 'sendMediaGroup':
+            media = json.loads(params.get('media', '[]'))
+            result = [self._message(params.get('chat_id', 0)) for _ in media]
+        elif method == 'getFile':
+            result = {'file_id': params.get('file_id'), 'file_unique_id': 'u', 'file_path': 'photos/x.jpg'}
+        else:
+            result = True
+        return web.json_response({'ok': True, 'result': result})
+
+    async def start(self, host='127.0.0.1', port=0):
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{self.port}/bot"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
@@ -0,0 +1,87 @@
+import logging
+import os
+from telegram import Update
+from telegram.ext import Application, CommandHandler, MessageHandler, filters
+from handlers.admin import admin_stats
+from handlers.listing import listing_conversation
+from handlers.my_listings import show_my_listings, my_listings_pagination_handler, my_listing_images_handler
+from handlers.nearby import show_nearby_listings
+from handlers.search import search_conversation, search_pagination_handler
+from handlers.start import start_handler
+from jobs.expiry import register_jobs as register_expiry_jobs
+from jobs.images import register_image_jobs
+from jobs.rates import register_rate_jobs
+from jobs.snapshot import register_snapshot_jobs
+from utils.metrics import start_metrics_server
+from utils.persistence import SQLitePersistence
+from utils.rate_limiter import install_rate_limit
+from utils.sender import outbox
+from utils.write_queue import write_queue
+
+logger = logging.getLogger(__name__)
+
+# JobQueue bo'lmasa (python-telegram-bot[job-queue] o'rnatilmagan) bular alohida
+# jarayon sifatida ishlaydi: python -m jobs.expiry --loop va h.k.
+JOB_REGISTRATIONS = (register_expiry_jobs, register_image_jobs, register_rate_jobs, register_snapshot_jobs)
+
+_metrics_runner = None
+
+
+def add_handlers(application):
+    """Barcha handlerlar; persistent=True suhbatlar Application da persistence talab qiladi"""
+    application.add_handler(start_handler)
+    application.add_handler(listing_conversation)
+    application.add_handler(search_conversation)
+    application.add_handler(search_pagination_handler)
+    application.add_handler(MessageHandler(filters.Regex("^📋 Mening elonlarim$"), show_my_listings))
+    application.add_handler(my_listings_pagination_handler)
+    application.add_handler(my_listing_images_handler)
+    application.add_handler(MessageHandler(filters.Regex("^📍 Yaqinimdagi uylar$"), show_nearby_listings))
+    application.add_handler(CommandHandler('stats', admin_stats))
+
+
+async def _post_init(application):
+    global _metrics_runner
+    # METRICS_HOST:METRICS_PORT/metrics (API jarayoni o'zinikini beradi)
+    _metrics_runner = await start_metrics_server()
+
+
+async def _post_stop(application):
+    # Bot API mijozi yopilishidan oldin navbatdagi yozuv va xabarlarni tugatamiz
+    await write_queue.close()
+    await outbox.close()
+
+
+async def _post_shutdown(application):
+    if _metrics_runner is not None:
+        await _metrics_runner.cleanup()
+
+
+def build_application(token=None, persistence=None):
+    """Handlerlar, rate limit, persistence va fon vazifalari ulangan Application"""
+    application = (
+        Application.builder()
+        .token(token or os.environ['BOT_TOKEN'])
+        .persistence(persistence or SQLitePersistence())
+        .post_init(_post_init)
+        .post_stop(_post_stop)
+        .post_shutdown(_post_shutdown)
+        .build()
+    )
+    install_rate_limit(application)
+    add_handlers(application)
+    if application.job_queue is None:
+        logger.warning("JobQueue yo'q - fon vazifalarini alohida ishga tushiring (python -m jobs.expiry --loop ...)")
+    else:
+        for register in JOB_REGISTRATIONS:
+            register(application)
+    return application
+
+
+def main():
+    from config.database import engine
+    from migrations import run_all
+
+    logging.basicConfig(level=logging.INFO)
+    run_all(engine)
+    build_application().run_polling(allowed_updates=Update.ALL_TYPES)
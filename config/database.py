@@ -1,26 +1,217 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+import time
+from contextlib import asynccontextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import declarative_base, sessionmaker
 from sqlalchemy.pool import StaticPool
 from dotenv import load_dotenv
+from utils.metrics import Gauge, db_query_latency
 
 load_dotenv()
 
-# SQLite uchun optimallashtirilgan sozlamalar
-engine = create_engine(
-    os.getenv('DATABASE_URL', 'sqlite:///bot.db'),
-    poolclass=StaticPool,
-    connect_args={'check_same_thread': False},
-    echo=False  # Debug ni o'chirish
-)
+DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///bot.db')
+
+# Async drayverlar: sync URL dan avtomatik olinadi
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'postgres': 'postgresql+asyncpg',
+}
+
+
+def to_async_url(url):
+    scheme, sep, rest = url.partition('://')
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL', to_async_url(DATABASE_URL))
+
+# SQLite sozlamalari
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000')),
+    'temp_store': 'MEMORY',
+}
+SQLITE_READ_POOL_SIZE = int(os.getenv('SQLITE_READ_POOL_SIZE', '5'))
+
+# Postgres (va boshqa server DB lar) uchun pool
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+
+
+class PoolStats:
+    """Pool checkout va kutish vaqti metrikalari"""
+
+    def __init__(self, name):
+        self.name = name
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.waits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds):
+        self.waits += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+    def as_dict(self):
+        return {
+            'connects': self.connects,
+            'checkouts': self.checkouts,
+            'checked_out': self.checkouts - self.checkins,
+            'wait_avg_ms': self.wait_total / self.waits * 1000 if self.waits else 0.0,
+            'wait_max_ms': self.wait_max * 1000,
+        }
+
+
+pool_metrics = {}
+
+
+def _is_memory_sqlite(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def _engine_options(url, role):
+    """Backend va rolga (writer/reader) qarab pool sozlamalari"""
+    if url.get_backend_name() == 'sqlite':
+        if _is_memory_sqlite(url):
+            # :memory: bazani bitta ulanish ushlab turadi
+            return {'poolclass': StaticPool, 'connect_args': {'check_same_thread': False}}
+        # WAL: bitta yozuvchi ulanish, o'quvchilar uchun alohida pool
+        return {
+            'pool_size': 1 if role == 'writer' else SQLITE_READ_POOL_SIZE,
+            'max_overflow': 0,
+            'pool_timeout': DB_POOL_TIMEOUT,
+            'connect_args': {'check_same_thread': False},
+        }
+    return {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': True,
+    }
+
+
+def _instrument(sync_engine, name, is_sqlite):
+    stats = pool_metrics.setdefault(name, PoolStats(name))
+
+    @event.listens_for(sync_engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        stats.connects += 1
+        if is_sqlite:
+            cursor = dbapi_connection.cursor()
+            for pragma, value in SQLITE_PRAGMAS.items():
+                cursor.execute(f"PRAGMA {pragma}={value}")
+            cursor.close()
+
+    @event.listens_for(sync_engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.checkouts += 1
+
+    @event.listens_for(sync_engine, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        stats.checkins += 1
+
+    @event.listens_for(sync_engine, 'before_cursor_execute')
+    def on_before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, 'after_cursor_execute')
+    def on_after_execute(conn, cursor, statement, parameters, context, executemany):
+        db_query_latency.observe(time.perf_counter() - conn.info['query_start'].pop(), name)
+
+
+def create_db_engine(url=DATABASE_URL, role='writer', name=None):
+    """Sync engine: pool backend va rolga qarab tanlanadi"""
+    sa_url = make_url(url)
+    engine = create_engine(sa_url, echo=False, **_engine_options(sa_url, role))
+    _instrument(engine, name or f"sync_{role}", sa_url.get_backend_name() == 'sqlite')
+    return engine
+
+
+def create_async_db_engine(url=ASYNC_DATABASE_URL, role='writer', name=None):
+    """Async engine: create_db_engine bilan bir xil siyosat"""
+    sa_url = make_url(url)
+    engine = create_async_engine(sa_url, echo=False, **_engine_options(sa_url, role))
+    _instrument(engine.sync_engine, name or f"async_{role}", sa_url.get_backend_name() == 'sqlite')
+    return engine
+
+
+def _separate_reader(url):
+    # Faqat fayldagi SQLite uchun alohida o'quvchi pool ma'noli
+    sa_url = make_url(url)
+    return sa_url.get_backend_name() == 'sqlite' and not _is_memory_sqlite(sa_url)
+
+
+engine = create_db_engine(DATABASE_URL, role='writer')
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Handlerlar uchun - event loop ni bloklamaydi
+async_engine = create_async_db_engine(ASYNC_DATABASE_URL, role='writer')
+async_read_engine = (
+    create_async_db_engine(ASYNC_DATABASE_URL, role='reader')
+    if _separate_reader(ASYNC_DATABASE_URL) else async_engine
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
+
+def _checked_out():
+    return {(name, ): stats.checkouts - stats.checkins for name, stats in pool_metrics.items()}
+
+
+Gauge('db_pool_checked_out', 'Connections currently checked out', _checked_out, ['engine'])
+
+
+def pool_stats():
+    """Barcha engine pool lari uchun metrikalar"""
+    engines = {
+        'sync_writer': engine,
+        'async_writer': async_engine.sync_engine,
+        'async_reader': async_read_engine.sync_engine,
+    }
+    result = {}
+    for name, stats in pool_metrics.items():
+        data = stats.as_dict()
+        if name in engines:
+            data['status'] = engines[name].pool.status()
+        result[name] = data
+    return result
+
+
 def get_db():
     db = SessionLocal()
     try:
+        start = time.perf_counter()
+        db.connection()
+        pool_metrics['sync_writer'].record_wait(time.perf_counter() - start)
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+@asynccontextmanager
+async def get_async_db(readonly=False):
+    """async with get_async_db() as db: ...
+
+    readonly=True - o'qish uchun alohida pool (SQLite WAL da yozuvchini bloklamaydi).
+    """
+    if readonly:
+        factory, stats = AsyncReadSessionLocal, pool_metrics.get('async_reader', pool_metrics['async_writer'])
+    else:
+        factory, stats = AsyncSessionLocal, pool_metrics['async_writer']
+    async with factory() as db:
+        start = time.perf_counter()
+        await db.connection()
+        stats.record_wait(time.perf_counter() - start)
+        yield db
@@ -1,29 +1,50 @@
 from telegram import Update
 from telegram.ext import ContextTypes
-from config.database import SessionLocal
-from models.user import User, Listing
+from config.database import get_async_db
+from utils import stats
+from utils.monitoring import monitor_performance
+from utils.sender import reply_text
 import os
 
+def format_trend(summary, metric):
+    values = summary['trend'].get(metric, {})
+    return " ".join(str(values.get(day, 0)) for day in summary['days'])
+
+
+def format_stats(summary):
+    lines = [
+        "📊 Bot Statistikasi:\n",
+        f"👥 Jami foydalanuvchilar: {summary['users']}",
+        f"🏠 Jami e'lonlar: {summary['listings']}",
+        f"✅ Faol e'lonlar: {summary['active_listings']}",
+        "",
+        f"📈 Oxirgi {len(summary['days'])} kun ({summary['days'][0]:%d.%m} - {summary['days'][-1]:%d.%m}):",
+        f"👥 Yangi foydalanuvchilar: {format_trend(summary, 'new_users')}",
+        f"🏠 Yangi e'lonlar: {format_trend(summary, 'new_listings')}",
+        f"⌛ Muddati tugagan: {format_trend(summary, 'expired_listings')}",
+    ]
+    top = summary['top']
+    if top['rooms']:
+        lines += ["", "🏠 Xonalar bo'yicha:"] + [f"• {bucket} xonali: {count}" for bucket, count in top['rooms']]
+    if top['price_band']:
+        lines += ["", "💰 Narx oraliqlari:"] + [f"• {bucket}: {count}" for bucket, count in top['price_band']]
+    if top['district']:
+        lines += ["", "📍 Eng faol hududlar:"]
+        for bucket, count in top['district']:
+            lat, lng = stats.district_center(bucket)
+            lines.append(f"• {lat:.3f}, {lng:.3f}: {count}")
+    return "\n".join(lines)
+
+
+@monitor_performance
 async def admin_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Check if user is admin
     if update.effective_user.id != int(os.getenv('ADMIN_ID')):
-        await update.message.reply_text("❌ Siz admin emassiz!")
+        reply_text(update, "❌ Siz admin emassiz!")
         return
     
-    db = SessionLocal()
-    try:
-        # Get statistics
-        total_users = db.query(User).count()
-        total_listings = db.query(Listing).count()
-        active_listings = db.query(Listing).filter(Listing.is_active == True).count()
-        
-        stats_text = (
-            "📊 Bot Statistikasi:\n\n"
-            f"👥 Jami foydalanuvchilar: {total_users}\n"
-            f"🏠 Jami e'lonlar: {total_listings}\n"
-            f"✅ Faol e'lonlar: {active_listings}"
-        )
-        
-        await update.message.reply_text(stats_text)
-    finally:
-        db.close()
\ No newline at end of file
+    # Oldindan hisoblangan hisoblagichlar - COUNT(*) skanlarsiz
+    async with get_async_db(readonly=True) as db:
+        summary = await db.run_sync(stats.get_stats)
+    
+    reply_text(update, format_stats(summary))
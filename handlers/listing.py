@@ -1,21 +1,37 @@
-from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
+from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove, InputMediaPhoto
 from telegram.ext import ContextTypes, ConversationHandler, MessageHandler, filters
 from datetime import datetime, timedelta
+import asyncio
 import json
-from config.database import SessionLocal
-from models.user import User, Listing
+import os
+from sqlalchemy import select
+from config.database import get_async_db
+from models.user import User
 from handlers.start import show_main_menu
+from handlers.my_listings import invalidate_user_listings
+from utils.write_queue import insert_listing
+from utils.currency import parse_currency
+from utils.monitoring import monitor_performance
+from utils.sender import reply_text, reply_media_group, reply_photo
 
 # Listing conversation states
 TITLE, ROOMS, FLOOR, TOTAL_FLOORS, PRICE, CURRENCY, IMAGES, LOCATION, CONFIRM = range(9)
 
+MAX_IMAGES = 6
+# Bir media_group_id dagi rasmlar shu oyna ichida yig'iladi
+ALBUM_WINDOW_MS = int(os.getenv('ALBUM_WINDOW_MS', '500'))
+# (telegram_id, media_group_id) -> yig'ilayotgan PhotoSize lar
+_albums = {}
+
+@monitor_performance
 async def start_listing(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.message.reply_text(
+    reply_text(update,
         "Elon berish\n\nSarlavha Qisqacha\nMasalan Olmazor tumanida Kvartira yoki Xovli Sotiladi..?",
         reply_markup=ReplyKeyboardRemove()
     )
     return TITLE
 
+@monitor_performance
 async def handle_title(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data['title'] = update.message.text
     
@@ -23,12 +39,13 @@ async def handle_title(update: Update, context: ContextTypes.DEFAULT_TYPE):
     rooms_keyboard = [[str(i)] for i in range(1, 11)]
     reply_markup = ReplyKeyboardMarkup(rooms_keyboard, one_time_keyboard=True, resize_keyboard=True)
     
-    await update.message.reply_text(
+    reply_text(update,
         "Xonalar soni kiriting\n1dan 10tagacha",
         reply_markup=reply_markup
     )
     return ROOMS
 
+@monitor_performance
 async def handle_rooms(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data['rooms'] = int(update.message.text)
     
@@ -36,12 +53,13 @@ async def handle_rooms(update: Update, context: ContextTypes.DEFAULT_TYPE):
     floor_keyboard = [[str(i)] for i in range(1, 23)]
     reply_markup = ReplyKeyboardMarkup(floor_keyboard, one_time_keyboard=True, resize_keyboard=True)
     
-    await update.message.reply_text(
+    reply_text(update,
         "🏠 Xonadon Joylash qavat\n1dan 22gacha",
         reply_markup=reply_markup
     )
     return FLOOR
 
+@monitor_performance
 async def handle_floor(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data['floor'] = int(update.message.text)
     
@@ -49,22 +67,24 @@ async def handle_floor(update: Update, context: ContextTypes.DEFAULT_TYPE):
     total_floors_keyboard = [[str(i)] for i in range(1, 23)]
     reply_markup = ReplyKeyboardMarkup(total_floors_keyboard, one_time_keyboard=True, resize_keyboard=True)
     
-    await update.message.reply_text(
+    reply_text(update,
         "🏢 Jami qavatlar 1dan 22gacha",
         reply_markup=reply_markup
     )
     return TOTAL_FLOORS
 
+@monitor_performance
 async def handle_total_floors(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data['total_floors'] = int(update.message.text)
     
-    await update.message.reply_text(
+    reply_text(update,
         "💰 Narxni kiriting:\n\n"
         "ℹ️ Faqat raqamlarda kiriting",
         reply_markup=ReplyKeyboardRemove()
     )
     return PRICE
 
+@monitor_performance
 async def handle_price(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         price = int(update.message.text)
@@ -73,55 +93,116 @@ async def handle_price(update: Update, context: ContextTypes.DEFAULT_TYPE):
         currency_keyboard = [["USD", "SO'M"]]
         reply_markup = ReplyKeyboardMarkup(currency_keyboard, one_time_keyboard=True, resize_keyboard=True)
         
-        await update.message.reply_text(
+        reply_text(update,
             "💵 Valyutani tanlang: USD SO'M",
             reply_markup=reply_markup
         )
         return CURRENCY
     except ValueError:
-        await update.message.reply_text("❌ Iltimos, faqat raqamlarda kiriting!")
+        reply_text(update, "❌ Iltimos, faqat raqamlarda kiriting!")
         return PRICE
 
+@monitor_performance
 async def handle_currency(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    context.user_data['currency'] = update.message.text
+    currency = parse_currency(update.message.text)
+    if currency is None:
+        reply_text(update, "❌ Iltimos, valyutani tugmadan tanlang!")
+        return CURRENCY
+    context.user_data['currency'] = currency.value
     context.user_data['images'] = []
+    context.user_data['image_uids'] = []
     
-    await update.message.reply_text(
+    reply_text(update,
         "🖼️ Rasm yuklang (maksimum 6 ta)\n\n"
         "ℹ️ Bir nechta rasm yuklash uchun bir vaqtning o'zida bir nechtasini tanlang",
         reply_markup=ReplyKeyboardRemove()
     )
     return IMAGES
 
-async def handle_images(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if update.message.photo:
-        photo = update.message.photo[-1]
-        context.user_data['images'].append(photo.file_id)
-        
-        remaining = 6 - len(context.user_data['images'])
-        
-        if remaining > 0:
-            await update.message.reply_text(
-                f"✅ Rasm qo'shildi. Yana {remaining} ta rasm yuklashingiz mumkin."
-            )
-            return IMAGES
-        else:
-            await update.message.reply_text("✅ Barcha 6 ta rasm muvaffaqiyatli yuklandi!")
-            
-            # Request location for listing
-            await update.message.reply_text(
-                "📍 E'lon joylashuvini yuboring:",
-                reply_markup=ReplyKeyboardMarkup(
-                    [[{"text": "📍 Joylashuvni yuborish", "request_location": True}]],
-                    one_time_keyboard=True,
-                    resize_keyboard=True
-                )
-            )
-            return LOCATION
+def location_keyboard():
+    return ReplyKeyboardMarkup(
+        [[{"text": "📍 Joylashuvni yuborish", "request_location": True}]],
+        one_time_keyboard=True,
+        resize_keyboard=True
+    )
+
+def images_full(user_data):
+    return len(user_data.get('images', [])) >= MAX_IMAGES
+
+def add_images(user_data, photos):
+    """Rasmlarni qoralamaga qo'shadi (file_unique_id bo'yicha takrorlarsiz, MAX_IMAGES gacha)"""
+    images = user_data.setdefault('images', [])
+    seen = user_data.setdefault('image_uids', [])
+    added = 0
+    for photo in photos:
+        if len(images) >= MAX_IMAGES:
+            break
+        if photo.file_unique_id in seen:
+            continue
+        images.append(photo.file_id)
+        seen.append(photo.file_unique_id)
+        added += 1
+    return added
+
+def acknowledge_images(update, user_data, added):
+    remaining = MAX_IMAGES - len(user_data['images'])
+    if remaining <= 0 and not added:
+        text = (
+            f"⚠️ Maksimum {MAX_IMAGES} ta rasm yuklangan, boshqa rasm qo'shilmaydi.\n\n"
+            "📍 E'lon joylashuvini yuboring:"
+        )
+    elif remaining <= 0:
+        text = f"✅ Barcha {MAX_IMAGES} ta rasm muvaffaqiyatli yuklandi!\n\n📍 E'lon joylashuvini yuboring:"
+    elif added:
+        text = (
+            f"✅ {added} ta rasm qo'shildi. Yana {remaining} ta rasm yuklashingiz mumkin.\n\n"
+            "📍 Yoki e'lon joylashuvini yuboring:"
+        )
     else:
-        await update.message.reply_text("❌ Iltimos, rasm yuboring!")
+        text = "ℹ️ Bu rasmlar allaqachon qo'shilgan."
+    reply_text(update, text, reply_markup=location_keyboard())
+
+async def flush_album(key, update, context):
+    """Album oynasi tugagach barcha rasmlarni bitta batch sifatida qo'shadi"""
+    await asyncio.sleep(ALBUM_WINDOW_MS / 1000)
+    photos = _albums.pop(key, [])
+    added = add_images(context.user_data, photos)
+    # Handler tashqarisida o'zgardi - persistence ga yozilishi uchun belgilaymiz
+    if context.application is not None and context.application.persistence is not None:
+        context.application.mark_data_for_update_persistence(user_ids=update.effective_user.id)
+    acknowledge_images(update, context.user_data, added)
+
+@monitor_performance
+async def handle_images(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not update.message.photo:
+        reply_text(update, "❌ Iltimos, rasm yuboring!")
         return IMAGES
 
+    photo = update.message.photo[-1]
+    group_id = update.message.media_group_id
+    if group_id:
+        # Album: har bir rasm alohida update bo'lib keladi - oyna davomida yig'amiz
+        key = (update.effective_user.id, group_id)
+        if key not in _albums:
+            _albums[key] = []
+            # Application task ni kuzatadi, xatolar error handler larga boradi
+            context.application.create_task(flush_album(key, update, context), update=update)
+        _albums[key].append(photo)
+        return LOCATION if images_full(context.user_data) else IMAGES
+
+    added = add_images(context.user_data, [photo])
+    acknowledge_images(update, context.user_data, added)
+    return LOCATION if images_full(context.user_data) else IMAGES
+
+@monitor_performance
+async def handle_images_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """IMAGES holatidagi matn: album limitni fonda to'ldirgan bo'lsa - bu joylashuv"""
+    if images_full(context.user_data):
+        return await handle_location_listing(update, context)
+    reply_text(update, "❌ Iltimos, rasm yuboring yoki 📍 joylashuvni tugma orqali yuboring!")
+    return IMAGES
+
+@monitor_performance
 async def handle_location_listing(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if update.message.location:
         location = f"{update.message.location.latitude}, {update.message.location.longitude}"
@@ -131,126 +212,101 @@ async def handle_location_listing(update: Update, context: ContextTypes.DEFAULT_
     context.user_data['location'] = location
     
     # Get user phone from database
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter(User.telegram_id == update.effective_user.id).first()
-        context.user_data['phone'] = user.phone
+    async with get_async_db(readonly=True) as db:
+        user = await db.scalar(select(User).where(User.telegram_id == update.effective_user.id))
+    context.user_data['phone'] = user.phone
+    
+    # Show confirmation
+    description = context.user_data.get('description', "Holati zo'r Hamma sharoitlar bor")
+    
+    listing_info = "📋 E'lon ma'lumotlari:\n\n"
+    listing_info += f"📝 Sarlavha: {context.user_data['title']}\n"
+    listing_info += f"📄 Tavsif: {description}\n"
+    listing_info += f"🏠 Xonalar: {context.user_data['rooms']} ta\n"
+    listing_info += f"🏢 Qavat: {context.user_data['floor']}/{context.user_data['total_floors']}\n"
+    listing_info += f"💰 Narx: {context.user_data['price']} {context.user_data['currency']}\n"
+    listing_info += f"🖼️ Rasmlar: {len(context.user_data['images'])} ta\n"
+    listing_info += f"📞 Telefon raqamingiz {context.user_data['phone']}\n\n"
+    listing_info += "⚠️ Ogohlantirish:\n\n"
+    listing_info += "E'loningiz 30 kundan keyin avtomatik ravishda nofaol holatga o'tadi\n\n"
+    listing_info += "E'loni tasdiqlaysizmi?"
+    
+    keyboard = [["✅ Tasdiqlash", "❌ Bekor qilish"]]
+    reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
+    
+    reply_text(update, listing_info, reply_markup=reply_markup)
+    return CONFIRM
+
+@monitor_performance
+async def confirm_listing(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.message.text == "✅ Tasdiqlash":
+        # Save listing to database (batch bilan, commit dan keyin qaytadi)
+        listing = await insert_listing(
+            update.effective_user.id,
+            context.user_data['location'],
+            title=context.user_data['title'],
+            description=context.user_data.get('description', "Holati zo'r Hamma sharoitlar bor"),
+            rooms=context.user_data['rooms'],
+            floor=context.user_data['floor'],
+            total_floors=context.user_data['total_floors'],
+            price=context.user_data['price'],
+            currency=context.user_data['currency'],
+            images=json.dumps(context.user_data['images']),
+            phone=context.user_data['phone'],
+            expires_at=datetime.now() + timedelta(days=30)
+        )
+        await invalidate_user_listings(update.effective_user.id)
         
-        # Show confirmation
-        description = context.user_data.get('description', "Holati zo'r Hamma sharoitlar bor")
+        # Send success message
+        reply_text(update,
+            "🎉 E'loningiz muvaffaqiyatli joylashtirildi!\n\n"
+            "⚠️ Ogohlantirish:\n\n"
+            "E'loningiz 30 kundan keyin avtomatik ravishda nofaol holatga o'tadi\n\n"
+            "📋 E'loningizni 'Mening elonlarim' bo'limida ko'rishingiz mumkin!",
+            reply_markup=ReplyKeyboardRemove()
+        )
         
-        listing_info = "📋 E'lon ma'lumotlari:\n\n"
-        listing_info += f"📝 Sarlavha: {context.user_data['title']}\n"
-        listing_info += f"📄 Tavsif: {description}\n"
-        listing_info += f"🏠 Xonalar: {context.user_data['rooms']} ta\n"
-        listing_info += f"🏢 Qavat: {context.user_data['floor']}/{context.user_data['total_floors']}\n"
-        listing_info += f"💰 Narx: {context.user_data['price']} {context.user_data['currency']}\n"
-        listing_info += f"🖼️ Rasmlar: {len(context.user_data['images'])} ta\n"
-        listing_info += f"📞 Telefon raqamingiz {context.user_data['phone']}\n\n"
-        listing_info += "⚠️ Ogohlantirish:\n\n"
-        listing_info += "E'loningiz 30 kundan keyin avtomatik ravishda nofaol holatga o'tadi\n\n"
-        listing_info += "E'loni tasdiqlaysizmi?"
+        # Show listing details with all images in one media group
+        listing_details = (
+            "🖼️ **E'lon rasmlari bilan**\n\n"
+            f"📋 **E'lon #{listing.id}**\n"
+            f"👤 **Egasi:** {context.user_data['phone']}\n"
+            f"📞 **Tel:** {listing.phone}\n\n"
+            f"📝 **{listing.title}**\n"
+            f"📄 **{listing.description}**\n"
+            f"🏠 **{listing.rooms} xonali**\n"
+            f"🏢 **{listing.floor}/{listing.total_floors} qavat**\n"
+            f"💰 **{listing.price} {listing.currency}**\n"
+            f"📍 **{listing.location}**\n"
+            f"🕒 **Joylangan:** {listing.created_at.strftime('%d.%m.%Y')}\n"
+            f"⏳ **Qolgan vaqt:** 30 kun\n\n"
+            "🔍 Barcha e'lonlarni ko'rish uchun web sahifamizga kiring:\n"
+            "http://uyizlang.uz/"
+        )
         
-        keyboard = [["✅ Tasdiqlash", "❌ Bekor qilish"]]
-        reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
+        # Send all images in one media group (bir ramka ichida)
+        images = context.user_data['images']
+        if images:
+            # Barcha rasmlarni bir media groupda yuboramiz; birinchi rasmga caption
+            media_group = [
+                InputMediaPhoto(image_file_id, caption=listing_details, parse_mode="Markdown")
+                if i == 0 else InputMediaPhoto(image_file_id)
+                for i, image_file_id in enumerate(images[:10])  # Telegram limiti 10 ta rasm
+            ]
+            try:
+                await reply_media_group(update, media_group)
+            except Exception:
+                # Agar media group bilan muammo bo'lsa, oddiy tarzda yuboramiz
+                reply_text(update, listing_details, parse_mode="Markdown")
+                for image_file_id in images[:5]:
+                    reply_photo(update, image_file_id)
+        else:
+            reply_text(update, listing_details, parse_mode="Markdown")
         
-        await update.message.reply_text(listing_info, reply_markup=reply_markup)
-        return CONFIRM
-    finally:
-        db.close()
-
-async def confirm_listing(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if update.message.text == "✅ Tasdiqlash":
-        # Save listing to database
-        db = SessionLocal()
-        try:
-            user = db.query(User).filter(User.telegram_id == update.effective_user.id).first()
-            
-            listing = Listing(
-                user_id=user.id,
-                title=context.user_data['title'],
-                description=context.user_data.get('description', "Holati zo'r Hamma sharoitlar bor"),
-                rooms=context.user_data['rooms'],
-                floor=context.user_data['floor'],
-                total_floors=context.user_data['total_floors'],
-                price=context.user_data['price'],
-                currency=context.user_data['currency'],
-                images=json.dumps(context.user_data['images']),
-                location=context.user_data['location'],
-                phone=context.user_data['phone'],
-                expires_at=datetime.now() + timedelta(days=30)
-            )
-            
-            db.add(listing)
-            db.commit()
-            
-            # Send success message
-            await update.message.reply_text(
-                "🎉 E'loningiz muvaffaqiyatli joylashtirildi!\n\n"
-                "⚠️ Ogohlantirish:\n\n"
-                "E'loningiz 30 kundan keyin avtomatik ravishda nofaol holatga o'tadi\n\n"
-                "📋 E'loningizni 'Mening elonlarim' bo'limida ko'rishingiz mumkin!",
-                reply_markup=ReplyKeyboardRemove()
-            )
-            
-            # Show listing details with all images in one media group
-            listing_details = (
-                "🖼️ **E'lon rasmlari bilan**\n\n"
-                f"📋 **E'lon #{listing.id}**\n"
-                f"👤 **Egasi:** {user.phone}\n"
-                f"📞 **Tel:** {listing.phone}\n\n"
-                f"📝 **{listing.title}**\n"
-                f"📄 **{listing.description}**\n"
-                f"🏠 **{listing.rooms} xonali**\n"
-                f"🏢 **{listing.floor}/{listing.total_floors} qavat**\n"
-                f"💰 **{listing.price} {listing.currency}**\n"
-                f"📍 **{listing.location}**\n"
-                f"🕒 **Joylangan:** {listing.created_at.strftime('%d.%m.%Y')}\n"
-                f"⏳ **Qolgan vaqt:** 30 kun\n\n"
-                "🔍 Barcha e'lonlarni ko'rish uchun web sahifamizga kiring:\n"
-                "http://uyizlang.uz/"
-            )
-            
-            # Send all images in one media group (bir ramka ichida)
-            images = json.loads(listing.images)
-            if images:
-                try:
-                    # Barcha rasmlarni bir media groupda yuboramiz
-                    media_group = []
-                    for i, image_file_id in enumerate(images[:10]):  # Telegram limiti 10 ta rasm
-                        if i == 0:
-                            # Birinchi rasmga caption qo'shamiz
-                            media_group.append({
-                                "type": "photo", 
-                                "media": image_file_id,
-                                "caption": listing_details,
-                                "parse_mode": "Markdown"
-                            })
-                        else:
-                            media_group.append({
-                                "type": "photo", 
-                                "media": image_file_id
-                            })
-                    
-                    await update.message.reply_media_group(media=media_group)
-                except Exception as e:
-                    # Agar media group bilan muammo bo'lsa, oddiy tarzda yuboramiz
-                    await update.message.reply_text(listing_details, parse_mode="Markdown")
-                    for image_file_id in images[:5]:
-                        try:
-                            await update.message.reply_photo(photo=image_file_id)
-                        except:
-                            continue
-            else:
-                await update.message.reply_text(listing_details, parse_mode="Markdown")
-            
-            await show_main_menu(update, context)
-            
-        finally:
-            db.close()
+        await show_main_menu(update, context)
         
     else:
-        await update.message.reply_text(
+        reply_text(update,
             "❌ E'lon bekor qilindi.",
             reply_markup=ReplyKeyboardRemove()
         )
@@ -268,9 +324,17 @@ listing_conversation = ConversationHandler(
         TOTAL_FLOORS: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_total_floors)],
         PRICE: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_price)],
         CURRENCY: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_currency)],
-        IMAGES: [MessageHandler(filters.PHOTO, handle_images)],
+        # Album rasmlari fonda qo'shiladi (holat o'zgarmaydi), shuning uchun joylashuv shu holatda ham qabul qilinadi
+        IMAGES: [
+            MessageHandler(filters.PHOTO, handle_images),
+            MessageHandler(filters.LOCATION, handle_location_listing),
+            MessageHandler(filters.TEXT & ~filters.COMMAND, handle_images_text),
+        ],
         LOCATION: [MessageHandler(filters.LOCATION | filters.TEXT & ~filters.COMMAND, handle_location_listing)],
         CONFIRM: [MessageHandler(filters.TEXT & ~filters.COMMAND, confirm_listing)],
     },
     fallbacks=[],
+    # Holat utils.persistence.SQLitePersistence da saqlanadi (restartdan keyin davom etadi)
+    name='listing',
+    persistent=True,
 )
\ No newline at end of file
@@ -1,139 +1,140 @@
 import json
-from telegram import Update
-from telegram.ext import ContextTypes
-from config.database import get_db
+from telegram import Update, InputMediaPhoto, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import ContextTypes, CallbackQueryHandler
+from sqlalchemy import select
+from config.database import get_async_db
 from models.user import User, Listing
+from models.image import ListingImage
 from handlers.start import show_main_menu
-from utils.cache import cache
-from utils.rate_limiter import rate_limit
+from utils.cache import cache, ainvalidate_tag
 from utils.error_handler import error_handler
 from utils.monitoring import monitor_performance
+from utils.sender import reply_text, reply_media_group, edit_text
 import logging
 
 logger = logging.getLogger(__name__)
 
-@cache(ttl=60)  # 1 daqiqa cache
-def get_user_listings(user_id):
-    """Cache bilan user listings"""
-    db = next(get_db())
-    try:
-        user = db.query(User).filter(User.telegram_id == user_id).first()
+def user_listings_tag(user_id):
+    return f"user_listings:{user_id}"
+
+
+async def invalidate_user_listings(user_id):
+    """Foydalanuvchi e'lonlari o'zgarganda cache ni tozalash"""
+    await ainvalidate_tag(user_listings_tag(user_id))
+
+
+@cache(ttl=60, tags=lambda user_id, page: [user_listings_tag(user_id)])  # 1 daqiqa cache
+async def get_user_listing_page(user_id, page):
+    """Bitta sahifa (bitta e'lon): (ListingRow yoki None, keyingi sahifa bormi)
+
+    idx_listing_user_id indeksi id bo'yicha tartiblangan - ORDER BY id DESC
+    qo'shimcha saralashsiz, faqat kerakli qatorlar o'qiladi.
+    DB xatosi yuqoriga uzatiladi (error_handler) - xato natija cache ga tushmaydi.
+    """
+    async with get_async_db(readonly=True) as db:
+        user = await db.scalar(select(User).where(User.telegram_id == user_id))
         if not user:
-            return []
-        
-        listings = db.query(Listing).filter(
-            Listing.user_id == user.id, 
-            Listing.is_active == True
-        ).order_by(Listing.created_at.desc()).all()
-        
-        return listings
-    except Exception as e:
-        logger.error(f"Error in get_user_listings: {e}")
-        return []
-    finally:
-        db.close()
+            return None, False
+
+        listings = (await db.scalars(
+            select(Listing).where(
+                Listing.user_id == user.id,
+                Listing.is_active == True
+            ).order_by(Listing.id.desc()).limit(2).offset(page)
+        )).all()
+
+        if not listings:
+            return None, False
+        return listings[0].snapshot(), len(listings) > 1
+
+
+def format_listing_card(listing, page):
+    images = json.loads(listing.images) if listing.images else []
+    return (
+        f"📋 Sizning e'lonlaringiz ({page + 1}-e'lon)\n\n"
+        f"🆔 E'lon #{listing.id}\n"
+        f"📝 {listing.title}\n"
+        f"📄 {listing.description}\n"
+        f"🏠 {listing.rooms} xonali, 🏢 {listing.floor}/{listing.total_floors} qavat\n"
+        f"💰 {listing.price} {listing.currency}\n"
+        f"📍 {listing.location}\n"
+        f"📞 {listing.phone}\n"
+        f"🖼️ Rasmlar: {len(images)} ta\n"
+        f"🕒 Joylangan: {listing.created_at.strftime('%d.%m.%Y')}\n"
+        f"⏳ Qolgan vaqt: {(listing.expires_at - listing.created_at).days} kun"
+    )
+
+
+def listing_card_keyboard(listing, page, has_more):
+    rows = []
+    if listing.images and json.loads(listing.images):
+        rows.append([InlineKeyboardButton("🖼️ Rasmlarni ko'rish", callback_data=f"my_images:{listing.id}")])
+    buttons = []
+    if page > 0:
+        buttons.append(InlineKeyboardButton("⬅️ Oldingi", callback_data=f"my:{page - 1}"))
+    if has_more:
+        buttons.append(InlineKeyboardButton("Keyingi ➡️", callback_data=f"my:{page + 1}"))
+    if buttons:
+        rows.append(buttons)
+    return InlineKeyboardMarkup(rows) if rows else None
+
 
 @error_handler
 @monitor_performance
 async def show_my_listings(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    # Rate limit tekshirish
-    if not rate_limit(update.effective_user.id):
-        await update.message.reply_text("🚫 Juda ko'p so'rov! Iltimos, biroz kuting.")
+    # Rate limit utils.rate_limiter.install_rate_limit middleware da tekshiriladi
+    listing, has_more = await get_user_listing_page(update.effective_user.id, 0)
+
+    if not listing:
+        reply_text(update, "📭 Sizda hali e'lonlar mavjud emas.")
+        await show_main_menu(update, context)
         return
-    
-    try:
-        # Cache'dan foydalanib e'lonlarni olamiz
-        listings = get_user_listings(update.effective_user.id)
-        
-        if not listings:
-            await update.message.reply_text("📭 Sizda hali e'lonlar mavjud emas.")
-            await show_main_menu(update, context)
-            return
-        
-        await update.message.reply_text(f"📋 Sizning e'lonlaringiz ({len(listings)} ta):")
-        
-        # Batch processing - 3 tadan bo'lib yuborish
-        batch_size = 3
-        for i in range(0, len(listings), batch_size):
-            batch = listings[i:i + batch_size]
-            
-            for listing in batch:
-                # Rasmlarni olamiz
-                images = json.loads(listing.images) if listing.images else []
-                
-                # E'lon ma'lumotlari
-                listing_info = (
-                    f"📋 **E'lon #{listing.id}**\n\n"
-                    f"👤 **Egasi:** {listing.phone}\n"
-                    f"📞 **Tel:** {listing.phone}\n\n"
-                    f"📝 **{listing.title}**\n"
-                    f"📄 **{listing.description}**\n"
-                    f"🏠 **{listing.rooms} xonali**\n"
-                    f"🏢 **{listing.floor}/{listing.total_floors} qavat**\n"
-                    f"💰 **{listing.price} {listing.currency}**\n"
-                    f"📍 **{listing.location}**\n"
-                    f"🕒 **Joylangan:** {listing.created_at.strftime('%d.%m.%Y')}\n"
-                    f"⏳ **Qolgan vaqt:** {(listing.expires_at - listing.created_at).days} kun\n"
-                    f"✅ **Holati:** {'Aktiv' if listing.is_active else 'Nofaol'}"
-                )
-                
-                # Agar rasmlar mavjud bo'lsa, ularni yuboramiz
-                if images:
-                    try:
-                        # Birinchi 5 ta rasmni yuboramiz (Telegram limiti)
-                        media_group = []
-                        for i, image_file_id in enumerate(images[:5]):
-                            if i == 0:
-                                # Birinchi rasmga caption qo'shamiz
-                                media_group.append({
-                                    "type": "photo", 
-                                    "media": image_file_id,
-                                    "caption": listing_info,
-                                    "parse_mode": "Markdown"
-                                })
-                            else:
-                                media_group.append({
-                                    "type": "photo", 
-                                    "media": image_file_id
-                                })
-                        
-                        await update.message.reply_media_group(media=media_group)
-                        
-                        # Agar rasmlar 5 tadan ko'p bo'lsa
-                        if len(images) > 5:
-                            await update.message.reply_text(f"🖼️ ...va yana {len(images) - 5} ta rasm")
-                            
-                    except Exception as e:
-                        logger.warning(f"Media group error, falling back to simple method: {e}")
-                        # Agar media group bilan muammo bo'lsa, oddiy tarzda yuboramiz
-                        await update.message.reply_text(listing_info, parse_mode="Markdown")
-                        for image_file_id in images[:3]:  # Faqat birinchi 3 ta rasm
-                            try:
-                                await update.message.reply_photo(photo=image_file_id)
-                            except Exception as photo_error:
-                                logger.warning(f"Photo send error: {photo_error}")
-                                continue
-                else:
-                    # Rasmlar bo'lmasa, faqat matnni yuboramiz
-                    await update.message.reply_text(listing_info, parse_mode="Markdown")
-                
-                # Har bir e'lon orasida bo'sh joy (faqat birinchi batchda)
-                if i == 0:
-                    await update.message.reply_text("─" * 30)
-            
-            # Batchlar orasida kichik kutish (flood prevention)
-            if i + batch_size < len(listings):
-                import asyncio
-                await asyncio.sleep(1)
-                
-    except Exception as e:
-        logger.error(f"Error in show_my_listings: {e}")
-        await update.message.reply_text("❌ Xatolik yuz berdi. Iltimos, qayta urinib ko'ring.")
-    
-    finally:
-        # Yakuniy xabar
-        await update.message.reply_text(
-            "🔍 Barcha e'lonlarni ko'rish uchun web sahifamizga kiring:\n"
-            "http://uyizlang.uz/\n\n"
-            "🏡 Asosiy menyuga qaytish uchun /start ni bosing"
-        )
\ No newline at end of file
+
+    # Bitta karta; keyingi/oldingi tugmalari shu xabarni joyida tahrirlaydi
+    reply_text(update, format_listing_card(listing, 0), reply_markup=listing_card_keyboard(listing, 0, has_more))
+    reply_text(update,
+        "🔍 Barcha e'lonlarni ko'rish uchun web sahifamizga kiring:\n"
+        "http://uyizlang.uz/\n\n"
+        "🏡 Asosiy menyuga qaytish uchun /start ni bosing"
+    )
+
+
+@error_handler
+@monitor_performance
+async def my_listings_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+
+    page = int(query.data.split(':')[1])
+    listing, has_more = await get_user_listing_page(update.effective_user.id, page)
+    if not listing:
+        # E'lon muddati tugagan yoki o'chirilgan bo'lishi mumkin
+        edit_text(update, "📭 Bu sahifada e'lon qolmadi. Qaytadan \"📋 Mening elonlarim\" ni bosing.")
+        return
+    edit_text(update, format_listing_card(listing, page), reply_markup=listing_card_keyboard(listing, page, has_more))
+
+
+@error_handler
+@monitor_performance
+async def my_listing_images(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+
+    listing_id = int(query.data.split(':')[1])
+    async with get_async_db(readonly=True) as db:
+        images = (await db.scalars(
+            select(ListingImage.file_id)
+            .join(Listing, Listing.id == ListingImage.listing_id)
+            .join(User, User.id == Listing.user_id)
+            .where(ListingImage.listing_id == listing_id, User.telegram_id == update.effective_user.id)
+            .order_by(ListingImage.position)
+        )).all()
+    if not images:
+        reply_text(update, "📭 Bu e'londa rasmlar yo'q.")
+        return
+    # Telegram limiti 10 ta rasm
+    reply_media_group(update, [InputMediaPhoto(image_file_id) for image_file_id in images[:10]])
+
+
+my_listings_pagination_handler = CallbackQueryHandler(my_listings_page, pattern=r"^my:\d+$")
+my_listing_images_handler = CallbackQueryHandler(my_listing_images, pattern=r"^my_images:\d+$")
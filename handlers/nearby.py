@@ -0,0 +1,40 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+from sqlalchemy import select
+from config.database import get_async_db
+from models.user import User
+from handlers.start import show_main_menu
+from utils import nearby
+from utils.geo import parse_location
+from utils.monitoring import monitor_performance
+from utils.sender import reply_text
+
+
+@monitor_performance
+async def show_nearby_listings(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async with get_async_db(readonly=True) as db:
+        user = await db.scalar(select(User).where(User.telegram_id == update.effective_user.id))
+        coords = parse_location(user.location) if user else None
+        if coords:
+            results = await db.run_sync(nearby.nearest, coords[0], coords[1])
+
+    if not coords:
+        reply_text(update,
+            "📍 Joylashuvingiz saqlanmagan. /start orqali joylashuvingizni yuboring."
+        )
+        return
+
+    if not results:
+        reply_text(update, "📭 Yaqin atrofda faol e'lonlar topilmadi.")
+        await show_main_menu(update, context)
+        return
+
+    lines = ["📍 Sizga eng yaqin e'lonlar:\n"]
+    for i, (distance, listing) in enumerate(results, start=1):
+        lines.append(
+            f"{i}. 📝 {listing.title}\n"
+            f"📏 {distance:.1f} km · 🏠 {listing.rooms} xonali · 💰 {listing.price} {listing.currency}\n"
+            f"📞 {listing.phone}\n"
+        )
+    reply_text(update, "\n".join(lines))
+    await show_main_menu(update, context)
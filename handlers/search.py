@@ -0,0 +1,96 @@
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardRemove
+from telegram.ext import ContextTypes, ConversationHandler, MessageHandler, CallbackQueryHandler, filters
+from config.database import get_async_db
+from handlers.start import show_main_menu
+from utils import search
+from utils.monitoring import monitor_performance
+from utils.sender import reply_text, edit_text
+
+# Search conversation states
+QUERY = 0
+
+
+def format_results(results, page, has_more, ranked=True, text=''):
+    if not results:
+        return "📭 Hech narsa topilmadi." if page == 0 else "📭 Boshqa natija yo'q."
+    lines = [f"🔍 Qidiruv natijalari ({page + 1}-sahifa):\n"]
+    if text and not ranked:
+        lines.append("ℹ️ Mos e'lonlar juda ko'p - eng yangilari ko'rsatilmoqda. Aniqroq yozing.\n")
+    for i, listing in enumerate(results, start=page * search.SEARCH_PAGE_SIZE + 1):
+        lines.append(
+            f"{i}. 📝 {listing.title}\n"
+            f"🏠 {listing.rooms} xonali, 🏢 {listing.floor}/{listing.total_floors} qavat\n"
+            f"💰 {listing.price} {listing.currency}\n"
+            f"📞 {listing.phone}\n"
+        )
+    return "\n".join(lines)
+
+
+def results_keyboard(page, has_more):
+    buttons = []
+    if page > 0:
+        buttons.append(InlineKeyboardButton("⬅️ Oldingi", callback_data=f"search:{page - 1}"))
+    if has_more:
+        buttons.append(InlineKeyboardButton("Keyingi ➡️", callback_data=f"search:{page + 1}"))
+    return InlineKeyboardMarkup([buttons]) if buttons else None
+
+
+async def run_search(context, page):
+    params = context.user_data.get('search', {})
+    async with get_async_db(readonly=True) as db:
+        return await db.run_sync(search.search, params.get('text', ''), params.get('filters'), page)
+
+
+@monitor_performance
+async def start_search(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    reply_text(update,
+        "🔍 Nima qidiryapsiz?\n\n"
+        "Masalan: Chilonzor 3 xonali 50000-80000 USD",
+        reply_markup=ReplyKeyboardRemove()
+    )
+    return QUERY
+
+
+@monitor_performance
+async def handle_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query_text, query_filters = search.parse_query(update.message.text)
+    context.user_data['search'] = {'text': query_text, 'filters': query_filters}
+
+    results, has_more, ranked = await run_search(context, 0)
+    reply_text(update,
+        format_results(results, 0, has_more, ranked, query_text),
+        reply_markup=results_keyboard(0, has_more)
+    )
+    await show_main_menu(update, context)
+    return ConversationHandler.END
+
+
+@monitor_performance
+async def search_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    if 'search' not in context.user_data:
+        edit_text(update, "⌛ Qidiruv eskirgan. Iltimos, qaytadan qidiring.")
+        return
+
+    page = int(query.data.split(':')[1])
+    results, has_more, ranked = await run_search(context, page)
+    edit_text(
+        update,
+        format_results(results, page, has_more, ranked, context.user_data['search'].get('text')),
+        reply_markup=results_keyboard(page, has_more)
+    )
+
+
+# Search conversation handler
+search_conversation = ConversationHandler(
+    entry_points=[MessageHandler(filters.Regex("^🔍 Qidiruv$"), start_search)],
+    states={
+        QUERY: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_query)],
+    },
+    fallbacks=[],
+    name='search',
+    persistent=True,
+)
+
+search_pagination_handler = CallbackQueryHandler(search_page, pattern=r"^search:\d+$")
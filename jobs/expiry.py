@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import os
+import sys
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, delete
+from config.database import get_async_db
+from models.user import User, Listing, ArchivedListing
+from models.image import ListingImage
+from handlers.my_listings import invalidate_user_listings
+from utils import changes, clustering, search, stats
+
+logger = logging.getLogger(__name__)
+
+EXPIRY_BATCH_SIZE = int(os.getenv('EXPIRY_BATCH_SIZE', '500'))
+EXPIRY_INTERVAL = int(os.getenv('EXPIRY_INTERVAL', '3600'))  # soniya
+# Nofaol e'lonlar necha kundan keyin arxivga ko'chiriladi (0 - o'chirilgan)
+LISTING_ARCHIVE_DAYS = int(os.getenv('LISTING_ARCHIVE_DAYS', '0'))
+
+ARCHIVE_COLUMNS = [column.name for column in ArchivedListing.__table__.columns if column.name != 'archived_at']
+
+
+async def expire_listings(batch_size=EXPIRY_BATCH_SIZE, now=None):
+    """Muddati o'tgan e'lonlarni batchlab nofaol qiladi. Nofaol qilinganlar sonini qaytaradi"""
+    now = now or datetime.now()
+    total = 0
+    while True:
+        async with get_async_db() as db:
+            # (is_active, expires_at) indeksi bo'yicha
+            listings = (await db.scalars(
+                select(Listing).where(
+                    Listing.is_active == True,
+                    Listing.expires_at <= now
+                ).order_by(Listing.expires_at).limit(batch_size)
+            )).all()
+            if not listings:
+                break
+
+            for listing in listings:
+                listing.is_active = False
+            await db.run_sync(changes.bump, listings)
+            await db.flush()
+            await db.run_sync(clustering.remove_listings, listings)
+            await db.run_sync(search.remove_listings, [listing.id for listing in listings])
+            # Kunlik rollup ham shu ishga tushirish kuniga (now)
+            await db.run_sync(stats.remove_listings, listings, now.date())
+            telegram_ids = (await db.scalars(
+                select(User.telegram_id).where(User.id.in_({listing.user_id for listing in listings}))
+            )).all()
+            await db.commit()
+
+        for telegram_id in telegram_ids:
+            await invalidate_user_listings(telegram_id)
+        total += len(listings)
+        if len(listings) < batch_size:
+            break
+        # Boshqa handlerlarga navbat berish
+        await asyncio.sleep(0)
+
+    if total:
+        logger.info(f"Expired {total} listings")
+    return total
+
+
+async def archive_listings(days=LISTING_ARCHIVE_DAYS, batch_size=EXPIRY_BATCH_SIZE, now=None):
+    """``days`` kundan oldin tugagan nofaol e'lonlarni listings_archive ga ko'chiradi"""
+    if days <= 0:
+        return 0
+    cutoff = (now or datetime.now()) - timedelta(days=days)
+    total = 0
+    while True:
+        async with get_async_db() as db:
+            ids = (await db.scalars(
+                select(Listing.id).where(
+                    Listing.is_active == False,
+                    Listing.expires_at <= cutoff
+                ).order_by(Listing.expires_at).limit(batch_size)
+            )).all()
+            if not ids:
+                break
+            await db.run_sync(changes.purge, ids)
+            source = select(*[getattr(Listing, name) for name in ARCHIVE_COLUMNS]).where(Listing.id.in_(ids))
+            await db.execute(insert(ArchivedListing).from_select(ARCHIVE_COLUMNS, source))
+            await db.execute(delete(Listing).where(Listing.id.in_(ids)))
+            # Arxivda images JSON qoladi; normal jadval faqat jonli e'lonlar uchun
+            await db.execute(delete(ListingImage).where(ListingImage.listing_id.in_(ids)))
+            await db.run_sync(stats.forget_listings, len(ids))
+            await db.commit()
+
+        total += len(ids)
+        if len(ids) < batch_size:
+            break
+        await asyncio.sleep(0)
+
+    if total:
+        logger.info(f"Archived {total} listings")
+    return total
+
+
+async def run_expiry():
+    expired = await expire_listings()
+    archived = await archive_listings()
+    return expired, archived
+
+
+async def expiry_job(context):
+    """python-telegram-bot JobQueue callback"""
+    try:
+        await run_expiry()
+    except Exception as e:
+        logger.error(f"Error in expiry_job: {e}")
+
+
+def register_jobs(application, interval=EXPIRY_INTERVAL):
+    """Bot ishga tushganda: register_jobs(application)"""
+    application.job_queue.run_repeating(expiry_job, interval=interval, first=60, name='expire_listings')
+
+
+async def _run_forever(interval):
+    while True:
+        await run_expiry()
+        await asyncio.sleep(interval)
+
+
+if __name__ == '__main__':
+    # python -m jobs.expiry          - bir marta
+    # python -m jobs.expiry --loop   - har EXPIRY_INTERVAL soniyada
+    logging.basicConfig(level=logging.INFO)
+    if '--loop' in sys.argv:
+        asyncio.run(_run_forever(EXPIRY_INTERVAL))
+    else:
+        print(asyncio.run(run_expiry()))
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import os
+import sys
+from sqlalchemy import select, update
+from config.database import get_async_db
+from models.image import ListingImage
+from utils.image_cache import image_cache, content_hash, render_variants
+
+logger = logging.getLogger(__name__)
+
+IMAGE_BATCH_SIZE = int(os.getenv('IMAGE_BATCH_SIZE', '20'))
+IMAGE_INTERVAL = int(os.getenv('IMAGE_INTERVAL', '30'))  # soniya
+IMAGE_MAX_ATTEMPTS = 3
+# Bir vaqtda yuklanadigan rasmlar (Bot API fayl serveri uchun)
+IMAGE_CONCURRENCY = int(os.getenv('IMAGE_CONCURRENCY', '4'))
+
+
+async def process_image(bot, image):
+    """Rasmni bir marta yuklab, WebP variantlarini cache ga yozadi: (hash, (w, h))"""
+    telegram_file = await bot.get_file(image.file_id)
+    data = bytes(await telegram_file.download_as_bytearray())
+    digest = content_hash(data)
+    if image_cache.has(digest):
+        return digest, None, telegram_file.file_unique_id
+    # Pillow CPU ishi event loop ni bloklamasligi uchun
+    variants, size = await asyncio.to_thread(render_variants, data)
+    await asyncio.to_thread(image_cache.put, digest, variants)
+    return digest, size, telegram_file.file_unique_id
+
+
+async def process_pending(bot, batch_size=IMAGE_BATCH_SIZE):
+    """Hali ishlanmagan rasmlarni batchlab ishlaydi. Ishlanganlar sonini qaytaradi"""
+    async with get_async_db(readonly=True) as db:
+        images = (await db.scalars(
+            select(ListingImage).where(
+                ListingImage.content_hash.is_(None),
+                ListingImage.attempts < IMAGE_MAX_ATTEMPTS
+            ).order_by(ListingImage.id).limit(batch_size)
+        )).all()
+    if not images:
+        return 0
+
+    semaphore = asyncio.Semaphore(IMAGE_CONCURRENCY)
+
+    async def run(image):
+        async with semaphore:
+            try:
+                return await process_image(bot, image)
+            except Exception as e:
+                logger.warning(f"Image {image.id} processing failed: {e}")
+                return None
+
+    results = await asyncio.gather(*(run(image) for image in images))
+
+    async with get_async_db() as db:
+        for image, result in zip(images, results):
+            if result is None:
+                values = {'attempts': ListingImage.attempts + 1}
+            else:
+                digest, size, file_unique_id = result
+                values = {'content_hash': digest, 'file_unique_id': file_unique_id}
+                if size:
+                    values['width'], values['height'] = size
+            await db.execute(update(ListingImage).where(ListingImage.id == image.id).values(**values))
+        await db.commit()
+
+    done = sum(result is not None for result in results)
+    logger.info(f"Processed {done}/{len(images)} listing images")
+    return done
+
+
+async def image_job(context):
+    """python-telegram-bot JobQueue callback"""
+    try:
+        while await process_pending(context.bot) == IMAGE_BATCH_SIZE:
+            pass
+    except Exception as e:
+        logger.error(f"Error in image_job: {e}")
+
+
+def register_image_jobs(application, interval=IMAGE_INTERVAL):
+    """Bot ishga tushganda: register_image_jobs(application)"""
+    application.job_queue.run_repeating(image_job, interval=interval, first=10, name='process_images')
+
+
+async def _run_forever(interval):
+    from telegram import Bot
+
+    async with Bot(os.environ['BOT_TOKEN']) as bot:
+        while True:
+            await process_pending(bot)
+            await asyncio.sleep(interval)
+
+
+if __name__ == '__main__':
+    # BOT_TOKEN=... python -m jobs.images   - har IMAGE_INTERVAL soniyada
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_run_forever(int(sys.argv[1]) if len(sys.argv) > 1 else IMAGE_INTERVAL))
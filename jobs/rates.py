@@ -0,0 +1,49 @@
+import asyncio
+import logging
+import os
+import sys
+from config.database import get_async_db
+from utils import currency
+
+logger = logging.getLogger(__name__)
+
+RATES_INTERVAL = int(os.getenv('RATES_INTERVAL', '3600'))  # soniya
+
+
+async def sync_exchange_rates(rates):
+    """Sozlangan kurslarni saqlanganlari bilan solishtiradi; o'zgarganlari uchun price_usd bulk yangilanadi"""
+    async with get_async_db() as db:
+        changed = await db.run_sync(currency.sync_rates, rates)
+        await db.commit()
+    if changed:
+        logger.info(f"Recomputed price_usd for {', '.join(code.value for code in changed)}")
+    return [code.value for code in changed]
+
+
+async def rates_job(context):
+    """python-telegram-bot JobQueue callback"""
+    try:
+        await sync_exchange_rates(currency.load_rates())
+    except Exception as e:
+        logger.error(f"Error in rates_job: {e}")
+
+
+def register_rate_jobs(application, interval=RATES_INTERVAL):
+    """Bot ishga tushganda: register_rate_jobs(application)"""
+    application.job_queue.run_repeating(rates_job, interval=interval, first=0, name='sync_exchange_rates')
+
+
+async def _run_forever(interval):
+    while True:
+        await sync_exchange_rates(currency.load_rates())
+        await asyncio.sleep(interval)
+
+
+if __name__ == '__main__':
+    # USD_UZS_RATE=12800 python -m jobs.rates   - bir marta
+    # python -m jobs.rates --loop                - har RATES_INTERVAL soniyada
+    logging.basicConfig(level=logging.INFO)
+    if '--loop' in sys.argv:
+        asyncio.run(_run_forever(RATES_INTERVAL))
+    else:
+        print(asyncio.run(sync_exchange_rates(currency.load_rates())))
@@ -0,0 +1,196 @@
+import asyncio
+import gzip
+import json
+import logging
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from sqlalchemy import select
+from config.database import get_async_db
+from models.user import Listing
+from utils import changes
+from api.images import cover_hashes
+from api.listings import listing_to_dict
+from api.markers import encode_markers
+
+logger = logging.getLogger(__name__)
+
+# Statik server shu papkani beradi: manifest.json + v<version>-<vaqt>/ papkalari
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', 'snapshot')
+SNAPSHOT_INTERVAL = int(os.getenv('SNAPSHOT_INTERVAL', '300'))  # soniya
+# Tile o'lchami (gradus), utils.geo.GRID_STEP ga karrali. 0.1° ~ 11 km
+SNAPSHOT_TILE_STEP = float(os.getenv('SNAPSHOT_TILE_STEP', '0.1'))
+# Eski manifestni o'qib bo'lgan klientlar uchun saqlanadigan versiyalar
+SNAPSHOT_KEEP = int(os.getenv('SNAPSHOT_KEEP', '3'))
+SNAPSHOT_BATCH_SIZE = 1000
+# Shundan eski .v*.tmp papkalar - to'xtatilgan build qoldig'i
+STALE_TMP_SECONDS = 3600
+MANIFEST = 'manifest.json'
+
+
+def tile_key(lat, lng, step=SNAPSHOT_TILE_STEP):
+    """index.html::tileKey bilan bir xil"""
+    return f"{math.floor((lat + 90) / step)}_{math.floor((lng + 180) / step)}"
+
+
+def read_manifest(root=SNAPSHOT_DIR):
+    try:
+        with open(os.path.join(root, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_file(path, data):
+    """Fayl va uning oldindan siqilgan nusxalari (nginx gzip_static / brotli_static)"""
+    with open(path, 'wb') as f:
+        f.write(data)
+    with open(f"{path}.gz", 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9))
+    try:
+        import brotli  # ixtiyoriy bog'liqlik
+    except ImportError:
+        return
+    with open(f"{path}.br", 'wb') as f:
+        f.write(brotli.compress(data, quality=11))
+
+
+def write_snapshot(root, version, tiles, details):
+    """Yangi versiya papkasini yozib, manifest.json ni atomik almashtiradi"""
+    name = f"v{version}-{int(time.time())}"
+    # Har build o'z vaqtinchalik papkasini oladi - qolib ketgan yoki parallel build bilan to'qnashmaydi
+    tmp_dir = tempfile.mkdtemp(prefix=f".{name}.", suffix='.tmp', dir=root)
+    try:
+        # mkdtemp 0700 bilan yaratadi - statik server o'qiy olishi kerak
+        os.chmod(tmp_dir, 0o755)
+        os.makedirs(os.path.join(tmp_dir, 'tiles'))
+        os.makedirs(os.path.join(tmp_dir, 'details'))
+        for key, rows in tiles.items():
+            _write_file(os.path.join(tmp_dir, 'tiles', f"{key}.bin"), encode_markers(rows, version))
+            _write_file(
+                os.path.join(tmp_dir, 'details', f"{key}.json"),
+                json.dumps(details[key], ensure_ascii=False, separators=(',', ':')).encode()
+            )
+        # Papka to'liq yozilgandan keyingina ko'rinadi
+        name = _publish(root, tmp_dir, name)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    manifest = {
+        'version': version,
+        'path': name,
+        'tile_step': SNAPSHOT_TILE_STEP,
+        'generated_at': datetime.now().isoformat(),
+        'tiles': {key: len(rows) for key, rows in tiles.items()},
+    }
+    tmp_path = os.path.join(root, f"{MANIFEST}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, separators=(',', ':'))
+    os.replace(tmp_path, os.path.join(root, MANIFEST))
+    prune_snapshots(root, keep=name)
+    return manifest
+
+
+def _publish(root, tmp_dir, name):
+    """tmp_dir ni root/name ga ko'chiradi; shu soniyada bir xil versiya allaqachon
+    yozilgan bo'lsa (mavjud papka ustiga os.replace ishlamaydi) - name-1, name-2, ..."""
+    candidate = name
+    for attempt in range(1, 100):
+        try:
+            os.rename(tmp_dir, os.path.join(root, candidate))
+            return candidate
+        except OSError:
+            if not os.path.exists(os.path.join(root, candidate)):
+                raise
+        candidate = f"{name}-{attempt}"
+    raise FileExistsError(os.path.join(root, name))
+
+
+def prune_snapshots(root, keep, count=SNAPSHOT_KEEP):
+    versions = sorted(
+        (entry for entry in os.scandir(root) if entry.is_dir() and entry.name.startswith('v')),
+        key=lambda entry: entry.stat().st_mtime, reverse=True
+    )
+    for entry in versions[count:]:
+        if entry.name != keep:
+            shutil.rmtree(entry.path, ignore_errors=True)
+    # To'xtatilgan build lardan qolgan vaqtinchalik papkalar (parallel build nikiga tegmaymiz)
+    stale = time.time() - STALE_TMP_SECONDS
+    for entry in os.scandir(root):
+        if entry.is_dir() and entry.name.startswith('.v') and entry.name.endswith('.tmp') \
+                and entry.stat().st_mtime < stale:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+async def build_snapshot(root=SNAPSHOT_DIR, force=False):
+    """Faol e'lonlarni tile larga bo'lib eksport qiladi. O'zgarish bo'lmasa None"""
+    os.makedirs(root, exist_ok=True)
+    manifest = read_manifest(root)
+    tiles = {}
+    details = {}
+    async with get_async_db(readonly=True) as db:
+        # Versiya qatorlardan oldin - klient /listings/changes?since=version bilan to'ldiradi
+        version, _ = await db.run_sync(changes.versions)
+        if manifest and manifest.get('version') == version and not force:
+            return None
+
+        last_id = 0
+        while True:
+            listings = (await db.scalars(
+                select(Listing).where(
+                    Listing.is_active == True,
+                    Listing.latitude.isnot(None),
+                    Listing.id > last_id
+                ).order_by(Listing.id).limit(SNAPSHOT_BATCH_SIZE)
+            )).all()
+            if not listings:
+                break
+            thumbs = await cover_hashes(db, [listing.id for listing in listings])
+            for listing in listings:
+                key = tile_key(listing.latitude, listing.longitude)
+                tiles.setdefault(key, []).append(listing.snapshot())
+                details.setdefault(key, {})[listing.id] = listing_to_dict(listing, thumbs.get(listing.id))
+            last_id = listings[-1].id
+            await asyncio.sleep(0)
+
+    manifest = await asyncio.to_thread(write_snapshot, root, version, tiles, details)
+    logger.info(f"Snapshot {manifest['path']}: {sum(manifest['tiles'].values())} listings in {len(tiles)} tiles")
+    return manifest
+
+
+async def snapshot_job(context):
+    """python-telegram-bot JobQueue callback"""
+    try:
+        await build_snapshot()
+    except Exception as e:
+        logger.error(f"Error in snapshot_job: {e}")
+
+
+def register_snapshot_jobs(application, interval=SNAPSHOT_INTERVAL):
+    """Bot ishga tushganda: register_snapshot_jobs(application)"""
+    application.job_queue.run_repeating(snapshot_job, interval=interval, first=30, name='build_snapshot')
+
+
+async def _run_forever(interval):
+    while True:
+        try:
+            await build_snapshot()
+        except Exception as e:
+            logger.error(f"Error building snapshot: {e}")
+        await asyncio.sleep(interval)
+
+
+if __name__ == '__main__':
+    # python -m jobs.snapshot           - bir marta (--force: versiya o'zgarmagan bo'lsa ham)
+    # python -m jobs.snapshot --loop    - har SNAPSHOT_INTERVAL soniyada
+    logging.basicConfig(level=logging.INFO)
+    if '--loop' in sys.argv:
+        asyncio.run(_run_forever(SNAPSHOT_INTERVAL))
+    else:
+        result = asyncio.run(build_snapshot(force='--force' in sys.argv))
+        print(result['path'] if result else "O'zgarish yo'q")
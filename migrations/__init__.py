@@ -0,0 +1,57 @@
+import importlib
+import logging
+from sqlalchemy import inspect, text
+
+logger = logging.getLogger(__name__)
+
+# Tartib bilan ishga tushiriladigan migratsiyalar (har biri idempotent).
+# Bajarilganlari schema_migrations da - keyingi ishga tushirishlarda o'tkazib yuboriladi
+MIGRATIONS = [
+    'migrations.m001_listing_coordinates',
+    # listings ga ORM ustun qo'shadiganlar Listing ni o'qiydigan rebuild lardan oldin
+    'migrations.m007_listing_versions',
+    'migrations.m008_listing_price_usd',
+    'migrations.m002_listing_clusters',
+    'migrations.m003_listing_expiry',
+    'migrations.m004_listing_search',
+    'migrations.m005_listing_images',
+    'migrations.m006_listing_stats',
+]
+
+
+def column_names(conn, table):
+    return {col['name'] for col in inspect(conn).get_columns(table)}
+
+
+def add_column(conn, table, column, ddl_type):
+    """Ustun mavjud bo'lmasa qo'shadi"""
+    if column not in column_names(conn, table):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+        logger.info(f"Added column {table}.{column}")
+
+
+def create_index(conn, name, table, columns):
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+
+
+def applied_migrations(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "name VARCHAR(100) PRIMARY KEY, applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        ))
+        return {row[0] for row in conn.execute(text("SELECT name FROM schema_migrations"))}
+
+
+def run_all(engine, rerun=()):
+    """Hali bajarilmagan migratsiyalar; rerun - qayta ishga tushiriladiganlar (masalan rebuild uchun)"""
+    applied = applied_migrations(engine)
+    for name in MIGRATIONS:
+        if name in applied and name not in rerun:
+            continue
+        module = importlib.import_module(name)
+        logger.info(f"Running migration {name}")
+        module.upgrade(engine)
+        if name not in applied:
+            with engine.begin() as conn:
+                conn.execute(text("INSERT INTO schema_migrations (name) VALUES (:name)"), {'name': name})
@@ -0,0 +1,10 @@
+import logging
+import sys
+from config.database import engine
+from migrations import run_all
+
+if __name__ == '__main__':
+    # python -m migrations                                        - yangi migratsiyalar
+    # python -m migrations migrations.m002_listing_clusters ...  - berilganlarni qayta ishga tushirish
+    logging.basicConfig(level=logging.INFO)
+    run_all(engine, rerun=sys.argv[1:])
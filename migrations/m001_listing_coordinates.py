@@ -0,0 +1,46 @@
+"""listings jadvaliga latitude/longitude/grid_cell ustunlarini qo'shadi va
+mavjud "latitude,longitude" matnlaridan to'ldiradi."""
+from sqlalchemy import text
+from migrations import add_column, create_index
+from utils.geo import parse_location, grid_cell
+
+BATCH_SIZE = 1000
+
+
+def upgrade(engine):
+    with engine.begin() as conn:
+        add_column(conn, 'listings', 'latitude', 'FLOAT')
+        add_column(conn, 'listings', 'longitude', 'FLOAT')
+        add_column(conn, 'listings', 'grid_cell', 'INTEGER')
+
+    # Backfill - batchlar bilan, har biri alohida tranzaksiya
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                "SELECT id, location FROM listings "
+                "WHERE id > :last_id AND latitude IS NULL AND location IS NOT NULL "
+                "ORDER BY id LIMIT :limit"
+            ), {'last_id': last_id, 'limit': BATCH_SIZE}).fetchall()
+            if not rows:
+                break
+
+            updates = []
+            for listing_id, location in rows:
+                coords = parse_location(location)
+                if coords:
+                    updates.append({
+                        'id': listing_id,
+                        'lat': coords[0],
+                        'lng': coords[1],
+                        'cell': grid_cell(*coords),
+                    })
+            if updates:
+                conn.execute(text(
+                    "UPDATE listings SET latitude = :lat, longitude = :lng, grid_cell = :cell "
+                    "WHERE id = :id"
+                ), updates)
+            last_id = rows[-1][0]
+
+    with engine.begin() as conn:
+        create_index(conn, 'idx_listing_active_cell', 'listings', ['is_active', 'grid_cell'])
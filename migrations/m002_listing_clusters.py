@@ -0,0 +1,13 @@
+"""listing_clusters jadvalini yaratadi va mavjud e'lonlardan to'ldiradi."""
+from config.database import Base, SessionLocal
+from models.cluster import ListingCluster
+from utils import clustering
+
+
+def upgrade(engine):
+    Base.metadata.create_all(engine, tables=[ListingCluster.__table__])
+    db = SessionLocal(bind=engine)
+    try:
+        clustering.rebuild(db)
+    finally:
+        db.close()
@@ -0,0 +1,14 @@
+"""(is_active, expires_at) indeksi va listings_archive jadvali (Listing bilan bir xil ustunlar)."""
+from config.database import Base
+from migrations import add_column, create_index
+from models.user import ArchivedListing
+
+
+def upgrade(engine):
+    with engine.begin() as conn:
+        create_index(conn, 'idx_listing_active_expires', 'listings', ['is_active', 'expires_at'])
+    Base.metadata.create_all(engine, tables=[ArchivedListing.__table__])
+    # price_usd/version dan oldin yaratilgan arxiv jadvali uchun
+    with engine.begin() as conn:
+        add_column(conn, 'listings_archive', 'price_usd', 'INTEGER')
+        add_column(conn, 'listings_archive', 'version', 'INTEGER')
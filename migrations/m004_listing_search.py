@@ -0,0 +1,15 @@
+"""listings_fts (FTS5) qidiruv indeksini yaratadi va faol e'lonlardan to'ldiradi."""
+from config.database import SessionLocal
+from utils import search
+
+
+def upgrade(engine):
+    if not search.is_supported(engine):
+        return
+    with engine.begin() as conn:
+        search.create_index(conn)
+    db = SessionLocal(bind=engine)
+    try:
+        search.rebuild(db)
+    finally:
+        db.close()
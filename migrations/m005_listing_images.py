@@ -0,0 +1,41 @@
+"""listing_images jadvali va listings.images JSON dan to'ldirish."""
+import json
+from sqlalchemy import text
+from config.database import Base
+from models.image import ListingImage
+
+BATCH_SIZE = 1000
+
+
+def upgrade(engine):
+    Base.metadata.create_all(engine, tables=[ListingImage.__table__])
+
+    # Backfill - batchlar bilan; allaqachon rasmlari bor e'lonlar o'tkazib yuboriladi
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                "SELECT id, images FROM listings "
+                "WHERE id > :last_id AND images IS NOT NULL "
+                "AND NOT EXISTS (SELECT 1 FROM listing_images WHERE listing_id = listings.id) "
+                "ORDER BY id LIMIT :limit"
+            ), {'last_id': last_id, 'limit': BATCH_SIZE}).fetchall()
+            if not rows:
+                break
+
+            images = []
+            for listing_id, value in rows:
+                try:
+                    file_ids = json.loads(value)
+                except ValueError:
+                    continue
+                images.extend(
+                    {'listing_id': listing_id, 'position': position, 'file_id': file_id}
+                    for position, file_id in enumerate(file_ids)
+                )
+            if images:
+                conn.execute(text(
+                    "INSERT INTO listing_images (listing_id, position, file_id, attempts) "
+                    "VALUES (:listing_id, :position, :file_id, 0)"
+                ), images)
+            last_id = rows[-1][0]
@@ -0,0 +1,15 @@
+"""stat_* jadvallarini yaratadi va mavjud ma'lumotlardan to'ldiradi."""
+from config.database import Base, SessionLocal
+from models.stats import StatCounter, DailyStat, ListingBucket
+from utils import stats
+
+
+def upgrade(engine):
+    Base.metadata.create_all(engine, tables=[
+        StatCounter.__table__, DailyStat.__table__, ListingBucket.__table__
+    ])
+    db = SessionLocal(bind=engine)
+    try:
+        stats.rebuild(db)
+    finally:
+        db.close()
@@ -0,0 +1,14 @@
+"""listings.version ustuni (delta-sync) va change_counters jadvali."""
+from sqlalchemy import text
+from config.database import Base
+from migrations import add_column, create_index
+from models.changes import ChangeCounter
+
+
+def upgrade(engine):
+    Base.metadata.create_all(engine, tables=[ChangeCounter.__table__])
+    with engine.begin() as conn:
+        add_column(conn, 'listings', 'version', 'INTEGER')
+        # Mavjud e'lonlar 0-versiyada - birinchi to'liq yuklash ularni oladi
+        conn.execute(text("UPDATE listings SET version = 0 WHERE version IS NULL"))
+        create_index(conn, 'idx_listing_version', 'listings', ['version'])
@@ -0,0 +1,34 @@
+"""Valyutalarni Currency qiymatlariga keltiradi, listings.price_usd va
+(is_active, rooms, price_usd) indeksini qo'shadi."""
+from sqlalchemy import text
+from config.database import Base, SessionLocal
+from migrations import add_column, create_index
+from models.currency import ExchangeRate
+from utils import currency
+
+
+def upgrade(engine):
+    Base.metadata.create_all(engine, tables=[ExchangeRate.__table__])
+    with engine.begin() as conn:
+        add_column(conn, 'listings', 'price_usd', 'INTEGER')
+        # Erkin matnli eski qiymatlar ("usd", "so'm", "сум") - har bir variant uchun bitta UPDATE
+        for (value,) in conn.execute(text("SELECT DISTINCT currency FROM listings WHERE currency IS NOT NULL")).fetchall():
+            parsed = currency.parse_currency(value)
+            if parsed is not None and parsed.value != value:
+                conn.execute(text("UPDATE listings SET currency = :new WHERE currency = :old"),
+                             {'new': parsed.value, 'old': value})
+        create_index(conn, 'idx_listing_active_rooms_price_usd', 'listings', ['is_active', 'rooms', 'price_usd'])
+
+    rates = currency.load_rates()
+    db = SessionLocal(bind=engine)
+    try:
+        # Kurs o'zgargan bo'lsa sync_rates o'zi qayta hisoblaydi; aks holda faqat bo'sh qatorlar bo'lsa
+        if not currency.sync_rates(db, rates) and db.execute(text(
+            "SELECT 1 FROM listings WHERE price_usd IS NULL AND price IS NOT NULL "
+            "AND currency IN (:usd, :uzs) LIMIT 1"
+        ), {'usd': currency.Currency.USD.value, 'uzs': currency.Currency.UZS.value}).first():
+            for code, per_usd in rates.items():
+                currency.recompute_prices(db, code, per_usd)
+        db.commit()
+    finally:
+        db.close()
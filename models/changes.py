@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String
+from config.database import Base
+
+
+class ChangeCounter(Base):
+    """Delta-sync versiyalari. utils.changes bitta atomar upsert bilan oshiradi -
+    versiyalar commit tartibida o'sadi (stats.rebuild bularga tegmaydi)"""
+    __tablename__ = "change_counters"
+
+    name = Column(String(50), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
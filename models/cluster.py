@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, Float
+from config.database import Base
+
+
+class ListingCluster(Base):
+    """Har bir zoom darajasi va grid katak uchun oldindan hisoblangan agregatlar"""
+    __tablename__ = "listing_clusters"
+
+    zoom = Column(Integer, primary_key=True)
+    cell_x = Column(Integer, primary_key=True)
+    cell_y = Column(Integer, primary_key=True)
+    currency = Column(String(10), primary_key=True)
+    count = Column(Integer, default=0)
+    lat_sum = Column(Float, default=0)
+    lng_sum = Column(Float, default=0)
+    min_price = Column(Integer)
+    max_price = Column(Integer)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, Float, DateTime
+from sqlalchemy.sql import func
+from config.database import Base
+
+
+class ExchangeRate(Base):
+    """listings.price_usd hisoblangan kurslar: 1 USD = per_usd birlik"""
+    __tablename__ = "exchange_rates"
+
+    currency = Column(String(10), primary_key=True)
+    per_usd = Column(Float, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Index
+from config.database import Base
+
+
+class ListingImage(Base):
+    """E'lon rasmlari tartibi bilan; content_hash - yuklab olingan va
+    utils.image_cache ga WebP variantlari yozilgan rasm (NULL - hali ishlanmagan)"""
+    __tablename__ = "listing_images"
+
+    id = Column(Integer, primary_key=True)
+    listing_id = Column(Integer, nullable=False)
+    position = Column(Integer, nullable=False, default=0)
+    file_id = Column(String(255), nullable=False)
+    file_unique_id = Column(String(64))
+    content_hash = Column(String(64))
+    width = Column(Integer)
+    height = Column(Integer)
+    attempts = Column(Integer, nullable=False, default=0)
+
+
+Index('idx_listing_image_order', ListingImage.listing_id, ListingImage.position, unique=True)
+Index('idx_listing_image_hash', ListingImage.content_hash)
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, Date
+from config.database import Base
+
+
+class StatCounter(Base):
+    """Tranzaksiya ichida yangilanadigan umumiy hisoblagichlar (users, listings, active_listings)"""
+    __tablename__ = "stat_counters"
+
+    name = Column(String(50), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+class DailyStat(Base):
+    """Kunlik rollup: new_users, new_listings, expired_listings"""
+    __tablename__ = "stat_daily"
+
+    day = Column(Date, primary_key=True)
+    metric = Column(String(30), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+class ListingBucket(Base):
+    """Faol e'lonlar taqsimoti: rooms, price_band, district bo'yicha"""
+    __tablename__ = "stat_listing_buckets"
+
+    dimension = Column(String(20), primary_key=True)
+    bucket = Column(String(40), primary_key=True)
+    active_count = Column(Integer, nullable=False, default=0)
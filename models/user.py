@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Float, and_, or_
+from collections import namedtuple
 from sqlalchemy.sql import func
 from config.database import Base
 from sqlalchemy import Index
+from utils.geo import parse_location, grid_cell, grid_ranges
 
 class User(Base):
     __tablename__ = "users"
@@ -24,16 +26,79 @@ class Listing(Base):
     floor = Column(Integer)
     total_floors = Column(Integer)
     price = Column(Integer)
-    currency = Column(String(10), default='USD')
+    currency = Column(String(10), default='USD')  # utils.currency.Currency qiymati
+    price_usd = Column(Integer)  # utils.currency.to_usd - valyutalararo narx filtri uchun
     images = Column(Text)  # JSON string of image file_ids
     location = Column(String(255))  # "latitude,longitude" format
+    latitude = Column(Float)
+    longitude = Column(Float)
+    grid_cell = Column(Integer)  # utils.geo.grid_cell(latitude, longitude)
     phone = Column(String(20))
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     expires_at = Column(DateTime(timezone=True))
+    version = Column(Integer, default=0)  # utils.changes.bump - delta-sync uchun
+
+    def set_location(self, location):
+        """Matnli joylashuvni saqlaydi va lat/lng/grid_cell ni to'ldiradi"""
+        self.location = location
+        coords = parse_location(location)
+        if coords:
+            self.latitude, self.longitude = coords
+            self.grid_cell = grid_cell(*coords)
+        else:
+            self.latitude = self.longitude = self.grid_cell = None
+
+    def snapshot(self):
+        """Sessiyadan mustaqil, o'zgarmas nusxa (cache uchun)"""
+        return ListingRow(*(getattr(self, name) for name in ListingRow._fields))
+
+    @classmethod
+    def in_bbox(cls, south, west, north, east):
+        """Viewport filtri: grid_cell diapazonlari (indeks) + aniq lat/lng tekshiruvi"""
+        cell_filter = or_(*[cls.grid_cell.between(lo, hi) for lo, hi in grid_ranges(south, west, north, east)])
+        return and_(
+            cell_filter,
+            cls.latitude.between(south, north),
+            cls.longitude.between(west, east),
+        )
+
+class ArchivedListing(Base):
+    """Muddati ancha oldin tugagan e'lonlar (sovuq jadval)"""
+    __tablename__ = "listings_archive"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, index=True)
+    title = Column(String(255))
+    description = Column(Text)
+    rooms = Column(Integer)
+    floor = Column(Integer)
+    total_floors = Column(Integer)
+    price = Column(Integer)
+    currency = Column(String(10))
+    price_usd = Column(Integer)
+    images = Column(Text)
+    location = Column(String(255))
+    latitude = Column(Float)
+    longitude = Column(Float)
+    grid_cell = Column(Integer)
+    phone = Column(String(20))
+    is_active = Column(Boolean, default=False)
+    created_at = Column(DateTime(timezone=True))
+    expires_at = Column(DateTime(timezone=True))
+    version = Column(Integer)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# Listing ustunlari bilan bir xil maydonli o'zgarmas qator
+ListingRow = namedtuple('ListingRow', [column.name for column in Listing.__table__.columns])
 
 # Indexlar klasslardan keyin bo'lishi kerak
 Index('idx_user_telegram_id', User.telegram_id)
 Index('idx_listing_user_id', Listing.user_id)
 Index('idx_listing_active', Listing.is_active)
-Index('idx_listing_created', Listing.created_at)
\ No newline at end of file
+Index('idx_listing_created', Listing.created_at)
+Index('idx_listing_active_cell', Listing.is_active, Listing.grid_cell)
+Index('idx_listing_active_expires', Listing.is_active, Listing.expires_at)
+Index('idx_listing_version', Listing.version)
+# Valyutasiz narx filtri (api.listings.apply_filters, utils.search)
+Index('idx_listing_active_rooms_price_usd', Listing.is_active, Listing.rooms, Listing.price_usd)
@@ -0,0 +1,32 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Testlar repo ildizidan import qiladi va hech qachon haqiqiy bazaga yozmaydi
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_db_path = os.path.join(tempfile.mkdtemp(prefix='uyizlang-tests-'), 'test.db')
+os.environ['DATABASE_URL'] = f"sqlite:///{_db_path}"
+os.environ.pop('ASYNC_DATABASE_URL', None)
+
+
+@pytest.fixture
+def db():
+    """Bo'sh jadvallar bilan sync Session"""
+    from config.database import Base, SessionLocal, engine
+    import models.changes, models.cluster, models.currency, models.image, models.stats, models.user  # noqa: F401 - jadvallarni ro'yxatga oladi
+
+    from sqlalchemy import text
+    from utils import search
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        search.create_index(conn)
+        conn.execute(text("DELETE FROM listings_fts"))
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
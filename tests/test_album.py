@@ -0,0 +1,123 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import handlers.listing as listing
+from handlers.listing import IMAGES, LOCATION, MAX_IMAGES, add_images, handle_images
+
+
+def photo(uid):
+    return SimpleNamespace(file_id=f'file-{uid}', file_unique_id=f'uid-{uid}')
+
+
+class FakeApplication:
+    """create_task ni yig'adi; persistence belgilashlarini yozib boradi"""
+
+    def __init__(self):
+        self.tasks = []
+        self.persistence = object()
+        self.marked = []
+
+    def create_task(self, coroutine, update=None):
+        task = asyncio.ensure_future(coroutine)
+        self.tasks.append(task)
+        return task
+
+    def mark_data_for_update_persistence(self, user_ids=None):
+        self.marked.append(user_ids)
+
+
+def make_update(uid, group_id=None, user_id=7):
+    message = SimpleNamespace(photo=[photo(f'{uid}-small'), photo(uid)], media_group_id=group_id)
+    return SimpleNamespace(message=message, effective_user=SimpleNamespace(id=user_id))
+
+
+@pytest.fixture
+def replies(monkeypatch):
+    sent = []
+    monkeypatch.setattr(listing, 'reply_text', lambda update, text, **kwargs: sent.append(text))
+    monkeypatch.setattr(listing, 'ALBUM_WINDOW_MS', 20)
+    listing._albums.clear()
+    return sent
+
+
+def make_context(images=()):
+    user_data = {'images': [], 'image_uids': []}
+    add_images(user_data, [photo(uid) for uid in images])
+    return SimpleNamespace(user_data=user_data, application=FakeApplication())
+
+
+def test_add_images_skips_duplicates_and_caps():
+    user_data = {}
+    assert add_images(user_data, [photo(1), photo(1), photo(2)]) == 2
+    assert user_data['images'] == ['file-1', 'file-2']
+    assert add_images(user_data, [photo(uid) for uid in range(10)]) == MAX_IMAGES - 2
+    assert len(user_data['images']) == MAX_IMAGES
+
+
+def test_single_photo_acknowledged_immediately(replies):
+    context = make_context()
+
+    state = asyncio.run(handle_images(make_update(1), context))
+
+    assert state == IMAGES
+    assert context.user_data['images'] == ['file-1']
+    assert len(replies) == 1 and '1 ta rasm qo' in replies[0]
+    assert not context.application.tasks
+
+
+def test_album_flushed_once_as_one_batch(replies):
+    context = make_context()
+
+    async def scenario():
+        states = [await handle_images(make_update(uid, 'album'), context) for uid in range(3)]
+        # Oyna tugamaguncha hech narsa qo'shilmaydi va javob yuborilmaydi
+        assert context.user_data['images'] == [] and replies == []
+        await asyncio.gather(*context.application.tasks)
+        return states
+
+    states = asyncio.run(scenario())
+
+    assert states == [IMAGES] * 3
+    assert len(context.application.tasks) == 1
+    assert context.user_data['images'] == ['file-0', 'file-1', 'file-2']
+    assert len(replies) == 1 and '3 ta rasm qo' in replies[0]
+    assert context.application.marked == [7]
+    assert not listing._albums
+
+
+def test_album_filling_the_limit_moves_to_location(replies):
+    context = make_context(images=range(4))
+
+    async def scenario():
+        for uid in range(10, 14):
+            await handle_images(make_update(uid, 'album'), context)
+        await asyncio.gather(*context.application.tasks)
+        # Keyingi rasm limitdan keyin keladi - to'g'ridan-to'g'ri joylashuvga
+        return await handle_images(make_update(99), context)
+
+    state = asyncio.run(scenario())
+
+    assert len(context.user_data['images']) == MAX_IMAGES
+    assert 'file-12' not in context.user_data['images']
+    assert 'Barcha' in replies[0]
+    assert 'Maksimum' in replies[1]
+    assert state == LOCATION
+
+
+def test_separate_albums_buffer_separately(replies):
+    context = make_context()
+
+    async def scenario():
+        await handle_images(make_update(1, 'a'), context)
+        await handle_images(make_update(2, 'b'), context)
+        await handle_images(make_update(1, 'b'), context)
+        await asyncio.gather(*context.application.tasks)
+
+    asyncio.run(scenario())
+
+    assert len(context.application.tasks) == 2
+    assert context.user_data['images'] == ['file-1', 'file-2']
+    # b albomidagi 1-rasm a albomida qo'shilgan - takrorlanmaydi
+    assert len(replies) == 2 and all('1 ta rasm qo' in text for text in replies)
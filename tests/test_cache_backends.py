@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from utils.cache import LRUCache
+from utils.cache_backends import SQLiteBackend, TwoLevelBackend
+
+
+@pytest.fixture
+def shared_path(tmp_path):
+    return str(tmp_path / 'cache.db')
+
+
+def _worker(path, poll_interval=0):
+    return TwoLevelBackend(LRUCache(), SQLiteBackend(path), local_ttl=60, poll_interval=poll_interval)
+
+
+def test_shared_hit_is_copied_to_local(shared_path):
+    writer, reader = _worker(shared_path), _worker(shared_path)
+    writer.set('k', 1)
+    assert reader.get('k') == (True, 1)
+    assert reader.local.get('k') == (True, 1)
+
+
+def test_tag_invalidation_drops_local_copy_of_shared_hit(shared_path):
+    writer, worker = _worker(shared_path), _worker(shared_path, poll_interval=3600)
+    writer.set('page', 'old', tags=('user:1',))
+    # Lokal nusxa umumiy darajadan - teglarsiz
+    assert worker.get('page') == (True, 'old')
+    assert worker.invalidate_tag('user:1') == 1
+    assert worker.get('page') == (False, None)
+
+
+def test_own_invalidation_keeps_unrelated_local_entries(shared_path):
+    worker = _worker(shared_path)
+    worker.set('a', 1)
+    worker.set('b', 2)
+    worker.invalidate('a')
+    assert worker._generation == worker.shared.generation()
+    worker.shared.hits = 0
+    assert worker.get('b') == (True, 2)
+    # _sync lokal darajani tozalamadi - umumiy backend ga murojaat bo'lmadi
+    assert worker.shared.hits == 0
+
+
+def test_other_worker_invalidation_clears_local(shared_path):
+    first, second = _worker(shared_path), _worker(shared_path)
+    first.set('k', 1, tags=('t',))
+    assert second.get('k') == (True, 1)
+    first.invalidate_tag('t')
+    assert second.get('k') == (False, None)
+
+
+def test_concurrent_bump_is_not_skipped(shared_path):
+    first, second = _worker(shared_path, poll_interval=3600), _worker(shared_path, poll_interval=3600)
+    second.set('other', 2)
+    # second bilmagan holda first generation ni oshiradi, keyin second o'zinikini
+    first.invalidate('k')
+    second.invalidate('x')
+    assert second._generation == 0
+    second.poll_interval = 0
+    second.get('missing')
+    # first ning invalidatsiyasi o'tkazib yuborilmadi - lokal daraja tozalandi
+    assert second.local.get('other') == (False, None)
+    assert second._generation == second.shared.generation()
+
+
+def test_async_invalidation(shared_path):
+    worker = _worker(shared_path, poll_interval=3600)
+
+    async def scenario():
+        await worker.aset('k', 1, tags=('t',))
+        assert await worker.aget('k') == (True, 1)
+        assert await worker.ainvalidate_tag('t') == 1
+        assert await worker.aget('k') == (False, None)
+        await worker.aset('j', 2)
+        await worker.ainvalidate('j')
+        return await worker.aget('j')
+
+    assert asyncio.run(scenario()) == (False, None)
+    assert worker._generation == worker.shared.generation()
@@ -0,0 +1,101 @@
+import pytest
+
+from models.cluster import ListingCluster
+from models.user import Listing
+from utils import clustering
+
+TASHKENT = (41.311, 69.279)
+
+
+def _listing(db, lat, lng, price, currency='USD'):
+    listing = Listing(title='t', price=price, currency=currency, is_active=True)
+    listing.set_location(f"{lat},{lng}")
+    db.add(listing)
+    db.flush()
+    return listing
+
+
+def _cluster(db, lat, lng, zoom, currency='USD'):
+    cell_x, cell_y = clustering.cell_for(lat, lng, zoom)
+    return db.get(ListingCluster, (zoom, cell_x, cell_y, currency))
+
+
+def test_cell_for_is_inside_cell_bounds():
+    for zoom in (3, 10, 14):
+        cell_x, cell_y = clustering.cell_for(*TASHKENT, zoom)
+        south, west, north, east = clustering.cell_bounds(cell_x, cell_y, zoom)
+        assert south <= TASHKENT[0] <= north
+        assert west <= TASHKENT[1] <= east
+
+
+def test_clamp_zoom():
+    assert clustering.clamp_zoom(0) == clustering.MIN_CLUSTER_ZOOM
+    assert clustering.clamp_zoom(20) == clustering.MAX_CLUSTER_ZOOM
+
+
+def test_add_listings_upserts_every_zoom(db):
+    first = _listing(db, *TASHKENT, 50000)
+    clustering.add_listings(db, [first])
+    clustering.add_listings(db, [_listing(db, 41.3111, 69.2791, 70000)])
+    db.commit()
+
+    assert db.query(ListingCluster).filter(ListingCluster.zoom == 3).count() == 1
+    cluster = _cluster(db, *TASHKENT, 3)
+    assert cluster.count == 2
+    assert cluster.lat_sum == pytest.approx(41.311 + 41.3111)
+    assert (cluster.min_price, cluster.max_price) == (50000, 70000)
+
+
+def test_currencies_are_separate_rows(db):
+    clustering.add_listings(db, [_listing(db, *TASHKENT, 50000), _listing(db, *TASHKENT, 600_000_000, "SO'M")])
+    db.commit()
+    assert _cluster(db, *TASHKENT, 3).count == 1
+    assert _cluster(db, *TASHKENT, 3, "SO'M").count == 1
+
+
+def test_remove_listing_recomputes_price_range_and_deletes_empty(db):
+    cheap = _listing(db, *TASHKENT, 50000)
+    dear = _listing(db, *TASHKENT, 90000)
+    clustering.add_listings(db, [cheap, dear])
+    db.commit()
+
+    dear.is_active = False
+    db.flush()
+    clustering.remove_listing(db, dear)
+    db.commit()
+    cluster = _cluster(db, *TASHKENT, 14)
+    assert cluster.count == 1
+    assert (cluster.min_price, cluster.max_price) == (50000, 50000)
+
+    cheap.is_active = False
+    db.flush()
+    clustering.remove_listing(db, cheap)
+    db.commit()
+    assert db.query(ListingCluster).count() == 0
+
+
+def test_rebuild_matches_incremental(db):
+    listings = [_listing(db, 41.3 + i * 0.01, 69.2 + i * 0.01, 40000 + i * 1000) for i in range(5)]
+    clustering.add_listings(db, listings)
+    db.commit()
+    incremental = {
+        (row.zoom, row.cell_x, row.cell_y, row.currency): (row.count, row.min_price, row.max_price)
+        for row in db.query(ListingCluster)
+    }
+    db.expunge_all()
+    clustering.rebuild(db)
+    rebuilt = {
+        (row.zoom, row.cell_x, row.cell_y, row.currency): (row.count, row.min_price, row.max_price)
+        for row in db.query(ListingCluster)
+    }
+    assert rebuilt == incremental
+
+
+def test_get_clusters_merges_currencies(db):
+    clustering.add_listings(db, [_listing(db, *TASHKENT, 50000), _listing(db, *TASHKENT, 600_000_000, "SO'M")])
+    db.commit()
+    clusters = clustering.get_clusters(db, 5, (41.0, 69.0, 41.5, 69.5))
+    assert len(clusters) == 1
+    assert clusters[0]['count'] == 2
+    assert clusters[0]['center'] == pytest.approx(list(TASHKENT))
+    assert clusters[0]['prices'] == {'USD': [50000, 50000], "SO'M": [600_000_000, 600_000_000]}
@@ -0,0 +1,54 @@
+import pytest
+
+from models.user import Listing, User
+from utils.currency import Currency, load_rates, parse_currency, sync_rates, to_usd
+
+RATES = {Currency.USD: 1.0, Currency.UZS: 12500.0}
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('USD', Currency.USD), ('$', Currency.USD), (' Dollar ', Currency.USD), ('доллар', Currency.USD),
+    ("so'm", Currency.UZS), ('so‘m', Currency.UZS), ("SO'M", Currency.UZS), ('uzs', Currency.UZS),
+    ('сум', Currency.UZS), ('сўм', Currency.UZS),
+    ('eur', None), ('', None), (None, None),
+])
+def test_parse_currency(value, expected):
+    assert parse_currency(value) is expected
+
+
+def test_stored_values_roundtrip():
+    for currency in Currency:
+        assert parse_currency(currency.value) is currency
+
+
+def test_to_usd():
+    assert to_usd(50000, 'USD', RATES) == 50000
+    assert to_usd(625_000_000, "so'm", RATES) == 50000
+    assert to_usd(None, 'USD', RATES) is None
+    assert to_usd(100, 'eur', RATES) is None
+
+
+def test_load_rates_reads_env_each_call(monkeypatch):
+    monkeypatch.setenv('USD_UZS_RATE', '12800')
+    assert load_rates() == {Currency.USD: 1.0, Currency.UZS: 12800.0}
+    monkeypatch.setenv('USD_UZS_RATE', '13000')
+    assert load_rates()[Currency.UZS] == 13000.0
+
+
+def test_sync_rates_recomputes_only_changed(db):
+    user = User(telegram_id=1)
+    db.add(user)
+    db.flush()
+    listing = Listing(user_id=user.id, title="uy", price=625_000_000, currency=Currency.UZS.value, is_active=True)
+    db.add(listing)
+    db.commit()
+
+    assert sync_rates(db, RATES) == [Currency.USD, Currency.UZS]
+    db.commit()
+    assert db.get(Listing, listing.id).price_usd == 50000
+
+    assert sync_rates(db, RATES) == []
+    assert sync_rates(db, {**RATES, Currency.UZS: 12800.0}) == [Currency.UZS]
+    db.commit()
+    db.expire_all()
+    assert db.get(Listing, listing.id).price_usd == 48828
@@ -0,0 +1,85 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from jobs import expiry
+from models.cluster import ListingCluster
+from models.image import ListingImage
+from models.stats import DailyStat, StatCounter
+from models.user import ArchivedListing, Listing, User
+from utils import changes, clustering, search, stats
+
+NOW = datetime(2026, 6, 1, 12, 0)
+
+
+def _seed(db, expires):
+    """Har bir expires_at uchun faol e'lon (agregatlar bilan)"""
+    user = User(telegram_id=1)
+    db.add(user)
+    db.flush()
+    listings = []
+    for i, expires_at in enumerate(expires):
+        listing = Listing(user_id=user.id, title=f"uy {i}", price=50000 + i, currency='USD', price_usd=50000 + i,
+                          is_active=True, expires_at=expires_at)
+        listing.set_location(f"41.3{i},69.2{i}")
+        listings.append(listing)
+    db.add_all(listings)
+    db.flush()
+    db.add_all(ListingImage(listing_id=listing.id, position=0, file_id=f"f{listing.id}") for listing in listings)
+    changes.bump(db, listings)
+    clustering.add_listings(db, listings)
+    search.index_listings(db, listings)
+    stats.add_listings(db, listings, day=NOW.date())
+    db.commit()
+    return [listing.id for listing in listings]
+
+
+def _counter(db, name):
+    return db.get(StatCounter, name).value
+
+
+def test_expire_listings_deactivates_in_batches(db):
+    ids = _seed(db, [NOW - timedelta(days=1), NOW - timedelta(hours=1), NOW - timedelta(minutes=1),
+                     NOW + timedelta(days=1)])
+    version = changes.versions(db)[0]
+
+    assert asyncio.run(expiry.expire_listings(batch_size=2, now=NOW)) == 3
+    db.expire_all()
+    assert [db.get(Listing, i).is_active for i in ids] == [False, False, False, True]
+    # Har batch o'z versiyasini oladi - delta-sync removed sifatida ko'radi
+    assert all(db.get(Listing, i).version > version for i in ids[:3])
+    assert db.query(ListingCluster).filter_by(zoom=3).one().count == 1
+    assert _counter(db, 'active_listings') == 1
+    assert db.get(DailyStat, (NOW.date(), 'expired_listings')).value == 3
+    assert db.execute(text("SELECT rowid FROM listings_fts")).scalars().all() == [ids[3]]
+
+
+def test_expire_listings_is_idempotent(db):
+    _seed(db, [NOW - timedelta(days=1)])
+    assert asyncio.run(expiry.expire_listings(now=NOW)) == 1
+    assert asyncio.run(expiry.expire_listings(now=NOW)) == 0
+
+
+def test_archive_moves_old_inactive_listings(db):
+    ids = _seed(db, [NOW - timedelta(days=40), NOW - timedelta(days=5), NOW + timedelta(days=1)])
+    asyncio.run(expiry.expire_listings(now=NOW))
+    db.expire_all()
+    archived_version = db.get(Listing, ids[0]).version
+
+    assert asyncio.run(expiry.archive_listings(days=30, now=NOW)) == 1
+    db.expire_all()
+    assert db.get(Listing, ids[0]) is None
+    assert db.get(Listing, ids[1]) is not None
+    archived = db.get(ArchivedListing, ids[0])
+    assert (archived.title, archived.price_usd, archived.version) == ('uy 0', 50000, archived_version)
+    assert db.query(ListingImage).filter_by(listing_id=ids[0]).count() == 0
+    # Shu versiyagacha ko'rgan tokenlar reset oladi
+    assert changes.versions(db)[1] == archived_version
+    assert _counter(db, 'listings') == 2
+
+
+def test_archive_disabled_by_default(db):
+    _seed(db, [NOW - timedelta(days=400)])
+    asyncio.run(expiry.expire_listings(now=NOW))
+    assert asyncio.run(expiry.archive_listings(days=0, now=NOW)) == 0
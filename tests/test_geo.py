@@ -0,0 +1,45 @@
+import pytest
+
+from utils import geo
+
+
+def test_parse_location():
+    assert geo.parse_location('41.31, 69.24') == (41.31, 69.24)
+    assert geo.parse_location('41.31;69.24') == (41.31, 69.24)
+    assert geo.parse_location('91,0') is None
+    assert geo.parse_location('abc,1') is None
+    assert geo.parse_location('') is None
+
+
+@pytest.mark.parametrize('lat, lng', [(41.3111, 69.2797), (-33.8688, 151.2093), (0.0, 0.0), (89.999, 179.999)])
+def test_grid_cell_roundtrip(lat, lng):
+    cell = geo.grid_cell(lat, lng)
+    assert cell // geo.GRID_COLS == geo.grid_row(lat)
+    assert cell % geo.GRID_COLS == geo.grid_col(lng)
+
+
+def test_grid_col_clamps_antimeridian():
+    assert geo.grid_col(180.0) == geo.GRID_COLS - 1
+    assert geo.grid_col(-180.0) == 0
+
+
+def test_grid_ranges_cover_bbox():
+    south, west, north, east = 41.25, 69.15, 41.35, 69.35
+    ranges = geo.grid_ranges(south, west, north, east)
+    assert len(ranges) == geo.grid_row(north) - geo.grid_row(south) + 1
+    for lat in (south, 41.3, north):
+        for lng in (west, 69.25, east):
+            cell = geo.grid_cell(lat, lng)
+            assert any(lo <= cell <= hi for lo, hi in ranges)
+    assert not any(lo <= geo.grid_cell(41.3, 69.4) <= hi for lo, hi in ranges)
+
+
+def test_grid_ranges_collapse_for_large_bbox():
+    ranges = geo.grid_ranges(30.0, 60.0, 45.0, 75.0)
+    assert ranges == [(geo.grid_cell(30.0, 60.0), geo.grid_cell(45.0, 75.0))]
+
+
+def test_haversine_km():
+    assert geo.haversine_km(41.3, 69.2, 41.3, 69.2) == 0
+    # Toshkent - Samarqand ~ 270 km
+    assert 260 < geo.haversine_km(41.2995, 69.2401, 39.6542, 66.9597) < 280
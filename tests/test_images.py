@@ -0,0 +1,129 @@
+import asyncio
+import io
+import os
+
+import pytest
+
+from jobs import images
+from models.image import ListingImage
+from utils import image_cache as image_cache_module
+from utils.image_cache import VARIANTS, ImageCache, content_hash
+
+
+class FakeFile:
+    def __init__(self, data, file_unique_id):
+        self.data = data
+        self.file_unique_id = file_unique_id
+
+    async def download_as_bytearray(self):
+        return bytearray(self.data)
+
+
+class FakeBot:
+    """file_id -> baytlar; ro'yxatda yo'q fayl uchun xato"""
+
+    def __init__(self, files):
+        self.files = files
+        self.requests = []
+
+    async def get_file(self, file_id):
+        self.requests.append(file_id)
+        if file_id not in self.files:
+            raise RuntimeError('file not found')
+        return FakeFile(self.files[file_id], f"u-{file_id}")
+
+
+def fake_render(data):
+    # Pillow ixtiyoriy - job oqimini tekshirish uchun variantlar soxtalanadi
+    return {variant: data + variant.encode() for variant in VARIANTS}, (len(data), 10)
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ImageCache(root=str(tmp_path), max_bytes=10 ** 6)
+    monkeypatch.setattr(images, 'image_cache', cache)
+    monkeypatch.setattr(images, 'render_variants', fake_render)
+    return cache
+
+
+def test_cache_put_get_and_evict(tmp_path):
+    cache = ImageCache(root=str(tmp_path), max_bytes=100)
+    old, new = content_hash(b'old'), content_hash(b'new')
+    cache.put(old, {variant: b'x' * 30 for variant in VARIANTS})
+    os.utime(cache.path(old, 'thumb'), (0, 0))
+    os.utime(cache.path(old, 'medium'), (0, 0))
+    assert cache.has(old) and cache.size() == 60
+
+    cache.put(new, {variant: b'y' * 30 for variant in VARIANTS})
+
+    # Limit (100) oshdi - eng eski fayllar 90 baytgacha o'chiriladi
+    assert not cache.has(old) and cache.has(new)
+    assert cache.size() == 90 and cache.evictions == 1
+    assert cache.get(new, 'missing') is None
+
+
+def test_process_pending_stores_variants_and_hashes(db, cache):
+    db.add_all([
+        ListingImage(listing_id=1, position=0, file_id='a'),
+        ListingImage(listing_id=1, position=1, file_id='b'),
+        ListingImage(listing_id=2, position=0, file_id='a'),
+    ])
+    db.commit()
+    bot = FakeBot({'a': b'aaaa', 'b': b'bb'})
+
+    assert asyncio.run(images.process_pending(bot)) == 3
+
+    db.expire_all()
+    rows = db.query(ListingImage).order_by(ListingImage.id).all()
+    assert [row.content_hash for row in rows] == [content_hash(b'aaaa'), content_hash(b'bb'), content_hash(b'aaaa')]
+    assert [(row.width, row.height) for row in rows[:2]] == [(4, 10), (2, 10)]
+    assert rows[0].file_unique_id == 'u-a'
+    with open(cache.path(content_hash(b'bb'), 'thumb'), 'rb') as f:
+        assert f.read() == b'bbthumb'
+    # Hammasi ishlangan - keyingi o'tish hech narsa yuklamaydi
+    bot.requests.clear()
+    assert asyncio.run(images.process_pending(bot)) == 0
+    assert bot.requests == []
+
+
+def test_process_image_skips_render_when_cached(cache, monkeypatch):
+    digest = content_hash(b'cached')
+    cache.put(digest, {variant: b'z' for variant in VARIANTS})
+    monkeypatch.setattr(images, 'render_variants', lambda data: pytest.fail('qayta render qilinmasligi kerak'))
+    image = ListingImage(file_id='c')
+
+    result = asyncio.run(images.process_image(FakeBot({'c': b'cached'}), image))
+
+    assert result == (digest, None, 'u-c')
+
+
+def test_failed_downloads_count_attempts_until_limit(db, cache):
+    db.add_all([ListingImage(listing_id=1, position=0, file_id='gone'),
+                ListingImage(listing_id=1, position=1, file_id='ok')])
+    db.commit()
+    bot = FakeBot({'ok': b'ok'})
+
+    assert asyncio.run(images.process_pending(bot)) == 1
+    for _ in range(images.IMAGE_MAX_ATTEMPTS - 1):
+        assert asyncio.run(images.process_pending(bot)) == 0
+
+    db.expire_all()
+    failed = db.query(ListingImage).filter_by(file_id='gone').one()
+    assert failed.attempts == images.IMAGE_MAX_ATTEMPTS and failed.content_hash is None
+    # Limitga yetgan rasm boshqa so'ralmaydi
+    bot.requests.clear()
+    asyncio.run(images.process_pending(bot))
+    assert bot.requests == []
+
+
+def test_render_variants_fit_max_side():
+    Image = pytest.importorskip('PIL.Image')
+    buffer = io.BytesIO()
+    Image.new('RGB', (1600, 1200), 'red').save(buffer, 'PNG')
+
+    variants, size = image_cache_module.render_variants(buffer.getvalue())
+
+    assert size == (1600, 1200)
+    for variant, (max_side, _) in VARIANTS.items():
+        with Image.open(io.BytesIO(variants[variant])) as rendered:
+            assert rendered.format == 'WEBP' and max(rendered.size) == max_side
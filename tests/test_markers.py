@@ -0,0 +1,87 @@
+import json
+import struct
+import sys
+from array import array
+from datetime import datetime, timezone
+
+from api.markers import COORD_SCALE, HEADER, MAGIC, TRUNCATED, encode_markers, epoch
+from models.user import ListingRow
+
+
+def _row(**values):
+    defaults = {name: None for name in ListingRow._fields}
+    return ListingRow(**dict(defaults, **values))
+
+
+def decode(data):
+    """index.html::decodeMarkers ning Python nusxasi"""
+    magic, count, version, flags, table_len = HEADER.unpack_from(data)
+    assert magic == MAGIC
+    offset = HEADER.size
+    currencies = json.loads(data[offset:offset + table_len])
+    offset += table_len
+    offset += -offset % 8
+
+    columns = []
+    for typecode in ('d', 'I', 'i', 'i', 'I', 'B', 'B'):
+        column = array(typecode)
+        size = column.itemsize * count
+        column.frombytes(data[offset:offset + size])
+        if sys.byteorder == 'big':
+            column.byteswap()
+        columns.append(column)
+        offset += size
+    assert offset == len(data)
+
+    prices, ids, lat_deltas, lng_deltas, created, rooms, codes = columns
+    lat = lng = 0
+    rows = []
+    for i in range(count):
+        lat += lat_deltas[i]
+        lng += lng_deltas[i]
+        rows.append({
+            'id': ids[i], 'price': prices[i], 'lat': lat / COORD_SCALE, 'lng': lng / COORD_SCALE,
+            'created_at': created[i], 'rooms': rooms[i], 'currency': currencies[codes[i]],
+        })
+    return version, flags, rows
+
+
+def test_roundtrip():
+    created = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    rows = [
+        _row(id=7, latitude=41.311081, longitude=69.240562, rooms=3, price=85000,
+             currency='USD', created_at=created, grid_cell=20),
+        _row(id=3, latitude=41.2, longitude=69.1, rooms=1, price=900_000_000,
+             currency="SO'M", created_at=created, grid_cell=10),
+    ]
+    version, flags, decoded = decode(encode_markers(rows, 42))
+    assert (version, flags) == (42, 0)
+    # grid_cell bo'yicha tartiblangan - yaqin pinlar yonma-yon
+    assert [row['id'] for row in decoded] == [3, 7]
+    assert decoded[1] == {
+        'id': 7, 'price': 85000.0, 'lat': 41.311081, 'lng': 69.240562,
+        'created_at': int(created.timestamp()), 'rooms': 3, 'currency': 'USD',
+    }
+    assert decoded[0]['currency'] == "SO'M"
+
+
+def test_missing_values_and_truncated_flag():
+    rows = [_row(id=1, latitude=-33.8688, longitude=151.2093, rooms=300)]
+    version, flags, decoded = decode(encode_markers(rows, 1, truncated=True))
+    assert flags == TRUNCATED
+    row = decoded[0]
+    assert row['price'] != row['price']  # NaN - narx yo'q
+    assert (row['rooms'], row['currency'], row['created_at']) == (255, '', 0)
+    assert (row['lat'], row['lng']) == (-33.8688, 151.2093)
+
+
+def test_empty_payload_is_aligned():
+    data = encode_markers([], 5)
+    assert len(data) % 8 == 0
+    assert decode(data) == (5, 0, [])
+
+
+def test_epoch_treats_naive_as_utc():
+    naive = datetime(2026, 1, 1)
+    assert epoch(naive) == epoch(naive.replace(tzinfo=timezone.utc))
+    assert epoch(None) == 0
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from bot.app import build_application
+from utils.persistence import SQLitePersistence, decode_user_data, encode_user_data
+
+TOKEN = '123456:TEST'
+
+
+def test_user_data_encoding_roundtrip():
+    data = {'title': 'Uy', 'images': ['a', 'b'], 'custom': 1}
+    encoded = encode_user_data(data)
+    assert '"t":"Uy"' in encoded and '"custom":1' in encoded
+    assert decode_user_data(encoded) == data
+
+
+def test_flush_and_reload(tmp_path):
+    path = str(tmp_path / 'state.db')
+
+    async def write():
+        persistence = SQLitePersistence(path, flush_delay=0.01)
+        await persistence.update_user_data(1, {'title': 'Qoralama', 'rooms': 3})
+        await persistence.update_user_data(2, {'title': 'Tashlanadi'})
+        await persistence.update_conversation('listing', (1, 1), 4)
+        await persistence.update_conversation('listing', (2, 2), 1)
+        await asyncio.sleep(0.05)
+        await persistence.drop_user_data(2)
+        await persistence.update_conversation('listing', (2, 2), None)
+        await persistence.flush()
+        return persistence.flushes
+
+    async def read():
+        persistence = SQLitePersistence(path)
+        return await persistence.get_user_data(), await persistence.get_conversations('listing')
+
+    assert asyncio.run(write()) == 2
+    user_data, conversations = asyncio.run(read())
+    assert user_data == {1: {'title': 'Qoralama', 'rooms': 3}}
+    assert conversations == {(1, 1): 4}
+
+
+def test_updates_during_write_are_not_lost(tmp_path):
+    path = str(tmp_path / 'state.db')
+
+    async def scenario():
+        persistence = SQLitePersistence(path, flush_delay=0.01)
+        original = persistence._write_sync
+
+        def slow_write(*args):
+            import time
+            time.sleep(0.05)
+            original(*args)
+
+        persistence._write_sync = slow_write
+        await persistence.update_user_data(1, {'title': 'birinchi'})
+        await asyncio.sleep(0.03)
+        # Birinchi yozuv davom etayotganda keladi
+        await persistence.update_user_data(1, {'title': 'ikkinchi'})
+        await asyncio.sleep(0.2)
+        reloaded = await SQLitePersistence(path).get_user_data()
+        await persistence.flush()
+        return reloaded
+
+    assert asyncio.run(scenario()) == {1: {'title': 'ikkinchi'}}
+
+
+def test_failed_write_is_retried(tmp_path):
+    path = str(tmp_path / 'state.db')
+
+    async def scenario():
+        persistence = SQLitePersistence(path, update_interval=0.02, flush_delay=0.01)
+        original = persistence._write_sync
+        calls = []
+
+        def flaky_write(*args):
+            calls.append(1)
+            if len(calls) == 1:
+                raise OSError('disk')
+            original(*args)
+
+        persistence._write_sync = flaky_write
+        await persistence.update_user_data(1, {'title': 'uy'})
+        await asyncio.sleep(0.1)
+        await persistence.flush()
+        return len(calls), await SQLitePersistence(path).get_user_data()
+
+    calls, user_data = asyncio.run(scenario())
+    assert calls == 2
+    assert user_data == {1: {'title': 'uy'}}
+
+
+# APScheduler o'rnatilmagan muhitda JobQueue yo'q - build_application buni o'zi qayd qiladi
+@pytest.mark.filterwarnings('ignore:No `JobQueue` set up')
+def test_application_wires_persistence_and_rate_limit(tmp_path):
+    persistence = SQLitePersistence(str(tmp_path / 'state.db'))
+    application = build_application(TOKEN, persistence)
+    assert application.persistence is persistence
+    # Rate limit middleware barcha handlerlardan oldin (group=-1)
+    assert -1 in application.handlers
+    names = {getattr(handler, 'name', None) for handler in application.handlers[0]}
+    assert {'start', 'listing', 'search'} <= names
+
+
+def test_persistent_conversations_require_persistence():
+    from telegram.ext import Application
+    from bot.app import add_handlers
+
+    with pytest.raises(ValueError):
+        add_handlers(Application.builder().token(TOKEN).build())
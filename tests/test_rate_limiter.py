@@ -0,0 +1,63 @@
+from utils.rate_limiter import MemoryStore, RateLimiter, SQLiteStore
+
+
+def _params(limit, window):
+    interval = window / limit
+    return interval, interval * (limit - 1)
+
+
+def test_gcra_allows_burst_then_blocks():
+    store = MemoryStore()
+    interval, tau = _params(5, 60)
+    assert all(store.acquire('k', interval, tau, 1000.0)[0] for _ in range(5))
+    allowed, retry_after = store.acquire('k', interval, tau, 1000.0)
+    assert not allowed
+    assert retry_after == interval
+
+
+def test_gcra_refills_one_slot_per_interval():
+    store = MemoryStore()
+    interval, tau = _params(5, 60)
+    for _ in range(5):
+        store.acquire('k', interval, tau, 0.0)
+    assert not store.acquire('k', interval, tau, interval - 0.01)[0]
+    assert store.acquire('k', interval, tau, interval)[0]
+    assert not store.acquire('k', interval, tau, interval)[0]
+
+
+def test_gcra_keys_are_independent():
+    store = MemoryStore()
+    interval, tau = _params(1, 60)
+    assert store.acquire('a', interval, tau, 0.0)[0]
+    assert not store.acquire('a', interval, tau, 0.0)[0]
+    assert store.acquire('b', interval, tau, 0.0)[0]
+
+
+def test_sweep_drops_only_idle_keys():
+    store = MemoryStore()
+    interval, tau = _params(5, 60)
+    store.acquire('old', interval, tau, 0.0)
+    store.acquire('new', interval, tau, 100.0)
+    assert store.sweep(50.0) == 1
+    assert len(store) == 1
+
+
+def test_sqlite_store_matches_memory(tmp_path):
+    store = SQLiteStore(str(tmp_path / 'rl.db'))
+    interval, tau = _params(2, 10)
+    assert store.acquire('k', interval, tau, 0.0) == (True, 0.0)
+    assert store.acquire('k', interval, tau, 0.0) == (True, 0.0)
+    assert store.acquire('k', interval, tau, 0.0) == (False, interval)
+    assert store.sweep(100.0) == 1
+
+
+def test_limiter_scopes_and_warning(monkeypatch):
+    limiter = RateLimiter(MemoryStore(), {'default': (2, 60), 'search': (1, 60)})
+    monkeypatch.setattr('utils.rate_limiter.time.time', lambda: 1000.0)
+    assert limiter.check(1, 'search')[0]
+    assert not limiter.check(1, 'search')[0]
+    # Noma'lum scope default limitni oladi
+    assert limiter.check(1, 'unknown')[0]
+    assert limiter.should_warn(1, 30.0, 1000.0)
+    assert not limiter.should_warn(1, 30.0, 1010.0)
+    assert limiter.should_warn(1, 30.0, 1031.0)
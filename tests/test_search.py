@@ -0,0 +1,95 @@
+from utils.search import build_match_query, normalize, parse_query
+
+
+def test_normalize_apostrophes_cyrillic_and_h():
+    assert normalize("Yo'l") == normalize('Yo‘l') == normalize('Yoʻl') == 'yol'
+    assert normalize('Ҳовли') == normalize('hovli') == 'xovli'
+    assert normalize('Шаҳар') == 'shaxar'
+
+
+def test_parse_query_latin():
+    text, filters = parse_query('Chilonzor 3 xonali 50000-80000 usd')
+    assert text == 'chilonzor'
+    assert filters == {'rooms': 3, 'min_price': 50000, 'max_price': 80000, 'currency': 'USD'}
+
+
+def test_parse_query_cyrillic():
+    text, filters = parse_query('Чилонзор 3 хонали 5 этаж 80000 гача сум')
+    assert text == 'chilonzor'
+    assert filters == {'rooms': 3, 'floor': 5, 'max_price': 80000, 'currency': "SO'M"}
+
+
+def test_parse_query_spaced_numbers_and_dollar_sign():
+    text, filters = parse_query('2 xona 50 000 - 70 000 $ metro yaqin')
+    assert text == 'metro yaqin'
+    assert filters == {'rooms': 2, 'min_price': 50000, 'max_price': 70000, 'currency': 'USD'}
+
+
+def test_parse_query_plain_text():
+    assert parse_query('  Yunusobod   hovli ') == ('yunusobod xovli', {})
+
+
+def test_build_match_query_prefixes():
+    assert build_match_query('Kvartira Chilonzor') == '"kvartira"* "chilonzor"*'
+    assert build_match_query("  ''  ") == ''
+
+
+def _index(db, *rows):
+    from models.user import Listing
+    from utils import search
+
+    listings = [
+        Listing(title=title, description=description, rooms=rooms, price=price, currency='USD', price_usd=price,
+                is_active=True)
+        for title, description, rooms, price in rows
+    ]
+    db.add_all(listings)
+    db.flush()
+    search.index_listings(db, listings)
+    db.commit()
+    return [listing.id for listing in listings]
+
+
+def test_search_ranks_title_matches_first(db):
+    from utils.search import search
+
+    in_description, in_title = _index(db, ('Uy', 'Chilonzor yaqinida', 2, 50000), ('Chilonzor kvartira', '', 2, 60000))
+    results, has_more, ranked = search(db, 'chilonzor')
+    assert [row.id for row in results] == [in_title, in_description]
+    assert (has_more, ranked) == (False, True)
+
+
+def test_search_applies_filters_and_pages(db):
+    from utils.search import search
+
+    ids = _index(db, *[(f"Yunusobod {i}", '', 3 if i % 2 else 2, 40000 + i * 10000) for i in range(8)])
+    results, has_more, _ = search(db, 'yunusobod', {'rooms': 3, 'max_price': 110000}, page=0, page_size=2)
+    assert {row.id for row in results} <= {ids[1], ids[3], ids[5], ids[7]}
+    assert has_more
+    # Matnsiz - faqat filtrlar, eng yangilari birinchi
+    results, _, _ = search(db, '', {'min_price': 100000})
+    assert [row.id for row in results] == [ids[7], ids[6]]
+
+
+def test_search_over_cap_falls_back_to_newest(db, monkeypatch):
+    from utils import search
+
+    ids = _index(db, *[('Sergeli uy', '', 1, 1000) for _ in range(3)])
+    monkeypatch.setattr(search, 'RANK_MAX_MATCHES', 2)
+    results, _, ranked = search.search(db, 'sergeli')
+    assert not ranked
+    assert [row.id for row in results] == ids[::-1]
+
+
+def test_search_without_fts_uses_ilike(db, monkeypatch):
+    from utils import search
+
+    hit, _, inactive = _index(db, ('Mirobod kvartira', '', 2, 50000), ('Olmazor', 'mirobod emas', 3, 50000),
+                              ('Mirobod eski', '', 2, 50000))
+    from models.user import Listing
+    db.get(Listing, inactive).is_active = False
+    db.commit()
+    monkeypatch.setattr(search, 'is_supported', lambda bind: False)
+    results, has_more, ranked = search.search(db, 'mirobod', {'rooms': 2})
+    assert [row.id for row in results] == [hit]
+    assert (has_more, ranked) == (False, True)
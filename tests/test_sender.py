@@ -0,0 +1,109 @@
+import asyncio
+import time
+from datetime import timedelta
+
+import pytest
+from telegram.error import RetryAfter
+
+from utils.sender import BULK, INTERACTIVE, MAX_RETRIES, OutboundQueue
+
+
+@pytest.fixture(autouse=True)
+def timedelta_retry_after(monkeypatch):
+    # PTB 22 da RetryAfter.retry_after keyinchalik timedelta bo'ladi - sender ikkalasini ham qabul qiladi
+    monkeypatch.setenv('PTB_TIMEDELTA', '1')
+
+
+class FakeBot:
+    """Chaqiruvlarni yozib boradi; failures - chat_id -> ketma-ket RetryAfter soni"""
+
+    def __init__(self, failures=None, retry_after=timedelta(milliseconds=50)):
+        self.calls = []
+        self.failures = dict(failures or {})
+        self.retry_after = retry_after
+
+    async def _call(self, method, chat_id, **kwargs):
+        if self.failures.get(chat_id):
+            self.failures[chat_id] -= 1
+            raise RetryAfter(self.retry_after)
+        self.calls.append((time.monotonic(), method, chat_id, kwargs.get('text') or kwargs.get('photo')))
+        await asyncio.sleep(0)
+        return len(self.calls)
+
+    async def send_message(self, chat_id, **kwargs):
+        return await self._call('send_message', chat_id, **kwargs)
+
+    async def send_photo(self, chat_id, **kwargs):
+        return await self._call('send_photo', chat_id, **kwargs)
+
+
+def _run(queue, submit):
+    async def scenario():
+        futures = submit()
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        await queue.close()
+        return results
+    return asyncio.run(scenario())
+
+
+def test_interactive_chats_go_before_bulk_but_chat_order_is_fifo():
+    bot, queue = FakeBot(), OutboundQueue(global_rate=1000, chat_interval=0)
+    _run(queue, lambda: [
+        queue.submit(bot, 'send_photo', 1, BULK, photo='a1'),
+        queue.submit(bot, 'send_photo', 2, INTERACTIVE, photo='b1'),
+        queue.submit(bot, 'send_photo', 1, INTERACTIVE, photo='a2'),
+    ])
+    assert [call[3] for call in bot.calls] == ['b1', 'a1', 'a2']
+
+
+def test_consecutive_texts_are_coalesced():
+    bot, queue = FakeBot(), OutboundQueue(global_rate=1000, chat_interval=0)
+    first, second = _run(queue, lambda: [
+        queue.submit(bot, 'send_message', 1, text='salom'),
+        queue.submit(bot, 'send_message', 1, text='dunyo'),
+    ])
+    assert [call[3] for call in bot.calls] == ['salom\n\ndunyo']
+    assert first == second == 1
+
+
+def test_retry_after_requeues_at_chat_head():
+    bot = FakeBot(failures={1: 1})
+    queue = OutboundQueue(global_rate=1000, chat_interval=0)
+    started = time.monotonic()
+    _run(queue, lambda: [
+        queue.submit(bot, 'send_photo', 1, photo='first'),
+        queue.submit(bot, 'send_photo', 1, photo='second'),
+        queue.submit(bot, 'send_photo', 2, photo='other'),
+    ])
+    order = [call[3] for call in bot.calls]
+    # Pauzadagi chat boshqa chatni to'smaydi, o'z tartibini esa saqlaydi
+    assert order.index('first') < order.index('second')
+    assert queue.retried == 1
+    assert min(call[0] for call in bot.calls if call[2] == 1) - started >= 0.05
+
+
+def test_retry_after_gives_up_after_max_retries():
+    bot = FakeBot(failures={1: MAX_RETRIES + 1}, retry_after=timedelta(milliseconds=1))
+    queue = OutboundQueue(global_rate=1000, chat_interval=0)
+    results = _run(queue, lambda: [queue.submit(bot, 'send_photo', 1, photo='x')])
+    assert isinstance(results[0], RetryAfter)
+    assert bot.calls == []
+    assert queue.depth() == 0
+
+
+def test_per_chat_interval_is_enforced():
+    bot = FakeBot()
+    queue = OutboundQueue(global_rate=1000, chat_interval=0.05, chat_burst=1)
+    _run(queue, lambda: [queue.submit(bot, 'send_photo', 1, photo=str(i)) for i in range(3)])
+    times = [call[0] for call in bot.calls]
+    assert all(later - earlier >= 0.045 for earlier, later in zip(times, times[1:]))
+
+
+def test_global_rate_limits_all_chats():
+    bot = FakeBot()
+    queue = OutboundQueue(global_rate=20, chat_interval=0)
+    started = time.monotonic()
+    _run(queue, lambda: [queue.submit(bot, 'send_photo', chat_id, photo='x') for chat_id in range(30)])
+    # 20 ta token darhol, qolgan 10 tasi ~0.5 s da
+    assert time.monotonic() - started == pytest.approx(0.5, abs=0.2)
+    assert queue.sent == 30
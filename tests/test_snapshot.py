@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from jobs import snapshot
+from models.user import Listing, User
+from utils import changes
+
+
+def _write(root, version=1):
+    return snapshot.write_snapshot(str(root), version, {'k': []}, {'k': {}})
+
+
+def _versions(root):
+    return sorted(name for name in os.listdir(root) if name.startswith('v'))
+
+
+@pytest.fixture
+def frozen_time(monkeypatch):
+    # Bir soniya ichidagi build lar bir xil papka nomini oladi
+    monkeypatch.setattr(snapshot.time, 'time', lambda: 1000.0)
+
+
+def test_tile_key_matches_grid():
+    assert snapshot.tile_key(41.31, 69.24, step=0.1) == '1313_2492'
+    assert snapshot.tile_key(-0.05, -0.05, step=0.1) == '899_1799'
+
+
+def test_write_snapshot_publishes_manifest_and_files(tmp_path):
+    manifest = snapshot.write_snapshot(str(tmp_path), 7, {'a': [], 'b': []}, {'a': {1: {'id': 1}}, 'b': {}})
+
+    assert snapshot.read_manifest(str(tmp_path)) == manifest
+    assert manifest['version'] == 7 and manifest['tiles'] == {'a': 0, 'b': 0}
+    version_dir = tmp_path / manifest['path']
+    assert json.loads((version_dir / 'details' / 'a.json').read_text()) == {'1': {'id': 1}}
+    assert (version_dir / 'tiles' / 'b.bin').exists() and (version_dir / 'tiles' / 'b.bin.gz').exists()
+    # Vaqtinchalik fayl va papkalar qolmaydi
+    assert sorted(os.listdir(tmp_path)) == [snapshot.MANIFEST, manifest['path']]
+
+
+def test_same_second_build_gets_suffix(tmp_path, frozen_time):
+    first = _write(tmp_path)
+    second = _write(tmp_path)
+
+    assert first['path'] == 'v1-1000'
+    assert second['path'] == 'v1-1000-1'
+    assert snapshot.read_manifest(str(tmp_path))['path'] == 'v1-1000-1'
+    assert _versions(tmp_path) == ['v1-1000', 'v1-1000-1']
+
+
+def test_prune_keeps_newest_and_removes_stale_tmp(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_KEEP', 2)
+    for version in range(1, 4):
+        os.makedirs(tmp_path / f"v{version}-100")
+        os.utime(tmp_path / f"v{version}-100", (version, version))
+    os.makedirs(tmp_path / '.v9-1.old.tmp')
+    os.utime(tmp_path / '.v9-1.old.tmp', (0, 0))
+    os.makedirs(tmp_path / '.v9-2.running.tmp')
+
+    snapshot.prune_snapshots(str(tmp_path), keep='v1-100', count=2)
+
+    # Manifest ko'rsatayotgan papka eski bo'lsa ham saqlanadi
+    assert _versions(tmp_path) == ['v1-100', 'v2-100', 'v3-100']
+    snapshot.prune_snapshots(str(tmp_path), keep='v3-100', count=2)
+    assert _versions(tmp_path) == ['v2-100', 'v3-100']
+    # Eski tmp o'chiriladi, yangisi (parallel build) qoladi
+    assert not (tmp_path / '.v9-1.old.tmp').exists()
+    assert (tmp_path / '.v9-2.running.tmp').exists()
+
+
+def test_failed_write_leaves_no_tmp(tmp_path, monkeypatch):
+    def broken(rows, version):
+        raise RuntimeError('encode')
+    monkeypatch.setattr(snapshot, 'encode_markers', broken)
+
+    with pytest.raises(RuntimeError):
+        _write(tmp_path)
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_build_snapshot_exports_active_listings(db, tmp_path):
+    user = User(telegram_id=1)
+    db.add(user)
+    db.flush()
+    listings = []
+    for location, active in (("41.31,69.24", True), ("41.32,69.24", True), ("40.1,71.7", True), ("41.3,69.2", False)):
+        listing = Listing(user_id=user.id, title="uy", price=1000, currency='USD', is_active=active)
+        listing.set_location(location)
+        listings.append(listing)
+    db.add_all(listings)
+    db.flush()
+    changes.bump(db, listings)
+    db.commit()
+    root = str(tmp_path)
+
+    manifest = asyncio.run(snapshot.build_snapshot(root))
+
+    assert manifest['version'] == changes.versions(db)[0]
+    assert sorted(manifest['tiles'].values()) == [1, 2]
+    tile = snapshot.tile_key(41.31, 69.24)
+    with open(os.path.join(root, manifest['path'], 'details', f"{tile}.json")) as f:
+        assert sorted(json.load(f)) == [str(listings[0].id), str(listings[1].id)]
+    # Versiya o'zgarmagan - qayta build qilinmaydi
+    assert asyncio.run(snapshot.build_snapshot(root)) is None
+    assert asyncio.run(snapshot.build_snapshot(root, force=True))['version'] == manifest['version']
@@ -0,0 +1,111 @@
+from datetime import date, datetime
+
+from models.stats import DailyStat, ListingBucket, StatCounter
+from models.user import Listing, User
+from utils import stats
+
+DAY = date(2026, 6, 1)
+
+
+def _listing(user, rooms, price, currency='USD', location="41.31,69.24", **kwargs):
+    listing = Listing(user_id=user.id, title="uy", rooms=rooms, price=price, currency=currency,
+                      is_active=True, created_at=datetime(2026, 5, 30, 9), **kwargs)
+    listing.set_location(location)
+    return listing
+
+
+def _seed(db, specs):
+    user = User(telegram_id=1, created_at=datetime(2026, 5, 29, 8))
+    db.add(user)
+    db.flush()
+    listings = [_listing(user, *spec) for spec in specs]
+    db.add_all(listings)
+    db.flush()
+    return listings
+
+
+def _buckets(db, dimension):
+    return {row.bucket: row.active_count for row in db.query(ListingBucket).filter_by(dimension=dimension)}
+
+
+def _daily(db):
+    return {(row.day, row.metric): row.value for row in db.query(DailyStat)}
+
+
+def test_price_band_edges():
+    assert stats.price_band(0, 'USD') == 'USD 0-20000'
+    assert stats.price_band(20000, 'USD') == 'USD 20000-40000'
+    assert stats.price_band(250000, 'USD') == 'USD 200000+'
+    assert stats.price_band(-1, 'USD') is None
+    assert stats.price_band(100, 'EUR') is None
+    assert stats.price_band(None, 'USD') is None
+
+
+def test_add_listings_accumulates_across_calls(db):
+    listings = _seed(db, [(2, 30000), (2, 50000), (3, 50000)])
+
+    stats.add_listings(db, listings[:2], day=DAY)
+    stats.add_listings(db, listings[2:], day=DAY)
+    stats.add_users(db, 2, day=DAY)
+    db.commit()
+
+    assert db.get(StatCounter, 'listings').value == 3
+    assert db.get(StatCounter, 'active_listings').value == 3
+    assert db.get(StatCounter, 'users').value == 2
+    assert _daily(db) == {(DAY, 'new_listings'): 3, (DAY, 'new_users'): 2}
+    assert _buckets(db, 'rooms') == {'2': 2, '3': 1}
+    assert _buckets(db, 'price_band') == {'USD 20000-40000': 1, 'USD 40000-60000': 2}
+    assert sum(_buckets(db, 'district').values()) == 3
+
+
+def test_remove_listings_deletes_empty_buckets(db):
+    listings = _seed(db, [(2, 30000), (3, 50000)])
+    stats.add_listings(db, listings, day=DAY)
+
+    stats.remove_listings(db, listings[1:], day=DAY)
+    stats.forget_listings(db, 1)
+    db.commit()
+
+    assert db.get(StatCounter, 'active_listings').value == 1
+    assert db.get(StatCounter, 'listings').value == 1
+    assert _daily(db)[(DAY, 'expired_listings')] == 1
+    # 3 xonali va 40000-60000 oralig'ida faol e'lon qolmadi - qatorlar o'chirildi
+    assert _buckets(db, 'rooms') == {'2': 1}
+    assert _buckets(db, 'price_band') == {'USD 20000-40000': 1}
+
+
+def test_rebuild_recomputes_and_keeps_expired_history(db):
+    listings = _seed(db, [(2, 30000), (3, 50000)])
+    listings[1].is_active = False
+    stats._apply(db, {'listings': 99, 'active_listings': 99}, {(DAY, 'new_listings'): 99,
+                                                              (DAY, 'expired_listings'): 4}, {('rooms', '9'): 5})
+    db.commit()
+
+    stats.rebuild(db)
+
+    assert db.get(StatCounter, 'listings').value == 2
+    assert db.get(StatCounter, 'active_listings').value == 1
+    assert db.get(StatCounter, 'users').value == 1
+    assert _daily(db) == {
+        (date(2026, 5, 30), 'new_listings'): 2,
+        (date(2026, 5, 29), 'new_users'): 1,
+        (DAY, 'expired_listings'): 4,
+    }
+    assert _buckets(db, 'rooms') == {'2': 1}
+
+
+def test_get_stats_trend_window_and_top(db):
+    listings = _seed(db, [(rooms, 30000) for rooms in (1, 2, 2, 3, 3, 3, 4, 5, 6)])
+    stats.add_listings(db, listings, day=DAY)
+    stats._apply(db, daily={(date(2026, 5, 1), 'new_listings'): 7})
+    db.commit()
+
+    result = stats.get_stats(db, days=3, today=DAY)
+
+    assert result['active_listings'] == 9
+    assert result['days'] == [date(2026, 5, 30), date(2026, 5, 31), DAY]
+    # Oynadan tashqaridagi kun trendga kirmaydi
+    assert result['trend'] == {'new_listings': {DAY: 9}}
+    assert result['top']['rooms'][:2] == [('3', 3), ('2', 2)]
+    assert len(result['top']['rooms']) == stats.TOP_BUCKETS
+    assert result['top']['price_band'] == [('USD 20000-40000', 9)]
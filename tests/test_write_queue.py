@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+import pytest
+
+from models.cluster import ListingCluster
+from models.image import ListingImage
+from models.stats import StatCounter
+from models.user import Listing, User
+from utils.write_queue import ListingInsert, UserUpsert, WriteQueue
+
+LISTING = {
+    'title': 'Chilonzor', 'description': 'Yaxshi uy', 'rooms': 2, 'floor': 3, 'total_floors': 9,
+    'price': 635_000_000, 'currency': "SO'M", 'images': json.dumps(['file-a', 'file-b']), 'phone': '+998901112233',
+}
+
+
+def _run(queue, *ops):
+    """ops ni bir vaqtda yuboradi; natija yoki exception lar ro'yxati"""
+    async def scenario():
+        try:
+            return await asyncio.gather(*(queue.submit(op) for op in ops), return_exceptions=True)
+        finally:
+            await queue.close()
+    return asyncio.run(scenario())
+
+
+def test_concurrent_writes_share_one_batch(db):
+    queue = WriteQueue(max_delay=0.05)
+    results = _run(
+        queue,
+        UserUpsert(1, {'language': 'uz'}),
+        UserUpsert(2, {'language': 'ru'}),
+        ListingInsert(1, LISTING, '41.3,69.25'),
+    )
+    assert queue.batches == 1
+    assert queue.rows == 3
+    assert [type(result) for result in results] == [User, User, Listing]
+    assert db.query(User).count() == 2
+    assert db.query(StatCounter).filter_by(name='users').one().value == 2
+
+
+def test_batches_are_split_at_max_batch(db):
+    queue = WriteQueue(max_delay=0.05, max_batch=2)
+    _run(queue, *(UserUpsert(i, {}) for i in range(5)))
+    assert queue.batches == 3
+    assert db.query(User).count() == 5
+
+
+def test_failed_batch_falls_back_to_single_rows(db):
+    queue = WriteQueue(max_delay=0.05)
+    results = _run(
+        queue,
+        UserUpsert(1, {'language': 'uz'}),
+        ListingInsert(404, LISTING, '41.3,69.25'),
+        UserUpsert(2, {'language': 'ru'}),
+    )
+    assert isinstance(results[1], ValueError)
+    assert isinstance(results[0], User) and isinstance(results[2], User)
+    # batch bekor bo'ldi, qolgan ikkitasi alohida yozildi
+    assert queue.batches == 2
+    assert db.query(User).count() == 2
+    assert db.query(Listing).count() == 0
+
+
+def test_upsert_updates_existing_user(db):
+    queue = WriteQueue(max_delay=0.01)
+    _run(queue, UserUpsert(7, {'language': 'uz'}))
+    _run(queue, UserUpsert(7, {'language': 'ru', 'phone': '+998'}))
+    user = db.query(User).filter_by(telegram_id=7).one()
+    assert (user.language, user.phone) == ('ru', '+998')
+    assert db.query(StatCounter).filter_by(name='users').one().value == 1
+
+
+def test_listing_insert_updates_derived_tables(db):
+    queue = WriteQueue(max_delay=0.01)
+    _, listing = _run(queue, UserUpsert(1, {}), ListingInsert(1, LISTING, '41.3,69.25'))
+    assert listing.created_at is not None
+    row = db.get(Listing, listing.id)
+    assert (row.latitude, row.longitude) == (41.3, 69.25)
+    assert row.price_usd == pytest.approx(50000, rel=0.05)
+    assert row.version == 1
+    images = db.query(ListingImage).filter_by(listing_id=listing.id).order_by(ListingImage.position).all()
+    assert [image.file_id for image in images] == ['file-a', 'file-b']
+    assert db.query(ListingCluster).filter_by(zoom=14).one().count == 1
+    assert db.query(StatCounter).filter_by(name='active_listings').one().value == 1
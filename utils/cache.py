@@ -1,29 +1,227 @@
+import os
 import time
+import inspect
+import threading
+from collections import OrderedDict
 from functools import wraps
+from utils.metrics import Gauge
 
-# Sodd caching sistemasi
-cache_data = {}
 CACHE_TIMEOUT = 300  # 5 daqiqa
+CACHE_MAX_SIZE = int(os.getenv('CACHE_MAX_SIZE', '10000'))
+# memory | sqlite | redis
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+CACHE_SQLITE_PATH = os.getenv('CACHE_SQLITE_PATH', 'cache.db')
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+# Umumiy backend oldidagi lokal cache TTL i (0 - o'chirilgan)
+CACHE_LOCAL_TTL = float(os.getenv('CACHE_LOCAL_TTL', '5'))
 
-def cache(ttl=CACHE_TIMEOUT):
+
+class LRUCache:
+    """Hajmi cheklangan LRU cache: har bir yozuv uchun TTL va teglar bo'yicha tozalash"""
+
+    def __init__(self, max_size=CACHE_MAX_SIZE, default_ttl=CACHE_TIMEOUT):
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()  # key -> (value, expires_at, tags)
+        self._tags = {}  # tag -> set(key)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """(True, value) yoki (False, None) qaytaradi"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            value, expires_at, _ = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, key, value, ttl=None, tags=()):
+        tags = tuple(tags)
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def invalidate_tag(self, tag):
+        """Teg bilan belgilangan barcha yozuvlarni o'chiradi, o'chirilganlar sonini qaytaradi"""
+        with self._lock:
+            keys = self._tags.pop(tag, set())
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    # Async interfeys (utils.cache_backends.BlockingBackend bilan bir xil) - I/O yo'q
+    async def aget(self, key):
+        return self.get(key)
+
+    async def aset(self, key, value, ttl=None, tags=()):
+        self.set(key, value, ttl=ttl, tags=tags)
+
+    async def ainvalidate(self, key):
+        self.invalidate(key)
+
+    async def ainvalidate_tag(self, tag):
+        return self.invalidate_tag(tag)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+def create_backend(name=CACHE_BACKEND):
+    """Sozlamaga ko'ra cache backend. Barcha backendlar LRUCache interfeysiga ega:
+    get, set, invalidate, invalidate_tag, clear, stats va async aget, aset, ainvalidate, ainvalidate_tag."""
+    from utils.cache_backends import SQLiteBackend, RedisBackend, TwoLevelBackend
+
+    if name == 'memory':
+        return LRUCache()
+    if name == 'sqlite':
+        shared = SQLiteBackend(CACHE_SQLITE_PATH, max_size=CACHE_MAX_SIZE, default_ttl=CACHE_TIMEOUT)
+    elif name == 'redis':
+        shared = RedisBackend(CACHE_REDIS_URL, default_ttl=CACHE_TIMEOUT)
+    else:
+        raise ValueError(f"Unknown CACHE_BACKEND: {name}")
+    if CACHE_LOCAL_TTL <= 0:
+        return shared
+    return TwoLevelBackend(LRUCache(), shared, local_ttl=CACHE_LOCAL_TTL)
+
+
+default_cache = create_backend()
+
+
+def set_backend(backend):
+    """Cache backendini almashtirish (masalan, testlar yoki API jarayoni uchun)"""
+    global default_cache
+    default_cache = backend
+
+
+def make_key(func, args, kwargs):
+    """Hashlanadigan tuple kalit; str(args) o'rniga"""
+    return (func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items())))
+
+
+def cache(ttl=CACHE_TIMEOUT, tags=None):
+    """Natijani cache qiladi.
+
+    tags - funksiya argumentlaridan teglar ro'yxatini qaytaradigan callable,
+    masalan ``tags=lambda user_id: [f"user_listings:{user_id}"]``.
+    Natija o'zgarmas (immutable) bo'lishi kerak - ORM obyektlari emas.
+    Async funksiyalar ham qo'llab-quvvatlanadi.
+    """
     def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key = make_key(func, args, kwargs)
+                try:
+                    found, value = await default_cache.aget(key)
+                except TypeError:
+                    return await func(*args, **kwargs)
+                if found:
+                    return value
+
+                result = await func(*args, **kwargs)
+                await default_cache.aset(key, result, ttl=ttl, tags=tags(*args, **kwargs) if tags else ())
+                return result
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            key = f"{func.__name__}:{str(args)}:{str(kwargs)}"
-            
-            # Cache dan olish
-            if key in cache_data:
-                data, timestamp = cache_data[key]
-                if time.time() - timestamp < ttl:
-                    return data
-            
-            # Yangi ma'lumot olish
+            key = make_key(func, args, kwargs)
+            try:
+                found, value = default_cache.get(key)
+            except TypeError:
+                # Hashlanmaydigan argumentlar - cache siz chaqiramiz
+                return func(*args, **kwargs)
+            if found:
+                return value
+
             result = func(*args, **kwargs)
-            cache_data[key] = (result, time.time())
+            default_cache.set(key, result, ttl=ttl, tags=tags(*args, **kwargs) if tags else ())
             return result
         return wrapper
     return decorator
 
+
+def invalidate_tag(tag):
+    return default_cache.invalidate_tag(tag)
+
+
+async def ainvalidate_tag(tag):
+    """Event loop ichidan - umumiy backend I/O si thread pool da"""
+    return await default_cache.ainvalidate_tag(tag)
+
+
+def cache_stats():
+    return default_cache.stats()
+
+
+def cache_levels():
+    """level -> stats: TwoLevelBackend ikkala darajani, bitta backend o'zini beradi"""
+    stats = cache_stats()
+    if 'local' in stats and 'shared' in stats:
+        return stats
+    # LRUCache stats da 'backend' yo'q, SQLite/Redis da bor
+    return {'shared' if 'backend' in stats else 'local': stats}
+
+
+Gauge('cache_hit_ratio', 'Cache hits / lookups since start', lambda: {
+    (level,): stats['hit_rate'] for level, stats in cache_levels().items()
+}, labels=['level'])
+# Redis o'lchamni bermaydi - bu daraja chiqarilmaydi
+Gauge('cache_entries', 'Entries in the cache level', lambda: {
+    (level,): stats['size'] for level, stats in cache_levels().items() if 'size' in stats
+}, labels=['level'])
+
+
 # Cache ni tozalash funksiyasi
 def clear_cache():
-    cache_data.clear()
\ No newline at end of file
+    default_cache.clear()
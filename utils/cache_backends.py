@@ -0,0 +1,351 @@
+import asyncio
+import pickle
+import sqlite3
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def serialize_key(key):
+    # make_key tuple lari faqat oddiy tiplardan iborat - repr barqaror
+    return repr(key)
+
+
+class BlockingBackend:
+    """Disk/tarmoq I/O qiladigan backendlar uchun async interfeys.
+
+    Sinxron chaqiruvlar thread pool da bajariladi - event loop bloklanmaydi.
+    """
+
+    async def aget(self, key):
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key, value, ttl=None, tags=()):
+        await asyncio.to_thread(self.set, key, value, ttl, tags)
+
+    async def ainvalidate(self, key):
+        await asyncio.to_thread(self.invalidate, key)
+
+    async def ainvalidate_tag(self, tag):
+        return await asyncio.to_thread(self.invalidate_tag, tag)
+
+    def invalidate(self, key):
+        self.invalidate_key_generation(key)
+
+    def invalidate_tag(self, tag):
+        removed, _ = self.invalidate_tag_generation(tag)
+        return removed
+
+
+class SQLiteBackend(BlockingBackend):
+    """Bir mashinadagi bir nechta worker uchun umumiy SQLite cache.
+
+    Qiymatlar pickle qilinadi. Invalidatsiya umumiy bazada bajariladi va
+    ``generation`` hisoblagichini oshiradi - TwoLevelBackend lar shu orqali
+    o'z lokal cache larini tozalaydi.
+    """
+
+    TRIM_EVERY = 100
+
+    def __init__(self, path, max_size=10000, default_ttl=300):
+        self.path = path
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self._local = threading.local()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        with self._conn() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    expires_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache_entries (expires_at);
+                CREATE TABLE IF NOT EXISTS cache_tags (
+                    tag TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    PRIMARY KEY (tag, key)
+                );
+                CREATE TABLE IF NOT EXISTS cache_meta (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                );
+                INSERT OR IGNORE INTO cache_meta (name, value) VALUES ('generation', 0);
+            """)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM cache_entries WHERE key = ? AND expires_at >= ?",
+            (serialize_key(key), time.time())
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, pickle.loads(row[0])
+
+    def set(self, key, value, ttl=None, tags=()):
+        skey = serialize_key(key)
+        expires_at = time.time() + (self.default_ttl if ttl is None else ttl)
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+                (skey, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), expires_at)
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO cache_tags (tag, key) VALUES (?, ?)",
+                [(tag, skey) for tag in tags]
+            )
+        self._writes += 1
+        if self._writes % self.TRIM_EVERY == 0:
+            self.trim()
+
+    def trim(self):
+        """Muddati o'tganlarni va max_size dan ortiqlarini (eng tez tugaydiganlaridan) o'chiradi"""
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM cache_entries WHERE expires_at < ?", (time.time(),))
+            overflow = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0] - self.max_size
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM cache_entries WHERE key IN "
+                    "(SELECT key FROM cache_entries ORDER BY expires_at LIMIT ?)",
+                    (overflow,)
+                )
+                self.evictions += overflow
+            conn.execute("DELETE FROM cache_tags WHERE key NOT IN (SELECT key FROM cache_entries)")
+
+    def invalidate_key_generation(self, key):
+        """Kalitni o'chiradi; shu o'chirish bergan generation ni qaytaradi"""
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM cache_entries WHERE key = ?", (serialize_key(key),))
+            return self._bump_generation(conn)
+
+    def invalidate_tag_generation(self, tag):
+        """(o'chirilganlar soni, shu o'chirish bergan generation)"""
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            removed = conn.execute(
+                "DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_tags WHERE tag = ?)",
+                (tag,)
+            ).rowcount
+            conn.execute("DELETE FROM cache_tags WHERE tag = ?", (tag,))
+            return removed, self._bump_generation(conn)
+
+    def clear(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM cache_entries")
+            conn.execute("DELETE FROM cache_tags")
+            self._bump_generation(conn)
+
+    def generation(self):
+        return self._conn().execute(
+            "SELECT value FROM cache_meta WHERE name = 'generation'"
+        ).fetchone()[0]
+
+    def _bump_generation(self, conn):
+        return conn.execute(
+            "UPDATE cache_meta SET value = value + 1 WHERE name = 'generation' RETURNING value"
+        ).fetchone()[0]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': 'sqlite',
+            'size': self._conn().execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0],
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+class RedisBackend(BlockingBackend):
+    """Redis (yoki Redis-compatible) umumiy cache. Hajm chegarasi server
+    tomonida ``maxmemory-policy allkeys-lru`` orqali beriladi."""
+
+    def __init__(self, url, prefix='uyizlang:cache:', default_ttl=300):
+        import redis  # ixtiyoriy bog'liqlik
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key):
+        return self.prefix + serialize_key(key)
+
+    def _tag(self, tag):
+        return self.prefix + 'tag:' + tag
+
+    def get(self, key):
+        data = self.client.get(self._key(key))
+        if data is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, pickle.loads(data)
+
+    def set(self, key, value, ttl=None, tags=()):
+        ttl = self.default_ttl if ttl is None else ttl
+        rkey = self._key(key)
+        pipe = self.client.pipeline()
+        pipe.set(rkey, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ex=max(int(ttl), 1))
+        for tag in tags:
+            pipe.sadd(self._tag(tag), rkey)
+            pipe.expire(self._tag(tag), max(int(ttl), 1))
+        pipe.execute()
+
+    def invalidate_key_generation(self, key):
+        pipe = self.client.pipeline()
+        pipe.delete(self._key(key))
+        pipe.incr(self.prefix + 'generation')
+        return pipe.execute()[-1]
+
+    def invalidate_tag_generation(self, tag):
+        keys = self.client.smembers(self._tag(tag))
+        pipe = self.client.pipeline()
+        if keys:
+            pipe.delete(*keys)
+        pipe.delete(self._tag(tag))
+        pipe.incr(self.prefix + 'generation')
+        return len(keys), pipe.execute()[-1]
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+        self.client.incr(self.prefix + 'generation')
+
+    def generation(self):
+        return int(self.client.get(self.prefix + 'generation') or 0)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': 'redis',
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+class TwoLevelBackend:
+    """Worker ichidagi qisqa TTL li lokal LRU + umumiy backend.
+
+    Boshqa worker invalidatsiya qilganda umumiy ``generation`` o'zgaradi;
+    lokal daraja buni ``poll_interval`` dan kechiktirmay sezadi va tozalanadi.
+    """
+
+    def __init__(self, local, shared, local_ttl=5, poll_interval=0.5):
+        self.local = local
+        self.shared = shared
+        self.local_ttl = local_ttl
+        self.poll_interval = poll_interval
+        self._generation = shared.generation()
+        self._checked_at = time.monotonic()
+
+    def _sync(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.poll_interval:
+            return
+        self._checked_at = now
+        generation = self.shared.generation()
+        if generation != self._generation:
+            self._generation = generation
+            self.local.clear()
+
+    def get(self, key):
+        self._sync()
+        found, value = self.local.get(key)
+        if found:
+            return found, value
+        found, value = self.shared.get(key)
+        if found:
+            self.local.set(key, value, ttl=self.local_ttl)
+        return found, value
+
+    async def aget(self, key):
+        """Lokal hit - thread siz; umumiy backend ga faqat miss yoki generation tekshiruvida"""
+        if time.monotonic() - self._checked_at >= self.poll_interval:
+            await asyncio.to_thread(self._sync)
+        found, value = self.local.get(key)
+        if found:
+            return found, value
+        found, value = await self.shared.aget(key)
+        if found:
+            self.local.set(key, value, ttl=self.local_ttl)
+        return found, value
+
+    def set(self, key, value, ttl=None, tags=()):
+        self.shared.set(key, value, ttl=ttl, tags=tags)
+        local_ttl = self.local_ttl if ttl is None else min(ttl, self.local_ttl)
+        self.local.set(key, value, ttl=local_ttl, tags=tags)
+
+    async def aset(self, key, value, ttl=None, tags=()):
+        await self.shared.aset(key, value, ttl=ttl, tags=tags)
+        local_ttl = self.local_ttl if ttl is None else min(ttl, self.local_ttl)
+        self.local.set(key, value, ttl=local_ttl, tags=tags)
+
+    def _own_bump(self, generation):
+        """O'zimiz oshirgan generation - keyingi _sync lokal cache ni bekorga tozalamasin.
+
+        Faqat oldingisidan keyingi qiymat bo'lsa: orada boshqa worker ham oshirgan
+        bo'lsa, uning invalidatsiyasi _sync da odatdagidek qo'llanadi.
+        """
+        if generation == self._generation + 1:
+            self._generation = generation
+
+    def invalidate(self, key):
+        self.local.invalidate(key)
+        self._own_bump(self.shared.invalidate_key_generation(key))
+
+    async def ainvalidate(self, key):
+        self.local.invalidate(key)
+        self._own_bump(await asyncio.to_thread(self.shared.invalidate_key_generation, key))
+
+    # Umumiy darajadan olingan nusxalar lokalga teglarsiz yoziladi, shuning uchun
+    # teg bo'yicha invalidatsiya lokal darajani to'liq tozalaydi (boshqa workerlar ham
+    # generation orqali aynan shunday qiladi)
+    def invalidate_tag(self, tag):
+        self.local.clear()
+        removed, generation = self.shared.invalidate_tag_generation(tag)
+        self._own_bump(generation)
+        return removed
+
+    async def ainvalidate_tag(self, tag):
+        self.local.clear()
+        removed, generation = await asyncio.to_thread(self.shared.invalidate_tag_generation, tag)
+        self._own_bump(generation)
+        return removed
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def stats(self):
+        return {'local': self.local.stats(), 'shared': self.shared.stats()}
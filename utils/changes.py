@@ -0,0 +1,53 @@
+import os
+from sqlalchemy import case, func, select
+from models.changes import ChangeCounter
+from models.user import Listing
+from utils.upsert import insert_for
+
+# listings.version ning joriy qiymati
+LISTINGS = 'listings'
+# Shu versiyagacha bo'lgan ba'zi e'lonlar jadvaldan o'chirilgan (arxiv)
+LISTINGS_PURGED = 'listings_purged'
+# Bundan ko'p o'zgarish bo'lsa klient to'liq qayta yuklaydi
+CHANGES_MAX = int(os.getenv('CHANGES_MAX', '1000'))
+
+
+def _upsert(db, name, value, set_value):
+    """Bitta atomar INSERT ... ON CONFLICT DO UPDATE ... RETURNING: SQLite da yozish
+    qulfi shu statement bilan olinadi, jarayonlar bir xil versiya ololmaydi"""
+    table = ChangeCounter.__table__
+    stmt = insert_for(db, table).values(name=name, value=value)
+    stmt = stmt.on_conflict_do_update(index_elements=['name'], set_={'value': set_value(table, stmt.excluded)})
+    return db.execute(stmt.returning(table.c.value)).scalar_one()
+
+
+def next_version(db):
+    """Keyingi versiya - bulk UPDATE lar uchun (commit chaqiruvchida)"""
+    return _upsert(db, LISTINGS, 1, lambda table, excluded: table.c.value + 1)
+
+
+def bump(db, listings):
+    """Yangi yoki o'zgargan e'lonlarga keyingi versiyani beradi (commit chaqiruvchida)"""
+    if not listings:
+        return None
+    version = next_version(db)
+    for listing in listings:
+        listing.version = version
+    return version
+
+
+def purge(db, listing_ids):
+    """E'lonlar o'chirilishidan oldin: ularni ko'rgan eski tokenlar reset oladi"""
+    if not listing_ids:
+        return
+    newest = db.query(func.max(Listing.version)).filter(Listing.id.in_(listing_ids)).scalar()
+    _upsert(db, LISTINGS_PURGED, newest or 0, lambda table, excluded: case(
+        (excluded.value > table.c.value, excluded.value), else_=table.c.value
+    ))
+
+
+def versions(db):
+    """(joriy versiya, o'chirilganlar versiyasi)"""
+    # Ustunlar bo'yicha - identity map dagi eski obyektlar emas
+    values = dict(db.execute(select(ChangeCounter.name, ChangeCounter.value)).all())
+    return values.get(LISTINGS, 0), values.get(LISTINGS_PURGED, 0)
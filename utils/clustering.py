@@ -0,0 +1,188 @@
+import math
+from sqlalchemy import and_, case, delete, func, or_, update
+from models.cluster import ListingCluster
+from models.user import Listing
+from utils.upsert import add_values
+
+CLUSTER_KEYS = ['zoom', 'cell_x', 'cell_y', 'currency']
+
+# Klasterlar hisoblanadigan zoom darajalari; undan kattasida to'liq e'lonlar yuboriladi
+MIN_CLUSTER_ZOOM = 3
+MAX_CLUSTER_ZOOM = 14
+CLUSTER_ZOOMS = range(MIN_CLUSTER_ZOOM, MAX_CLUSTER_ZOOM + 1)
+# Katak = 1/4 tile (256px tile da ~64px)
+CELL_SHIFT = 2
+
+
+def _cells_per_side(zoom):
+    return 2 ** (zoom + CELL_SHIFT)
+
+
+def cell_for(lat, lng, zoom):
+    """Web Mercator bo'yicha (cell_x, cell_y)"""
+    n = _cells_per_side(zoom)
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = int((lng + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def cell_bounds(cell_x, cell_y, zoom):
+    """Katakning (south, west, north, east) chegaralari"""
+    n = _cells_per_side(zoom)
+
+    def lat_of(y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+
+    return lat_of(cell_y + 1), cell_x / n * 360.0 - 180.0, lat_of(cell_y), (cell_x + 1) / n * 360.0 - 180.0
+
+
+def clamp_zoom(zoom):
+    return max(MIN_CLUSTER_ZOOM, min(int(zoom), MAX_CLUSTER_ZOOM))
+
+
+def add_listing(db, listing):
+    """Yangi faol e'lonni barcha zoom agregatlariga qo'shadi (commit chaqiruvchida)"""
+    add_listings(db, [listing])
+
+
+def add_listings(db, listings):
+    """Bir nechta e'lonni qo'shadi: barcha kataklar uchun bitta upsert (commit chaqiruvchida)"""
+    deltas = {}
+    for listing in listings:
+        if listing.latitude is None or listing.longitude is None:
+            continue
+        currency = listing.currency or ''
+        for zoom in CLUSTER_ZOOMS:
+            cell_x, cell_y = cell_for(listing.latitude, listing.longitude, zoom)
+            delta = deltas.setdefault((zoom, cell_x, cell_y, currency), [0, 0.0, 0.0, None, None])
+            delta[0] += 1
+            delta[1] += listing.latitude
+            delta[2] += listing.longitude
+            if listing.price is not None:
+                delta[3] = listing.price if delta[3] is None else min(delta[3], listing.price)
+                delta[4] = listing.price if delta[4] is None else max(delta[4], listing.price)
+
+    add_values(db, ListingCluster.__table__, [
+        {
+            'zoom': zoom, 'cell_x': cell_x, 'cell_y': cell_y, 'currency': currency,
+            'count': count, 'lat_sum': lat_sum, 'lng_sum': lng_sum,
+            'min_price': min_price, 'max_price': max_price,
+        }
+        for (zoom, cell_x, cell_y, currency), (count, lat_sum, lng_sum, min_price, max_price) in deltas.items()
+    ], CLUSTER_KEYS, ['count', 'lat_sum', 'lng_sum'], _merge_prices)
+
+
+def _merge_prices(table, excluded):
+    # NULL narx mavjud chegarani o'zgartirmaydi
+    return {
+        'min_price': case(
+            (or_(table.c.min_price.is_(None), excluded.min_price < table.c.min_price), excluded.min_price),
+            else_=table.c.min_price,
+        ),
+        'max_price': case(
+            (or_(table.c.max_price.is_(None), excluded.max_price > table.c.max_price), excluded.max_price),
+            else_=table.c.max_price,
+        ),
+    }
+
+
+def remove_listing(db, listing):
+    """Nofaol bo'lgan e'lonni agregatlardan ayiradi"""
+    remove_listings(db, [listing])
+
+
+def remove_listings(db, listings):
+    """Nofaol bo'lgan e'lonlarni agregatlardan ayiradi.
+
+    Chaqiruvdan oldin listing.is_active allaqachon False qilingan va flush
+    qilingan bo'lishi kerak - min/max narx qolgan faol e'lonlardan qayta olinadi.
+    """
+    deltas = {}
+    for listing in listings:
+        if listing.latitude is None or listing.longitude is None:
+            continue
+        currency = listing.currency or ''
+        for zoom in CLUSTER_ZOOMS:
+            cell_x, cell_y = cell_for(listing.latitude, listing.longitude, zoom)
+            delta = deltas.setdefault((zoom, cell_x, cell_y, currency), [0, 0.0, 0.0, set()])
+            delta[0] += 1
+            delta[1] += listing.latitude
+            delta[2] += listing.longitude
+            if listing.price is not None:
+                delta[3].add(listing.price)
+
+    table = ListingCluster.__table__
+    for (zoom, cell_x, cell_y, currency), (count, lat_sum, lng_sum, prices) in deltas.items():
+        key = and_(
+            table.c.zoom == zoom, table.c.cell_x == cell_x,
+            table.c.cell_y == cell_y, table.c.currency == currency,
+        )
+        # Ayirish SQL tarafida - parallel yozuvchilar bilan ham to'g'ri
+        cluster = db.execute(update(table).where(key).values(
+            count=table.c.count - count,
+            lat_sum=table.c.lat_sum - lat_sum,
+            lng_sum=table.c.lng_sum - lng_sum,
+        ).returning(table.c.count, table.c.min_price, table.c.max_price)).first()
+        if cluster is None:
+            continue
+        if cluster.count <= 0:
+            db.execute(delete(table).where(key, table.c.count <= 0))
+            continue
+        if cluster.min_price in prices or cluster.max_price in prices:
+            south, west, north, east = cell_bounds(cell_x, cell_y, zoom)
+            min_price, max_price = db.query(
+                func.min(Listing.price), func.max(Listing.price)
+            ).filter(
+                Listing.is_active == True,
+                func.coalesce(Listing.currency, '') == currency,
+                Listing.in_bbox(south, west, north, east),
+            ).one()
+            db.execute(update(table).where(key).values(min_price=min_price, max_price=max_price))
+
+
+def rebuild(db):
+    """Barcha agregatlarni listings jadvalidan noldan hisoblaydi"""
+    db.query(ListingCluster).delete()
+    rows = db.query(Listing).filter(
+        Listing.is_active == True,
+        Listing.latitude.isnot(None)
+    ).all()
+    add_listings(db, rows)
+    db.commit()
+
+
+def get_clusters(db, zoom, bbox):
+    """Berilgan zoom va bbox uchun klasterlar: soni, markaz, valyuta bo'yicha narx oralig'i"""
+    zoom = clamp_zoom(zoom)
+    south, west, north, east = bbox
+    x_min, y_min = cell_for(north, west, zoom)
+    x_max, y_max = cell_for(south, east, zoom)
+
+    rows = db.query(ListingCluster).filter(
+        ListingCluster.zoom == zoom,
+        ListingCluster.cell_x.between(x_min, x_max),
+        ListingCluster.cell_y.between(y_min, y_max),
+    ).all()
+
+    clusters = {}
+    for row in rows:
+        cluster = clusters.setdefault((row.cell_x, row.cell_y), {
+            'count': 0, 'lat_sum': 0.0, 'lng_sum': 0.0, 'prices': {}
+        })
+        cluster['count'] += row.count
+        cluster['lat_sum'] += row.lat_sum
+        cluster['lng_sum'] += row.lng_sum
+        if row.min_price is not None:
+            cluster['prices'][row.currency] = [row.min_price, row.max_price]
+
+    return [
+        {
+            'cell': [cell_x, cell_y],
+            'count': c['count'],
+            'center': [c['lat_sum'] / c['count'], c['lng_sum'] / c['count']],
+            'prices': c['prices'],
+        }
+        for (cell_x, cell_y), c in clusters.items() if c['count'] > 0
+    ]
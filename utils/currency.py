@@ -0,0 +1,81 @@
+import enum
+import os
+from sqlalchemy import Integer, cast, func, update
+from models.currency import ExchangeRate
+from models.user import Listing
+from utils import changes
+
+
+class Currency(str, enum.Enum):
+    """Saqlanadigan qiymatlar mavjud qatorlar va klaster kalitlari bilan bir xil"""
+    USD = 'USD'
+    UZS = "SO'M"
+
+
+APOSTROPHES = "'`‘’ʻʼ´"
+# Foydalanuvchi yozishi mumkin bo'lgan variantlar (kichik harf, apostrofsiz)
+ALIASES = {
+    'usd': Currency.USD, '$': Currency.USD, 'dollar': Currency.USD, 'доллар': Currency.USD,
+    'som': Currency.UZS, 'sum': Currency.UZS, 'uzs': Currency.UZS, 'сум': Currency.UZS, 'сўм': Currency.UZS,
+}
+
+
+def parse_currency(value):
+    """Matn -> Currency yoki None"""
+    key = (value or '').strip().lower().translate(str.maketrans('', '', APOSTROPHES))
+    return ALIASES.get(key)
+
+
+def load_rates():
+    """1 USD necha birlik. Lokal sozlama har chaqiruvda o'qiladi - o'zgarsa sync_rates
+    price_usd ni qayta hisoblaydi (jarayonni qayta ishga tushirish shart emas)"""
+    return {
+        Currency.USD: 1.0,
+        Currency.UZS: float(os.getenv('USD_UZS_RATE', '12700')),
+    }
+
+
+def to_usd(price, currency, rates):
+    currency = parse_currency(currency)
+    if price is None or currency is None:
+        return None
+    return int(round(price / rates[currency]))
+
+
+def recompute_prices(db, currency, per_usd):
+    """Shu valyutadagi e'lonlar uchun UPDATE lar (ORM obyektlarisiz).
+
+    Faqat faol e'lonlar versiyasi yangilanadi - narx filtri natijasi o'zgaradi
+    (ETag, delta-sync); nofaol e'lonlar klientga qayta "removed" bo'lib bormaydi.
+    """
+    price_usd = cast(func.round(Listing.price / per_usd), Integer)
+    updated = db.execute(
+        update(Listing).where(Listing.currency == currency.value, Listing.is_active == True).values(
+            price_usd=price_usd,
+            version=changes.next_version(db),
+        ).execution_options(synchronize_session=False)
+    ).rowcount
+    return updated + db.execute(
+        update(Listing).where(Listing.currency == currency.value, Listing.is_active == False).values(
+            price_usd=price_usd,
+        ).execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def sync_rates(db, rates):
+    """Sozlangan kurs saqlangandan farq qilsa price_usd ni qayta hisoblaydi (commit chaqiruvchida).
+
+    O'zgargan valyutalar ro'yxatini qaytaradi.
+    """
+    changed = []
+    for currency, per_usd in rates.items():
+        row = db.get(ExchangeRate, currency.value)
+        if row is not None and row.per_usd == per_usd:
+            continue
+        if row is None:
+            db.add(ExchangeRate(currency=currency.value, per_usd=per_usd))
+        else:
+            row.per_usd = per_usd
+        recompute_prices(db, currency, per_usd)
+        changed.append(currency)
+    return changed
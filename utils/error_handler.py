@@ -2,6 +2,7 @@ import logging
 from functools import wraps
 from telegram import Update
 from telegram.ext import ContextTypes
+from utils.sender import reply_text
 
 logger = logging.getLogger(__name__)
 
@@ -12,5 +13,5 @@ def error_handler(func):
             return await func(update, context, *args, **kwargs)
         except Exception as e:
             logger.error(f"Error in {func.__name__}: {e}")
-            await update.message.reply_text("❌ Texnik xatolik. Iltimos, keyinroq urinib ko'ring.")
+            reply_text(update, "❌ Texnik xatolik. Iltimos, keyinroq urinib ko'ring.")
     return wrapper
\ No newline at end of file
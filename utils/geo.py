@@ -0,0 +1,63 @@
+import math
+
+# Grid katak o'lchami (gradus). 0.01° ~ 1.1 km
+GRID_STEP = 0.01
+GRID_COLS = int(round(360 / GRID_STEP))
+# Juda katta viewportlarda qatorlar bo'yicha OR qurish o'rniga bitta diapazon
+MAX_GRID_ROWS = 64
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def parse_location(text):
+    """'latitude,longitude' matnidan (lat, lng) qaytaradi yoki None"""
+    if not text:
+        return None
+    parts = str(text).replace(';', ',').split(',')
+    if len(parts) != 2:
+        return None
+    try:
+        lat = float(parts[0].strip())
+        lng = float(parts[1].strip())
+    except ValueError:
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
+def grid_row(lat):
+    return int(math.floor((lat + 90) / GRID_STEP))
+
+
+def grid_col(lng):
+    return min(int(math.floor((lng + 180) / GRID_STEP)), GRID_COLS - 1)
+
+
+def grid_cell(lat, lng):
+    """Koordinata uchun butun sonli grid katak raqami (qator * GRID_COLS + ustun)"""
+    return grid_row(lat) * GRID_COLS + grid_col(lng)
+
+
+def grid_ranges(south, west, north, east):
+    """Bounding box ni qoplaydigan (min_cell, max_cell) diapazonlari ro'yxati.
+
+    Har bir grid qatori bitta uzluksiz diapazon beradi, shuning uchun
+    (is_active, grid_cell) indeksida range scan bo'ladi.
+    """
+    row_min, row_max = grid_row(south), grid_row(north)
+    col_min, col_max = grid_col(west), grid_col(east)
+    if row_max - row_min + 1 > MAX_GRID_ROWS:
+        return [(row_min * GRID_COLS + col_min, row_max * GRID_COLS + col_max)]
+    return [
+        (row * GRID_COLS + col_min, row * GRID_COLS + col_max)
+        for row in range(row_min, row_max + 1)
+    ]
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    d_lat = math.radians(lat2 - lat1)
+    d_lng = math.radians(lng2 - lng1)
+    a = (math.sin(d_lat / 2) ** 2 +
+         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(d_lng / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
@@ -0,0 +1,132 @@
+import hashlib
+import io
+import os
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR', 'media_cache')
+IMAGE_CACHE_MAX_BYTES = int(os.getenv('IMAGE_CACHE_MAX_MB', '1024')) * 1024 * 1024
+# Variant -> maksimal tomon (px) va WebP sifati
+VARIANTS = {
+    'thumb': (160, 70),
+    'medium': (800, 80),
+}
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def render_variants(data):
+    """Asl rasm baytlaridan WebP variantlar: ({variant: bytes}, (width, height))
+
+    Pillow ixtiyoriy bog'liqlik - faqat rasm worker ida kerak.
+    """
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert('RGB')
+        size = image.size
+        variants = {}
+        for name, (max_side, quality) in VARIANTS.items():
+            copy = image.copy()
+            copy.thumbnail((max_side, max_side))
+            buffer = io.BytesIO()
+            copy.save(buffer, 'WEBP', quality=quality, method=4)
+            variants[name] = buffer.getvalue()
+    return variants, size
+
+
+class ImageCache:
+    """Content-addressed disk cache: <root>/<hash[:2]>/<hash>.<variant>.webp
+
+    Fayl nomi mazmundan olinadi - bir xil rasm bir marta saqlanadi va URL
+    hech qachon o'zgarmaydi (immutable cache headerlar mumkin). Hajm
+    ``max_bytes`` dan oshsa, eng uzoq ishlatilmagan (mtime) fayllar o'chiriladi.
+    """
+
+    def __init__(self, root=IMAGE_CACHE_DIR, max_bytes=IMAGE_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None
+        self.evictions = 0
+
+    def path(self, digest, variant):
+        return os.path.join(self.root, digest[:2], f"{digest}.{variant}.webp")
+
+    def has(self, digest):
+        return all(os.path.exists(self.path(digest, variant)) for variant in VARIANTS)
+
+    def get(self, digest, variant):
+        """Fayl yo'li yoki None; LRU uchun mtime yangilanadi"""
+        path = self.path(digest, variant)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, digest, variants):
+        written = 0
+        for variant, data in variants.items():
+            path = self.path(digest, variant)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Atomik yozish - o'quvchi yarim faylni ko'rmaydi
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            written += len(data)
+        with self._lock:
+            if self._size is not None:
+                self._size += written
+        self.evict()
+
+    def _scan(self):
+        files = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if not name.endswith('.webp'):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def size(self):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._scan())
+            return self._size
+
+    def evict(self):
+        """Hajm limitdan oshsa eng eski fayllarni limitning 90% igacha o'chiradi"""
+        if self.size() <= self.max_bytes:
+            return 0
+        with self._lock:
+            files = sorted(self._scan())
+            total = sum(size for _, size, _ in files)
+            target = self.max_bytes * 0.9
+            removed = 0
+            for _, size, path in files:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                total -= size
+                removed += 1
+            self._size = total
+            self.evictions += removed
+        logger.info(f"Image cache evicted {removed} files")
+        return removed
+
+
+image_cache = ImageCache()
@@ -0,0 +1,128 @@
+import os
+import threading
+from bisect import bisect_left
+
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9100'))
+
+# Soniyalarda; handler/DB/Telegram API uchun umumiy
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Histogram:
+    """Fiks bucketli histogramma. observe() - bitta bisect va ikki qo'shish"""
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label qiymatlari -> [bucket hisoblari (+Inf bilan), yig'indi]
+        self._children = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _child(self, label_values):
+        with self._lock:
+            return self._children.setdefault(label_values, [[0] * (len(self.buckets) + 1), 0.0])
+
+    def observe(self, value, *label_values):
+        child = self._children.get(label_values) or self._child(label_values)
+        child[0][bisect_left(self.buckets, value)] += 1
+        child[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total) in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                labels = _format_labels(self.labels, label_values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        _registry.append(self)
+
+    def inc(self, amount=1, *label_values):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for label_values, value in list(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Gauge:
+    """So'ralganda hisoblanadigan qiymat: callback {label qiymatlari tuple: son} qaytaradi"""
+
+    def __init__(self, name, help_text, callback, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+        self.labels = tuple(labels)
+        _registry.append(self)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        try:
+            values = self.callback()
+        except Exception:
+            return lines
+        if not isinstance(values, dict):
+            values = {(): values}
+        for label_values, value in values.items():
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+handler_latency = Histogram('bot_handler_seconds', 'Handler execution time', ['handler'])
+handler_errors = Counter('bot_handler_errors_total', 'Handler exceptions', ['handler'])
+db_query_latency = Histogram('db_query_seconds', 'SQL statement execution time', ['engine'])
+telegram_latency = Histogram('telegram_api_seconds', 'Telegram Bot API call time', ['method'])
+telegram_retries = Counter('telegram_retry_after_total', 'RetryAfter responses from Telegram', ['method'])
+
+
+def render():
+    """Prometheus text exposition format"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+async def metrics_handler(request):
+    from aiohttp import web
+
+    return web.Response(text=render(), content_type='text/plain', charset='utf-8')
+
+
+async def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """Bot jarayonida /metrics ni ochadi (API jarayonida api.app o'zi beradi)"""
+    from aiohttp import web
+
+    app = web.Application()
+    app.router.add_get('/metrics', metrics_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
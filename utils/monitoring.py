@@ -1,21 +1,28 @@
 import time
 import logging
 from functools import wraps
+from utils.metrics import handler_latency, handler_errors
 
 logger = logging.getLogger(__name__)
 
+SLOW_HANDLER_SECONDS = 5  # 5 soniyadan ko'p bo'lsa ogohlantirish
+
+
 def monitor_performance(func):
+    """Handler vaqtini bot_handler_seconds histogrammasiga yozadi (perf_counter)"""
+    name = func.__name__
+
     @wraps(func)
     async def wrapper(*args, **kwargs):
-        start_time = time.time()
-        result = await func(*args, **kwargs)
-        end_time = time.time()
-        
-        execution_time = end_time - start_time
-        logger.info(f"{func.__name__} executed in {execution_time:.2f} seconds")
-        
-        if execution_time > 5:  # 5 soniyadan ko'p bo'lsa ogohlantirish
-            logger.warning(f"SLOW PERFORMANCE: {func.__name__} took {execution_time:.2f}s")
-            
-        return result
-    return wrapper
\ No newline at end of file
+        start_time = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except Exception:
+            handler_errors.inc(1, name)
+            raise
+        finally:
+            execution_time = time.perf_counter() - start_time
+            handler_latency.observe(execution_time, name)
+            if execution_time > SLOW_HANDLER_SECONDS:
+                logger.warning(f"SLOW PERFORMANCE: {name} took {execution_time:.2f}s")
+    return wrapper
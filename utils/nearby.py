@@ -0,0 +1,47 @@
+import math
+from sqlalchemy import select
+from models.user import Listing
+from utils.geo import haversine_km
+
+NEARBY_START_RADIUS_KM = 1.0
+NEARBY_MAX_RADIUS_KM = 25.0
+NEARBY_LIMIT = 10
+KM_PER_DEGREE = 111.32
+
+
+def radius_bbox(lat, lng, radius_km):
+    """Markazi (lat, lng) bo'lgan radiusni to'liq qoplaydigan bbox"""
+    d_lat = radius_km / KM_PER_DEGREE
+    d_lng = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+    return lat - d_lat, lng - d_lng, lat + d_lat, lng + d_lng
+
+
+def _candidates(db, lat, lng, radius_km):
+    """grid_cell indeksi orqali bbox nomzodlari, radius ichidagilar masofa bilan"""
+    listings = db.scalars(
+        select(Listing).where(
+            Listing.is_active == True,
+            Listing.in_bbox(*radius_bbox(lat, lng, radius_km))
+        )
+    ).all()
+    distances = [haversine_km(lat, lng, l.latitude, l.longitude) for l in listings]
+    return [(d, l) for d, l in zip(distances, listings) if d <= radius_km]
+
+
+def within_radius(db, lat, lng, radius_km, limit=NEARBY_LIMIT):
+    """Radius ichidagi e'lonlar, yaqinidan uzog'iga: [(masofa_km, ListingRow)]"""
+    found = sorted(_candidates(db, lat, lng, radius_km), key=lambda item: item[0])
+    return [(d, l.snapshot()) for d, l in found[:limit]]
+
+
+def nearest(db, lat, lng, k=NEARBY_LIMIT, max_radius_km=NEARBY_MAX_RADIUS_KM):
+    """k ta eng yaqin e'lon. Radius k ta topilguncha ikki barobar oshiriladi,
+    shuning uchun zich hududlarda faqat kichik bbox o'qiladi."""
+    radius = NEARBY_START_RADIUS_KM
+    while True:
+        found = _candidates(db, lat, lng, radius)
+        if len(found) >= k or radius >= max_radius_km:
+            break
+        radius = min(radius * 2, max_radius_km)
+    found.sort(key=lambda item: item[0])
+    return [(d, l.snapshot()) for d, l in found[:k]]
@@ -0,0 +1,211 @@
+import asyncio
+import json
+import os
+import sqlite3
+import logging
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+PERSISTENCE_PATH = os.getenv('PERSISTENCE_PATH', 'bot_state.db')
+# Application har PERSISTENCE_UPDATE_INTERVAL soniyada o'zgargan holatni beradi,
+# biz esa PERSISTENCE_FLUSH_MS ichida kelganlarini bitta tranzaksiyada yozamiz
+PERSISTENCE_UPDATE_INTERVAL = float(os.getenv('PERSISTENCE_UPDATE_INTERVAL', '5'))
+PERSISTENCE_FLUSH_MS = int(os.getenv('PERSISTENCE_FLUSH_MS', '50'))
+
+# E'lon qoralamasi kalitlari -> qisqa nomlar (saqlanadigan JSON ixcham bo'lishi uchun)
+DRAFT_KEYS = {
+    'title': 't',
+    'description': 'd',
+    'rooms': 'r',
+    'floor': 'f',
+    'total_floors': 'tf',
+    'price': 'p',
+    'currency': 'c',
+    'images': 'i',
+    'image_uids': 'iu',
+    'location': 'l',
+    'phone': 'ph',
+    'language': 'lg',
+    'search': 's',
+}
+_EXPAND_KEYS = {short: name for name, short in DRAFT_KEYS.items()}
+
+
+def encode_user_data(data):
+    """user_data -> ixcham JSON (ma'lum kalitlar qisqartiriladi)"""
+    return json.dumps(
+        {DRAFT_KEYS.get(key, key): value for key, value in data.items()},
+        separators=(',', ':'), ensure_ascii=False
+    )
+
+
+def decode_user_data(value):
+    return {_EXPAND_KEYS.get(key, key): item for key, item in json.loads(value).items()}
+
+
+class SQLitePersistence(BasePersistence):
+    """ConversationHandler holatlari va user_data uchun SQLite saqlash.
+
+    Faqat user_data va suhbat holatlari saqlanadi (bot_data/chat_data ishlatilmaydi).
+    Yozuvlar xotirada yig'iladi va bitta tranzaksiyada yoziladi; ``flush``
+    (Application to'xtaganda) qolganlarini yozadi.
+
+    Maqsad - qayta ishga tushirish (rolling restart) da qoralamalar yo'qolmasligi.
+    Jonli holat workerlar orasida bo'lishilmaydi: python-telegram-bot suhbat
+    holatlarini faqat ishga tushishda o'qiydi. Bir nechta worker bo'lsa
+    foydalanuvchi bitta workerga yo'naltirilishi kerak (sticky routing).
+    """
+
+    def __init__(self, path=PERSISTENCE_PATH, update_interval=PERSISTENCE_UPDATE_INTERVAL,
+                 flush_delay=PERSISTENCE_FLUSH_MS / 1000):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.path = path
+        self.flush_delay = flush_delay
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS user_data (user_id INTEGER PRIMARY KEY, data TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                "name TEXT NOT NULL, key TEXT NOT NULL, state TEXT NOT NULL, PRIMARY KEY (name, key))"
+            )
+        self._users = {}
+        self._dropped_users = set()
+        self._conversations = {}
+        self._lock = asyncio.Lock()
+        self._flush_task = None
+        self._closing = False
+        self.flushes = 0
+
+    # --- o'qish (ishga tushishda bir marta) ---
+
+    async def get_user_data(self):
+        rows = await asyncio.to_thread(
+            lambda: self._conn.execute("SELECT user_id, data FROM user_data").fetchall()
+        )
+        return {user_id: decode_user_data(data) for user_id, data in rows}
+
+    async def get_conversations(self, name):
+        rows = await asyncio.to_thread(
+            lambda: self._conn.execute("SELECT key, state FROM conversations WHERE name = ?", (name,)).fetchall()
+        )
+        return {tuple(json.loads(key)): json.loads(state) for key, state in rows}
+
+    async def get_chat_data(self):
+        return {}
+
+    async def get_bot_data(self):
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    # --- yozish (buferlanadi) ---
+
+    async def update_user_data(self, user_id, data):
+        # Hozirgi holatni darhol serialize qilamiz - keyingi o'zgarishlar ta'sir qilmaydi
+        self._users[user_id] = encode_user_data(data)
+        self._dropped_users.discard(user_id)
+        self._schedule_flush()
+
+    async def drop_user_data(self, user_id):
+        self._users.pop(user_id, None)
+        self._dropped_users.add(user_id)
+        self._schedule_flush()
+
+    async def update_conversation(self, name, key, new_state):
+        self._conversations[(name, json.dumps(list(key)))] = new_state
+        self._schedule_flush()
+
+    async def update_chat_data(self, chat_id, data):
+        pass
+
+    async def drop_chat_data(self, chat_id):
+        pass
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def refresh_user_data(self, user_id, user_data):
+        pass
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+    def _schedule_flush(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._delayed_flush())
+
+    def _pending(self):
+        return bool(self._users or self._dropped_users or self._conversations)
+
+    async def _delayed_flush(self):
+        # _write davomida kelgan yozuvlar ham shu task da yoziladi - bufer bo'shamaguncha
+        delay = self.flush_delay
+        while self._pending():
+            await asyncio.sleep(delay)
+            if await self._write():
+                delay = self.flush_delay
+            elif self._closing:
+                break
+            else:
+                # Xatodan keyin update_interval dan kechiktirmay qayta urinamiz
+                delay = max(self.update_interval, self.flush_delay)
+
+    async def _write(self):
+        """Buferni yozadi; xato bo'lsa qiymatlarni buferga qaytarib False qaytaradi"""
+        async with self._lock:
+            users, self._users = self._users, {}
+            dropped, self._dropped_users = self._dropped_users, set()
+            conversations, self._conversations = self._conversations, {}
+            if not (users or dropped or conversations):
+                return True
+            try:
+                await asyncio.to_thread(self._write_sync, users, dropped, conversations)
+                self.flushes += 1
+                return True
+            except Exception as e:
+                logger.error(f"Persistence flush failed: {e}")
+                # Keyingi flush da qayta urinamiz (yangiroq qiymatlar ustun)
+                self._users = {**users, **self._users}
+                self._dropped_users |= dropped - set(self._users)
+                self._conversations = {**conversations, **self._conversations}
+                return False
+
+    def _write_sync(self, users, dropped, conversations):
+        with self._conn:
+            if users:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO user_data (user_id, data) VALUES (?, ?)", users.items()
+                )
+            if dropped:
+                self._conn.executemany("DELETE FROM user_data WHERE user_id = ?", [(i,) for i in dropped])
+            ended = [key for key, state in conversations.items() if state is None]
+            if ended:
+                self._conn.executemany("DELETE FROM conversations WHERE name = ? AND key = ?", ended)
+            active = [(*key, json.dumps(state)) for key, state in conversations.items() if state is not None]
+            if active:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO conversations (name, key, state) VALUES (?, ?, ?)", active
+                )
+
+    async def flush(self):
+        """Application to'xtaganda chaqiriladi"""
+        self._closing = True
+        if self._flush_task is not None:
+            await self._flush_task
+        await self._write()
+        self._conn.close()
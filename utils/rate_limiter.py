@@ -1,18 +1,244 @@
+import asyncio
+import os
 import time
-from collections import defaultdict
+import sqlite3
+import threading
+import logging
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop, TypeHandler
+from utils.sender import reply_text
+
+logger = logging.getLogger(__name__)
 
-# User based rate limiting
-user_requests = defaultdict(list)
 RATE_LIMIT = 10  # 10 so'rov daqiqasiga
 TIME_WINDOW = 60  # 60 soniya
 
-def rate_limit(user_id):
-    now = time.time()
-    user_requests[user_id] = [req_time for req_time in user_requests[user_id] 
-                             if now - req_time < TIME_WINDOW]
-    
-    if len(user_requests[user_id]) >= RATE_LIMIT:
-        return False
-    
-    user_requests[user_id].append(now)
-    return True
\ No newline at end of file
+# Buyruqlar bo'yicha limitlar: scope -> (so'rovlar soni, oyna soniyalarda)
+LIMITS = {
+    'default': (30, 60),  # suhbat ichidagi oddiy xabarlar (e'lon qadamlari, rasmlar)
+    'browse': (RATE_LIMIT, TIME_WINDOW),
+    'search': (20, 60),
+    'create_listing': (5, 3600),
+}
+SWEEP_INTERVAL = 300  # idle kalitlarni fonda tozalash oralig'i (sweep_job)
+
+# memory | sqlite | redis
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+RATE_LIMIT_SQLITE_PATH = os.getenv('RATE_LIMIT_SQLITE_PATH', 'ratelimit.db')
+RATE_LIMIT_REDIS_URL = os.getenv('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0')
+
+
+class MemoryStore:
+    """GCRA holati: har bir kalit uchun bitta float (theoretical arrival time)"""
+
+    # I/O yo'q - event loop da to'g'ridan-to'g'ri chaqiriladi
+    blocking = False
+
+    def __init__(self):
+        self._tat = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key, interval, tau, now):
+        """(ruxsat, retry_after_soniya) qaytaradi"""
+        with self._lock:
+            tat = max(self._tat.get(key, now), now)
+            if tat - now > tau:
+                return False, tat - now - tau
+            self._tat[key] = tat + interval
+        return True, 0.0
+
+    def sweep(self, now):
+        """TAT o'tib ketgan kalitlar to'liq bucketga teng - ularni saqlash shart emas"""
+        with self._lock:
+            idle = [key for key, tat in self._tat.items() if tat <= now]
+            for key in idle:
+                del self._tat[key]
+        return len(idle)
+
+    def __len__(self):
+        return len(self._tat)
+
+
+class SQLiteStore:
+    """Bir mashinadagi workerlar uchun umumiy GCRA holati"""
+
+    blocking = True
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, tat REAL NOT NULL)"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def acquire(self, key, interval, tau, now):
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT tat FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            tat = max(row[0] if row else now, now)
+            if tat - now > tau:
+                return False, tat - now - tau
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limits (key, tat) VALUES (?, ?)", (key, tat + interval)
+            )
+        return True, 0.0
+
+    def sweep(self, now):
+        conn = self._conn()
+        with conn:
+            return conn.execute("DELETE FROM rate_limits WHERE tat <= ?", (now,)).rowcount
+
+
+class RedisStore:
+    """Redis GCRA - atomar Lua skript; idle kalitlar TTL bilan o'zi o'chadi"""
+
+    SCRIPT = """
+    local now = tonumber(ARGV[1])
+    local interval = tonumber(ARGV[2])
+    local tau = tonumber(ARGV[3])
+    local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+    if tat < now then tat = now end
+    if tat - now > tau then return tostring(tat - now - tau) end
+    redis.call('SET', KEYS[1], tostring(tat + interval), 'PX', math.ceil((tat + interval - now) * 1000))
+    return '0'
+    """
+
+    blocking = True
+
+    def __init__(self, url, prefix='uyizlang:rl:'):
+        import redis  # ixtiyoriy bog'liqlik
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._script = self.client.register_script(self.SCRIPT)
+
+    def acquire(self, key, interval, tau, now):
+        retry_after = float(self._script(keys=[self.prefix + key], args=[now, interval, tau]))
+        return retry_after == 0, retry_after
+
+    def sweep(self, now):
+        return 0
+
+
+def create_store(name=RATE_LIMIT_BACKEND):
+    if name == 'memory':
+        return MemoryStore()
+    if name == 'sqlite':
+        return SQLiteStore(RATE_LIMIT_SQLITE_PATH)
+    if name == 'redis':
+        return RedisStore(RATE_LIMIT_REDIS_URL)
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {name}")
+
+
+class RateLimiter:
+    """GCRA (token bucket ekvivalenti): ``limit`` ta so'rov ``window`` soniyada,
+    ``limit`` gacha burst ruxsat etiladi."""
+
+    def __init__(self, store=None, limits=None):
+        self.store = store or create_store()
+        self.limits = limits or LIMITS
+        # user_id -> ogohlantirish berilgan cheklov oynasi oxiri (faqat xotirada)
+        self._warned_until = {}
+
+    def _params(self, scope):
+        limit, window = self.limits.get(scope, self.limits['default'])
+        interval = window / limit
+        return interval, interval * (limit - 1)
+
+    def check(self, user_id, scope='default'):
+        """(ruxsat, retry_after_soniya)"""
+        interval, tau = self._params(scope)
+        # Umumiy store larda workerlar orasida bir xil soat kerak
+        now = time.time()
+        return self.store.acquire(f"{scope}:{user_id}", interval, tau, now)
+
+    async def acheck(self, user_id, scope='default'):
+        """check() ning async varianti: SQLite/Redis store lar thread pool da"""
+        if not self.store.blocking:
+            return self.check(user_id, scope)
+        return await asyncio.to_thread(self.check, user_id, scope)
+
+    def should_warn(self, user_id, retry_after, now):
+        """Bir cheklov oynasida faqat bir marta ogohlantirish"""
+        if self._warned_until.get(user_id, 0) >= now:
+            return False
+        self._warned_until[user_id] = now + retry_after
+        return True
+
+    def sweep(self, now):
+        """Idle kalitlarni tozalaydi (fonda, so'rov yo'lida emas)"""
+        self._warned_until = {user_id: until for user_id, until in self._warned_until.items() if until > now}
+        return self.store.sweep(now)
+
+
+limiter = RateLimiter()
+
+
+def rate_limit(user_id, scope='default'):
+    allowed, _ = limiter.check(user_id, scope)
+    return allowed
+
+
+# Menyu tugmalari -> scope
+COMMAND_SCOPES = {
+    "🏠 Elon Berish": 'create_listing',
+    "📋 Mening elonlarim": 'browse',
+    "📍 Yaqinimdagi uylar": 'browse',
+    "🔍 Qidiruv": 'search',
+}
+
+
+def scope_for_update(update):
+    if update.callback_query:
+        data = update.callback_query.data or ''
+        return 'search' if data.startswith('search:') else 'browse'
+    if update.message and update.message.text:
+        return COMMAND_SCOPES.get(update.message.text, 'default')
+    return 'default'
+
+
+async def rate_limit_middleware(update: Update, context):
+    user = update.effective_user
+    if user is None:
+        return
+    allowed, retry_after = await limiter.acheck(user.id, scope_for_update(update))
+    if allowed:
+        return
+
+    # Vaqtinchalik holat - user_data ga (persistence ga) yozilmaydi
+    if limiter.should_warn(user.id, retry_after, time.time()) and update.effective_message:
+        reply_text(update,
+            f"🚫 Juda ko'p so'rov! Iltimos, {int(retry_after) + 1} soniyadan keyin urinib ko'ring."
+        )
+    raise ApplicationHandlerStop
+
+
+async def sweep_job(context):
+    """python-telegram-bot JobQueue callback"""
+    try:
+        removed = await asyncio.to_thread(limiter.sweep, time.time())
+        logger.debug(f"Rate limit sweep removed {removed} keys")
+    except Exception as e:
+        logger.error(f"Error in sweep_job: {e}")
+
+
+def register_rate_limit_jobs(application, interval=SWEEP_INTERVAL):
+    """Bot ishga tushganda: register_rate_limit_jobs(application)"""
+    application.job_queue.run_repeating(sweep_job, interval=interval, first=interval, name='sweep_rate_limits')
+
+
+def install_rate_limit(application):
+    """Barcha handlerlardan oldin (group=-1) ishlaydigan rate limit va idle kalitlar tozalovchisi"""
+    application.add_handler(TypeHandler(Update, rate_limit_middleware), group=-1)
+    if application.job_queue is not None:
+        register_rate_limit_jobs(application)
@@ -0,0 +1,183 @@
+import operator
+import re
+from sqlalchemy import column, or_, select, table, text
+from utils.currency import parse_currency
+
+# Sarlavha description dan muhimroq
+TITLE_WEIGHT = 2.0
+DESCRIPTION_WEIGHT = 1.0
+SEARCH_PAGE_SIZE = 5
+# Bundan ko'p moslik bo'lsa bm25 o'rniga eng yangilari (rowid) bo'yicha tartiblanadi -
+# keng so'rovlarda barcha mosliklarni baholash qimmat va foydasi kam.
+# search() buni ranked=False bilan bildiradi, handler foydalanuvchiga aytadi
+RANK_MAX_MATCHES = 2000
+
+APOSTROPHES = "'`‘’ʻʼ´"
+# O'zbek kirill -> lotin (rus so'zlari ham shu orqali bir xil yoziladi)
+CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'ғ': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo',
+    'ж': 'j', 'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'қ': 'q', 'л': 'l', 'м': 'm',
+    'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ў': 'o',
+    'ф': 'f', 'х': 'x', 'ҳ': 'h', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'sh', 'ъ': '',
+    'ы': 'i', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+}
+_TRANSLATE = str.maketrans({**CYRILLIC_TO_LATIN, **{ch: '' for ch in APOSTROPHES}})
+_TOKEN_RE = re.compile(r"\w+")
+
+ROOMS_RE = re.compile(r"(\d+)\s*(?:xonali|xona|komnat\w*|kom\w*)\b")
+FLOOR_RE = re.compile(r"(\d+)\s*(?:qavat\w*|etaj\w*)\b")
+PRICE_RANGE_RE = re.compile(r"(\d[\d\s]*)\s*-\s*(\d[\d\s]*)")
+MAX_PRICE_RE = re.compile(r"(\d[\d\s]*)\s*gacha\b")
+# normalize() dan keyin: "сум" -> sum, "сўм" -> som, "доллар" -> dollar
+CURRENCY_RE = re.compile(r"(\$|\b(?:usd|dollar|som|sum|uzs)\b)")
+
+
+def normalize(value):
+    """Kichik harf, kirill -> lotin, apostrof variantlarini olib tashlash, h -> x.
+
+    o'/o‘/oʻ/ў bir xil "o" bo'ladi; "hovli" va "xovli" ham bir xil.
+    """
+    value = (value or '').lower().translate(_TRANSLATE)
+    value = value.replace('sh', '\x00').replace('ch', '\x01').replace('h', 'x')
+    return value.replace('\x00', 'sh').replace('\x01', 'ch')
+
+
+def tokenize(value):
+    return _TOKEN_RE.findall(normalize(value))
+
+
+def build_match_query(value):
+    """Har bir so'z prefiks sifatida: "kvartira" -> "kvartiralar" ham topiladi"""
+    tokens = tokenize(value)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def parse_query(value):
+    """Matndan strukturali filtrlarni ajratadi: (qolgan matn, filtrlar)
+
+    Masalan: "Chilonzor 3 xonali 50000-80000 usd" yoki "Чилонзор 3 хонали 80000 гача сум".
+    Matn avval normalize() qilinadi - kirill va lotin bir xil tahlil qilinadi.
+    """
+    value = normalize(value)
+    filters = {}
+
+    match = ROOMS_RE.search(value)
+    if match:
+        filters['rooms'] = int(match.group(1))
+        value = value.replace(match.group(0), ' ')
+    match = FLOOR_RE.search(value)
+    if match:
+        filters['floor'] = int(match.group(1))
+        value = value.replace(match.group(0), ' ')
+    match = PRICE_RANGE_RE.search(value)
+    if match:
+        filters['min_price'] = int(match.group(1).replace(' ', ''))
+        filters['max_price'] = int(match.group(2).replace(' ', ''))
+        value = value.replace(match.group(0), ' ')
+    else:
+        match = MAX_PRICE_RE.search(value)
+        if match:
+            filters['max_price'] = int(match.group(1).replace(' ', ''))
+            value = value.replace(match.group(0), ' ')
+    match = CURRENCY_RE.search(value)
+    if match:
+        filters['currency'] = parse_currency(match.group(1)).value
+        value = value.replace(match.group(0), ' ')
+    return ' '.join(value.split()), filters
+
+
+def is_supported(bind):
+    return bind.dialect.name == 'sqlite'
+
+
+def create_index(conn):
+    conn.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS listings_fts USING fts5(title, description)"
+    ))
+
+
+def index_listings(db, listings):
+    """Faol e'lonlarni FTS indeksiga qo'shadi (sync Session, commit chaqiruvchida)"""
+    if not listings or not is_supported(db.get_bind()):
+        return
+    db.execute(text(
+        "INSERT OR REPLACE INTO listings_fts (rowid, title, description) VALUES (:id, :title, :description)"
+    ), [
+        {'id': listing.id, 'title': normalize(listing.title), 'description': normalize(listing.description)}
+        for listing in listings
+    ])
+
+
+def remove_listings(db, listing_ids):
+    if not listing_ids or not is_supported(db.get_bind()):
+        return
+    db.execute(text("DELETE FROM listings_fts WHERE rowid = :id"), [{'id': i} for i in listing_ids])
+
+
+def rebuild(db):
+    from models.user import Listing
+
+    db.execute(text("DELETE FROM listings_fts"))
+    listings = db.query(Listing).filter(Listing.is_active == True).all()
+    index_listings(db, listings)
+    db.commit()
+
+
+def search(db, query, filters=None, page=0, page_size=SEARCH_PAGE_SIZE):
+    """Matn + filtrlar bo'yicha bm25 tartibida sahifa.
+
+    (ListingRow lar, keyingi sahifa bormi, ranked) qaytaradi. Moslik RANK_MAX_MATCHES
+    dan ko'p bo'lsa bm25 o'rniga eng yangilari birinchi va ranked=False.
+    Faqat filtrlar (matnsiz) bo'lsa ham eng yangilari: xona/narx filtri
+    idx_listing_active_rooms_price_usd dan o'qiladi, natija id bo'yicha saralanadi.
+    FTS5 yo'q bazalarda (Postgres) matn ilike bilan, eng yangilari birinchi.
+    """
+    from models.user import Listing
+
+    filters = filters or {}
+    match = build_match_query(query)
+    conditions = [Listing.is_active.is_(True)]
+    # Valyutasiz narx diapazoni USD ekvivalenti (price_usd) bo'yicha
+    price = Listing.price if filters.get('currency') else Listing.price_usd
+    for name, attribute, op in (
+        ('rooms', Listing.rooms, operator.eq),
+        ('floor', Listing.floor, operator.eq),
+        ('currency', Listing.currency, operator.eq),
+        ('min_price', price, operator.ge),
+        ('max_price', price, operator.le),
+    ):
+        if filters.get(name) is not None:
+            conditions.append(op(attribute, filters[name]))
+
+    ranked = bool(match)
+    stmt = select(Listing.id)
+    if match and is_supported(db.get_bind()):
+        matches = db.execute(text(
+            "SELECT COUNT(*) FROM (SELECT rowid FROM listings_fts WHERE listings_fts MATCH :match LIMIT :cap)"
+        ), {'match': match, 'cap': RANK_MAX_MATCHES + 1}).scalar()
+        ranked = matches <= RANK_MAX_MATCHES
+        fts = table('listings_fts', column('rowid'))
+        stmt = stmt.join(fts, fts.c.rowid == Listing.id).where(
+            text("listings_fts MATCH :match").bindparams(match=match)
+        ).order_by(
+            text(f"bm25(listings_fts, {TITLE_WEIGHT}, {DESCRIPTION_WEIGHT})") if ranked else fts.c.rowid.desc(),
+            Listing.id.desc(),
+        )
+    elif match:
+        # Har bir so'z sarlavha yoki tavsifda; bm25 yo'q, RANK_MAX_MATCHES cheklovi ham qo'llanmaydi
+        for token in tokenize(query):
+            pattern = f"%{token}%"
+            conditions.append(or_(Listing.title.ilike(pattern), Listing.description.ilike(pattern)))
+        stmt = stmt.order_by(Listing.id.desc())
+    else:
+        # Faqat filtrlar - eng yangilari birinchi
+        stmt = stmt.order_by(Listing.id.desc())
+
+    stmt = stmt.where(*conditions).limit(page_size + 1).offset(page * page_size)
+    ids = db.execute(stmt).scalars().all()
+    has_more = len(ids) > page_size
+    ids = ids[:page_size]
+    if not ids:
+        return [], False, ranked
+    by_id = {listing.id: listing for listing in db.query(Listing).filter(Listing.id.in_(ids))}
+    return [by_id[i].snapshot() for i in ids if i in by_id], has_more, ranked
@@ -0,0 +1,270 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from collections import deque
+from telegram.error import RetryAfter
+from utils.metrics import Gauge, telegram_latency, telegram_retries
+
+logger = logging.getLogger(__name__)
+
+# Ustuvorlik: foydalanuvchi kutayotgan javoblar birinchi
+INTERACTIVE = 0
+BULK = 1
+
+GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', '30'))  # xabar/soniya, barcha chatlar
+CHAT_INTERVAL = float(os.getenv('TELEGRAM_CHAT_INTERVAL', '1'))  # bitta chat uchun soniya/xabar
+CHAT_BURST = int(os.getenv('TELEGRAM_CHAT_BURST', '3'))  # chat ichida qisqa burst
+MAX_RETRIES = 3
+MAX_MESSAGE_LENGTH = 4096
+
+
+class _Job:
+    __slots__ = ('priority', 'seq', 'bot', 'method', 'chat_id', 'kwargs', 'future', 'retries', 'cost')
+
+    def __init__(self, priority, seq, bot, method, chat_id, kwargs, future):
+        self.priority = priority
+        self.seq = seq
+        self.bot = bot
+        self.method = method
+        self.chat_id = chat_id
+        self.kwargs = kwargs
+        self.future = future
+        self.retries = 0
+        # Media group Telegram da har bir rasm alohida xabar hisoblanadi
+        self.cost = len(kwargs.get('media', ())) or 1
+
+
+def _log_failure(future):
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        logger.warning(f"Outbound send failed: {error}")
+
+
+def _log_task_failure(task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Outbound send task crashed: {task.exception()!r}")
+
+
+class OutboundQueue:
+    """Barcha chiquvchi Telegram chaqiruvlari uchun markaziy navbat.
+
+    - global ~30 xabar/s va har bir chat uchun ~1 xabar/s (kichik burst bilan)
+    - RetryAfter da chat pauza qilinadi va xabar chat navbatining boshiga qaytariladi
+    - chatlar orasida INTERACTIVE xabarlar BULK dan oldin yuboriladi
+    - bir chat ichida qat'iy FIFO: INTERACTIVE xabar shu chatdagi oldingi BULK ni quvib o'tmaydi
+    - bir chatga ketma-ket matnlar yuborilmasdan oldin bitta xabarga birlashtiriladi
+
+    Har bir chat - alohida deque; yuborishga tayyor chatlar (priority, seq) heap ida,
+    tezlik cheklovi kutayotganlari (ready_at) heap ida. Heap yozuvlari lazy o'chiriladi -
+    har bir yuborish O(log n).
+    """
+
+    def __init__(self, global_rate=GLOBAL_RATE, chat_interval=CHAT_INTERVAL, chat_burst=CHAT_BURST):
+        self.global_rate = global_rate
+        self.chat_interval = chat_interval
+        self.chat_tau = chat_interval * (chat_burst - 1)
+        self._chats = {}  # chat_id -> deque(_Job)
+        self._ready = []  # (priority, seq, chat_id) - chat navbatining boshi
+        self._waiting = []  # (ready_at, seq, chat_id) - chat tezlik cheklovida
+        self._depth = 0
+        self._seq = itertools.count()
+        self._chat_tat = {}
+        self._inflight = set()
+        self._tasks = set()
+        self._tokens = global_rate
+        self._refilled_at = time.monotonic()
+        self._wakeup = None
+        self._task = None
+        self.sent = 0
+        self.retried = 0
+
+    def depth(self):
+        return self._depth
+
+    def submit(self, bot, method, chat_id, priority=INTERACTIVE, **kwargs):
+        """Navbatga qo'yadi va asyncio.Future qaytaradi (kutish ixtiyoriy)"""
+        self._ensure_started()
+        queue = self._chats.get(chat_id)
+        if method == 'send_message' and queue:
+            merged = self._coalesce(queue[-1], priority, kwargs)
+            if merged is not None:
+                return merged
+
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_log_failure)
+        job = _Job(priority, next(self._seq), bot, method, chat_id, kwargs, future)
+        if queue is None:
+            queue = self._chats[chat_id] = deque()
+        queue.append(job)
+        self._depth += 1
+        if len(queue) == 1:
+            self._schedule(chat_id, time.monotonic())
+        self._wakeup.set()
+        return future
+
+    def _coalesce(self, last, priority, kwargs):
+        """Chatda hali yuborilmagan oxirgi matnga qo'shib yuboradi"""
+        if (last.method != 'send_message' or last.priority != priority
+                or 'reply_markup' in last.kwargs
+                or last.kwargs.get('parse_mode') != kwargs.get('parse_mode')
+                or set(kwargs) - {'text', 'parse_mode', 'reply_markup'}
+                or len(last.kwargs['text']) + len(kwargs['text']) + 2 > MAX_MESSAGE_LENGTH):
+            return None
+        last.kwargs['text'] += "\n\n" + kwargs['text']
+        if 'reply_markup' in kwargs:
+            last.kwargs['reply_markup'] = kwargs['reply_markup']
+        return last.future
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def _chat_ready_at(self, chat_id):
+        tat = self._chat_tat.get(chat_id)
+        return 0.0 if tat is None else tat - self.chat_tau
+
+    def _schedule(self, chat_id, now):
+        """Chat navbatining boshini tegishli heap ga qo'yadi (yuborilayotgan bo'lsa - yo'q)"""
+        if chat_id in self._inflight:
+            return
+        head = self._chats[chat_id][0]
+        ready_at = self._chat_ready_at(chat_id)
+        if ready_at <= now:
+            heapq.heappush(self._ready, (head.priority, head.seq, chat_id))
+        else:
+            heapq.heappush(self._waiting, (ready_at, head.seq, chat_id))
+
+    def _is_head(self, chat_id, seq):
+        queue = self._chats.get(chat_id)
+        return bool(queue) and queue[0].seq == seq and chat_id not in self._inflight
+
+    def _next_job(self, now):
+        """Tayyor chatlarning eng ustuvor boshi yoki (None, eng erta tayyor bo'lish vaqti)"""
+        while self._waiting and self._waiting[0][0] <= now:
+            _, seq, chat_id = heapq.heappop(self._waiting)
+            if self._is_head(chat_id, seq):
+                self._schedule(chat_id, now)
+        while self._ready:
+            _, seq, chat_id = heapq.heappop(self._ready)
+            # Eskirgan yozuv (yuborilgan, qayta rejalashtirilgan) - o'tkazib yuboriladi
+            if self._is_head(chat_id, seq):
+                return self._chats[chat_id].popleft(), None
+        return None, self._waiting[0][0] if self._waiting else None
+
+    async def _run(self):
+        while True:
+            if not self._depth:
+                if not self._inflight:
+                    # Bo'sh navbat: o'tib ketgan TAT lar yo'q bilan teng
+                    now = time.monotonic()
+                    self._chat_tat = {chat_id: tat for chat_id, tat in self._chat_tat.items() if tat > now}
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            now = time.monotonic()
+            self._tokens = min(self.global_rate, self._tokens + (now - self._refilled_at) * self.global_rate)
+            self._refilled_at = now
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.global_rate)
+                continue
+
+            job, earliest = self._next_job(now)
+            if job is None:
+                self._wakeup.clear()
+                timeout = None if earliest is None else max(earliest - now, 0.001)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._depth -= 1
+            self._tokens -= job.cost
+            tat = max(self._chat_tat.get(job.chat_id, now), now)
+            self._chat_tat[job.chat_id] = tat + self.chat_interval
+            self._inflight.add(job.chat_id)
+            task = asyncio.get_running_loop().create_task(self._execute(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            task.add_done_callback(_log_task_failure)
+
+    async def _execute(self, job):
+        start_time = time.perf_counter()
+        try:
+            result = await getattr(job.bot, job.method)(chat_id=job.chat_id, **job.kwargs)
+        except RetryAfter as e:
+            telegram_retries.inc(1, job.method)
+            retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, 'total_seconds') else e.retry_after
+            job.retries += 1
+            self.retried += 1
+            # Chatni pauza qilamiz; global budjetni ham bo'shatamiz
+            self._chat_tat[job.chat_id] = time.monotonic() + retry_after + self.chat_tau
+            self._tokens = min(self._tokens, 0)
+            if job.retries <= MAX_RETRIES:
+                # Chat navbatining boshiga - tartib saqlanadi
+                self._chats.setdefault(job.chat_id, deque()).appendleft(job)
+                self._depth += 1
+            elif not job.future.done():
+                job.future.set_exception(e)
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            self.sent += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            telegram_latency.observe(time.perf_counter() - start_time, job.method)
+            self._inflight.discard(job.chat_id)
+            now = time.monotonic()
+            if self._chats.get(job.chat_id):
+                self._schedule(job.chat_id, now)
+            else:
+                # Idle chatlar holatini saqlamaymiz
+                self._chats.pop(job.chat_id, None)
+                if self._chat_tat.get(job.chat_id, 0) < now:
+                    self._chat_tat.pop(job.chat_id, None)
+            self._wakeup.set()
+
+    async def close(self):
+        """Navbatdagi barcha xabarlarni yuborib, fon vazifasini to'xtatadi"""
+        if self._task is None:
+            return
+        while self._depth or self._inflight:
+            await asyncio.sleep(0.05)
+        self._task.cancel()
+        self._task = None
+
+
+outbox = OutboundQueue()
+Gauge('telegram_outbox_depth', 'Messages waiting in the outbound queue', outbox.depth)
+
+
+def send(bot, method, chat_id, priority=INTERACTIVE, **kwargs):
+    return outbox.submit(bot, method, chat_id, priority, **kwargs)
+
+
+def reply_text(update, text, priority=INTERACTIVE, **kwargs):
+    return send(update.get_bot(), 'send_message', update.effective_chat.id, priority, text=text, **kwargs)
+
+
+def reply_media_group(update, media, priority=INTERACTIVE, **kwargs):
+    return send(update.get_bot(), 'send_media_group', update.effective_chat.id, priority, media=media, **kwargs)
+
+
+def reply_photo(update, photo, priority=INTERACTIVE, **kwargs):
+    return send(update.get_bot(), 'send_photo', update.effective_chat.id, priority, photo=photo, **kwargs)
+
+
+def edit_text(update, text, priority=INTERACTIVE, **kwargs):
+    """Callback xabarini joyida tahrirlash"""
+    message = update.callback_query.message
+    return send(update.get_bot(), 'edit_message_text', message.chat_id, priority,
+                message_id=message.message_id, text=text, **kwargs)
@@ -0,0 +1,169 @@
+from datetime import date, timedelta
+from sqlalchemy import delete
+from models.stats import StatCounter, DailyStat, ListingBucket
+from models.user import User, Listing
+from utils.clustering import cell_for, cell_bounds
+from utils.upsert import add_values
+
+# Narx oraliqlari valyuta bo'yicha (pastki chegaralar)
+PRICE_BANDS = {
+    'USD': [0, 20000, 40000, 60000, 80000, 100000, 150000, 200000],
+    "SO'M": [0, 250_000_000, 500_000_000, 750_000_000, 1_000_000_000, 1_500_000_000, 2_000_000_000],
+}
+# created_at dan qayta hisoblanadigan kunlik metrikalar; expired_listings tarixini
+# tiklab bo'lmaydi (arxivlangan e'lonlar o'chirilgan) - rebuild uni saqlaydi
+REBUILT_DAILY = ('new_users', 'new_listings')
+# "Tuman" - shu zoom dagi klaster katagi (~2.4 km)
+DISTRICT_ZOOM = 12
+TREND_DAYS = 7
+TOP_BUCKETS = 5
+
+
+def price_band(price, currency):
+    bands = PRICE_BANDS.get(currency)
+    if price is None or not bands:
+        return None
+    lower = [bound for bound in bands if bound <= price]
+    index = len(lower) - 1
+    if index < 0:
+        return None
+    if index + 1 < len(bands):
+        return f"{currency} {bands[index]}-{bands[index + 1]}"
+    return f"{currency} {bands[index]}+"
+
+
+def listing_buckets(listing):
+    buckets = []
+    if listing.rooms is not None:
+        buckets.append(('rooms', str(listing.rooms)))
+    band = price_band(listing.price, listing.currency)
+    if band:
+        buckets.append(('price_band', band))
+    if listing.latitude is not None and listing.longitude is not None:
+        cell_x, cell_y = cell_for(listing.latitude, listing.longitude, DISTRICT_ZOOM)
+        buckets.append(('district', f"{cell_x}:{cell_y}"))
+    return buckets
+
+
+def _apply(db, counters=None, daily=None, buckets=None):
+    """Deltalarni SQL tarafida qo'shadi (upsert) - parallel yozuvchilar bir-birini
+    yo'qotmaydi; bo'sh qolgan bucketlar o'chiriladi (commit chaqiruvchida)"""
+    add_values(db, StatCounter.__table__, [
+        {'name': name, 'value': delta} for name, delta in (counters or {}).items()
+    ], ['name'], ['value'])
+    add_values(db, DailyStat.__table__, [
+        {'day': day, 'metric': metric, 'value': delta} for (day, metric), delta in (daily or {}).items()
+    ], ['day', 'metric'], ['value'])
+    add_values(db, ListingBucket.__table__, [
+        {'dimension': dimension, 'bucket': bucket, 'active_count': delta}
+        for (dimension, bucket), delta in (buckets or {}).items()
+    ], ['dimension', 'bucket'], ['active_count'])
+    if buckets and any(delta < 0 for delta in buckets.values()):
+        db.execute(delete(ListingBucket).where(ListingBucket.active_count <= 0))
+
+
+def add_users(db, count, day=None):
+    if count:
+        _apply(db, {'users': count}, {(day or date.today(), 'new_users'): count})
+
+
+def add_listings(db, listings, day=None):
+    """Yangi faol e'lonlar"""
+    if not listings:
+        return
+    buckets = {}
+    for listing in listings:
+        for key in listing_buckets(listing):
+            buckets[key] = buckets.get(key, 0) + 1
+    _apply(
+        db,
+        {'listings': len(listings), 'active_listings': len(listings)},
+        {(day or date.today(), 'new_listings'): len(listings)},
+        buckets,
+    )
+
+
+def remove_listings(db, listings, day=None):
+    """Nofaol bo'lgan (muddati tugagan) e'lonlar"""
+    if not listings:
+        return
+    buckets = {}
+    for listing in listings:
+        for key in listing_buckets(listing):
+            buckets[key] = buckets.get(key, 0) - 1
+    _apply(
+        db,
+        {'active_listings': -len(listings)},
+        {(day or date.today(), 'expired_listings'): len(listings)},
+        buckets,
+    )
+
+
+def forget_listings(db, count):
+    """Arxivga ko'chirilgan (listings jadvalidan o'chirilgan) e'lonlar"""
+    if count:
+        _apply(db, {'listings': -count})
+
+
+def rebuild(db):
+    """Hisoblagich va taqsimotlarni jadvallardan noldan hisoblaydi (kunlik rollup created_at dan).
+
+    expired_listings kunlik qatorlari o'chirilmaydi - ular faqat shu jadvalda saqlanadi.
+    """
+    db.query(StatCounter).delete()
+    db.query(DailyStat).filter(DailyStat.metric.in_(REBUILT_DAILY)).delete(synchronize_session=False)
+    db.query(ListingBucket).delete()
+
+    daily = {}
+    for (created_at,) in db.query(User.created_at):
+        if created_at is not None:
+            key = (created_at.date(), 'new_users')
+            daily[key] = daily.get(key, 0) + 1
+    counters = {'users': db.query(User).count(), 'listings': 0, 'active_listings': 0}
+    buckets = {}
+    for listing in db.query(Listing).yield_per(1000):
+        counters['listings'] += 1
+        if listing.created_at is not None:
+            key = (listing.created_at.date(), 'new_listings')
+            daily[key] = daily.get(key, 0) + 1
+        if listing.is_active:
+            counters['active_listings'] += 1
+            for key in listing_buckets(listing):
+                buckets[key] = buckets.get(key, 0) + 1
+    _apply(db, counters, daily, buckets)
+    db.commit()
+
+
+def district_center(bucket):
+    cell_x, cell_y = (int(part) for part in bucket.split(':'))
+    south, west, north, east = cell_bounds(cell_x, cell_y, DISTRICT_ZOOM)
+    return (south + north) / 2, (west + east) / 2
+
+
+def get_stats(db, days=TREND_DAYS, today=None):
+    """Admin paneli uchun: hisoblagichlar, kunlik trend va eng katta taqsimotlar"""
+    today = today or date.today()
+    counters = {row.name: row.value for row in db.query(StatCounter)}
+
+    since = today - timedelta(days=days - 1)
+    trend = {}
+    for row in db.query(DailyStat).filter(DailyStat.day >= since):
+        trend.setdefault(row.metric, {})[row.day] = row.value
+
+    top = {}
+    for dimension in ('rooms', 'price_band', 'district'):
+        top[dimension] = [
+            (row.bucket, row.active_count)
+            for row in db.query(ListingBucket).filter(
+                ListingBucket.dimension == dimension
+            ).order_by(ListingBucket.active_count.desc()).limit(TOP_BUCKETS)
+        ]
+
+    return {
+        'users': counters.get('users', 0),
+        'listings': counters.get('listings', 0),
+        'active_listings': counters.get('active_listings', 0),
+        'days': [since + timedelta(days=i) for i in range(days)],
+        'trend': trend,
+        'top': top,
+    }
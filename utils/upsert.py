@@ -0,0 +1,28 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+# ON CONFLICT ... DO UPDATE qo'llab-quvvatlaydigan dialektlar
+DIALECT_INSERTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+
+def insert_for(db, table):
+    """Sessiya dialektiga mos INSERT (on_conflict_do_update bilan)"""
+    return DIALECT_INSERTS[db.get_bind().dialect.name](table)
+
+
+def add_values(db, table, rows, keys, columns, extra=None):
+    """Qatorlarni qo'shadi; kalit mavjud bo'lsa columns qiymatlari SQL tarafida qo'shiladi.
+
+    Python da o'qib-yozish o'rniga ``value = value + excluded.value`` - parallel
+    yozuvchilar (alohida job jarayoni, Postgres) bir-birining o'sishini yo'qotmaydi.
+    extra(table, excluded) - qo'shimcha SET ifodalari. Commit chaqiruvchida.
+    """
+    if not rows:
+        return
+    stmt = insert_for(db, table)
+    set_ = {name: table.c[name] + stmt.excluded[name] for name in columns}
+    if extra:
+        set_.update(extra(table, stmt.excluded))
+    db.execute(stmt.on_conflict_do_update(index_elements=keys, set_=set_), rows)
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import os
+import logging
+from sqlalchemy import select
+from config.database import get_async_db
+from models.user import User, Listing
+from models.image import ListingImage
+from utils import changes, clustering, currency, search, stats
+from utils.metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+# Batch yoziladi: WRITE_BATCH_MS kutiladi yoki WRITE_BATCH_MAX ta yozuv yig'iladi
+WRITE_BATCH_MS = int(os.getenv('WRITE_BATCH_MS', '20'))
+WRITE_BATCH_MAX = int(os.getenv('WRITE_BATCH_MAX', '100'))
+
+
+class UserUpsert:
+    def __init__(self, telegram_id, fields):
+        self.telegram_id = telegram_id
+        self.fields = fields
+
+
+class ListingInsert:
+    def __init__(self, telegram_id, values, location):
+        self.telegram_id = telegram_id
+        self.values = values
+        self.location = location
+
+
+class WriteQueue:
+    """Foydalanuvchi upsert va e'lon insert larini guruhlab bitta tranzaksiyada yozadi.
+
+    Har bir ``submit`` commit bo'lgandan keyingina qaytadi (durability ack);
+    batch muvaffaqiyatsiz bo'lsa, yozuvlar birma-bir qayta urinadi.
+    """
+
+    def __init__(self, max_delay=WRITE_BATCH_MS / 1000, max_batch=WRITE_BATCH_MAX):
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self._pending = []
+        self._task = None
+        self._wakeup = None
+        self._full = None
+        self._flushing = False
+        self.batches = 0
+        self.rows = 0
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._full = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, op):
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((op, future))
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        self._wakeup.set()
+        return await future
+
+    def depth(self):
+        return len(self._pending)
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            if len(self._pending) < self.max_batch:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            self._full.clear()
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            if self._pending:
+                self._wakeup.set()
+            if batch:
+                self._flushing = True
+                try:
+                    await self._flush(batch)
+                finally:
+                    self._flushing = False
+
+    async def _flush(self, batch):
+        try:
+            async with get_async_db() as db:
+                results = await self._apply(db, [op for op, _ in batch])
+                await db.commit()
+                try:
+                    for result in results:
+                        if isinstance(result, Listing):
+                            # server_default (created_at) ni yuklash
+                            await db.refresh(result)
+                except Exception as e:
+                    logger.warning(f"Refresh after write batch failed: {e}")
+        except Exception as e:
+            if len(batch) == 1:
+                if not batch[0][1].done():
+                    batch[0][1].set_exception(e)
+                return
+            logger.warning(f"Write batch of {len(batch)} failed, retrying one by one: {e}")
+            for item in batch:
+                await self._flush([item])
+            return
+
+        self.batches += 1
+        self.rows += len(batch)
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _apply(self, db, ops):
+        telegram_ids = {op.telegram_id for op in ops}
+        users = {
+            user.telegram_id: user
+            for user in await db.scalars(select(User).where(User.telegram_id.in_(telegram_ids)))
+        }
+
+        results = []
+        listings = []
+        new_users = 0
+        rates = currency.load_rates()
+        for op in ops:
+            user = users.get(op.telegram_id)
+            if isinstance(op, UserUpsert):
+                if user is None:
+                    user = User(telegram_id=op.telegram_id)
+                    db.add(user)
+                    users[op.telegram_id] = user
+                    new_users += 1
+                for name, value in op.fields.items():
+                    setattr(user, name, value)
+                results.append(user)
+            else:
+                if user is None:
+                    raise ValueError(f"User {op.telegram_id} not found")
+                if user.id is None:
+                    await db.flush()
+                listing = Listing(user_id=user.id, **op.values)
+                listing.set_location(op.location)
+                listing.price_usd = currency.to_usd(listing.price, listing.currency, rates)
+                db.add(listing)
+                listings.append(listing)
+                results.append(listing)
+
+        # Versiya INSERT bilan birga yoziladi (alohida UPDATE siz)
+        await db.run_sync(changes.bump, listings)
+        await db.flush()
+        if new_users:
+            await db.run_sync(stats.add_users, new_users)
+        if listings:
+            # Rasmlar tartibi bilan; WebP variantlarini jobs.images fonda tayyorlaydi
+            db.add_all(
+                ListingImage(listing_id=listing.id, position=position, file_id=file_id)
+                for listing in listings
+                for position, file_id in enumerate(json.loads(listing.images or '[]'))
+            )
+            await db.run_sync(clustering.add_listings, listings)
+            await db.run_sync(search.index_listings, listings)
+            await db.run_sync(stats.add_listings, listings)
+        return results
+
+    async def close(self):
+        """Navbatdagi barcha yozuvlarni yozib, fon vazifasini to'xtatadi"""
+        if self._task is None:
+            return
+        while self._pending or self._flushing:
+            self._full.set()
+            self._wakeup.set()
+            await asyncio.sleep(0.01)
+        self._task.cancel()
+        self._task = None
+
+
+write_queue = WriteQueue()
+Gauge('write_queue_depth', 'Writes waiting for the next batch', write_queue.depth)
+
+
+async def upsert_user(telegram_id, **fields):
+    """Foydalanuvchini yaratadi yoki yangilaydi; commit dan keyin User qaytaradi"""
+    return await write_queue.submit(UserUpsert(telegram_id, fields))
+
+
+async def insert_listing(telegram_id, location, **values):
+    """E'lonni qo'shadi (klaster agregatlari bilan); commit dan keyin Listing qaytaradi"""
+    return await write_queue.submit(ListingInsert(telegram_id, values, location))